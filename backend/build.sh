@@ -11,9 +11,9 @@ pip install -r requirements.txt
 echo "📁 Collecting static files..."
 python manage.py collectstatic --noinput
 
-# Run database migrations
+# Run database migrations (index builds on big tables can outlast the request statement timeout)
 echo "🗄️ Running database migrations..."
-python manage.py migrate
+DATABASE_STATEMENT_TIMEOUT=0 python manage.py migrate
 
 # Create superuser if it doesn't exist (for initial setup)
 echo "👤 Creating superuser if needed..."
@@ -18,11 +18,36 @@ def run_with_restart(cmd, name):
         print(f"[{name}] Exited with code {ret_code}. Restarting in 60 seconds...")
         time.sleep(60)
 
-def start_worker():
-    # for prod
-    # run_with_restart(["celery", "-A", "sameboat", "worker", "--loglevel=info"], "Worker")
-    # for locally
-    run_with_restart(["celery", "-A", "sameboat", "worker","--pool=solo", "--loglevel=info"], "Worker")
+def worker_command(queues, pool, concurrency):
+    name = queues.split(",")[0]
+    cmd = [
+        "celery", "-A", "sameboat", "worker",
+        "-Q", queues,
+        "-n", f"{name}@%h",
+        f"--pool={pool}",
+        "--loglevel=info",
+    ]
+    if pool != "solo":
+        cmd.append(f"--concurrency={concurrency}")
+    return cmd
+
+
+def start_workers():
+    """Start one worker per queue group so a slow S3 upload can't block email or deletes."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "sameboat.settings")
+    from django.conf import settings
+
+    # --pool=solo for local Windows runs where threads/prefork misbehave
+    force_solo = os.getenv("CELERY_FORCE_SOLO", "False") == "True"
+
+    for queues, options in settings.TASK_QUEUE_WORKERS.items():
+        pool = "solo" if force_solo else options["pool"]
+        cmd = worker_command(queues, pool, options["concurrency"])
+        threading.Thread(
+            target=run_with_restart,
+            args=(cmd, f"Worker:{queues}"),
+            daemon=True,
+        ).start()
 
 
 def start_beat():
@@ -48,8 +73,8 @@ if __name__ == "__main__":
     signal.signal(signal.SIGTERM, shutdown_handler)
     signal.signal(signal.SIGINT, shutdown_handler)
 
-    # Run worker + beat in background threads
-    threading.Thread(target=start_worker, daemon=True).start()
+    # Run queue workers + beat in background threads
+    start_workers()
     threading.Thread(target=start_beat, daemon=True).start()
 
     # Run a dummy server (keeps container alive)
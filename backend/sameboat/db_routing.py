@@ -0,0 +1,155 @@
+"""
+Read-replica routing.
+
+Reads go to the "replica" database only inside a replica_scope() where
+use_replica() was called: JobViewSet does that for safe-method requests once
+the user is authenticated. Everything else (writes, other views, Celery
+tasks) stays on the primary. Even then the primary is used when:
+  * no replica is configured (DATABASE_REPLICA_URL unset),
+  * the replica can't be reached or lags more than DATABASE_REPLICA_MAX_LAG
+    (checked at most every DATABASE_REPLICA_CHECK_INTERVAL per process),
+  * the user wrote something in the last DATABASE_REPLICA_PIN_SECONDS, so
+    they read their own writes (the pin is a Redis key set by
+    ReadYourWritesMiddleware).
+"""
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from sameboat.services.local_cache import LocalTTLCache
+
+logger = logging.getLogger(__name__)
+
+REPLICA_ALIAS = "replica"
+PIN_PREFIX = "db:primary_pin:"
+
+_scope = ContextVar("replica_scope", default=None)
+_replica_health = LocalTTLCache(maxsize=1, ttl=settings.DATABASE_REPLICA_CHECK_INTERVAL)
+
+# Seconds the standby is behind; 0 when it has replayed everything it received
+# (an idle primary otherwise looks like lag), NULL on a server that isn't a standby
+LAG_QUERY = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def replica_lag():
+    """Replication lag of the replica in seconds (0 for a plain copy such as a second SQLite file)."""
+    with connections[REPLICA_ALIAS].cursor() as cursor:
+        # Also fails on an empty database, e.g. a SQLite file that was never copied
+        cursor.execute("SELECT 1 FROM django_migrations LIMIT 1")
+        if connections[REPLICA_ALIAS].vendor != "postgresql":
+            return 0.0
+        cursor.execute(LAG_QUERY)
+        lag = cursor.fetchone()[0]
+    return float(lag or 0)
+
+
+def replica_available():
+    """Whether reads may go to the replica right now (cached per process)."""
+    if not replica_configured():
+        return False
+    healthy = _replica_health.get(REPLICA_ALIAS)
+    if healthy is not None:
+        return healthy
+
+    try:
+        lag = replica_lag()
+        healthy = lag <= settings.DATABASE_REPLICA_MAX_LAG
+        if not healthy:
+            logger.warning("Replica is %.1fs behind; reading from the primary", lag)
+    except Exception as e:
+        logger.warning("Replica unavailable, reading from the primary: %s", e)
+        connections[REPLICA_ALIAS].close()
+        healthy = False
+    _replica_health.set(REPLICA_ALIAS, healthy)
+    return healthy
+
+
+def pin_to_primary(user_id):
+    """Send the user's reads to the primary for the next DATABASE_REPLICA_PIN_SECONDS."""
+    if not replica_configured():
+        return
+    try:
+        cache.set(f"{PIN_PREFIX}{user_id}", 1, settings.DATABASE_REPLICA_PIN_SECONDS)
+    except Exception as e:
+        logger.warning("Could not pin %s to the primary: %s", user_id, e)
+
+
+def is_pinned(user_id):
+    if not replica_configured():
+        return False
+    try:
+        return cache.get(f"{PIN_PREFIX}{user_id}") is not None
+    except Exception as e:
+        # Without the pin we can't promise read-your-writes: stay on the primary
+        logger.warning("Primary pin unavailable for %s: %s", user_id, e)
+        return True
+
+
+@contextmanager
+def replica_scope():
+    """A block (one request) whose reads start on the primary until use_replica() is called."""
+    token = _scope.set({"replica": False})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def use_replica():
+    """Send the rest of the current replica_scope()'s reads to the replica (no-op outside one)."""
+    scope = _scope.get()
+    if scope is not None:
+        scope["replica"] = True
+
+
+class ReplicaRouter:
+    """Sends reads after use_replica() to the replica; all writes to the primary."""
+
+    def db_for_read(self, model, **hints):
+        scope = _scope.get()
+        if scope is not None and scope["replica"] and replica_available():
+            return REPLICA_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Also for instances that were read from the replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same data on both sides
+        return {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA_ALIAS}
+
+
+class ReadYourWritesMiddleware:
+    """Pins users who made a successful write request to the primary for a short while."""
+
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        # DRF copies the token's user onto the Django request
+        user = getattr(request, "user", None)
+        if (
+            request.method not in self.SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        ):
+            pin_to_primary(user.pk)
+        return response
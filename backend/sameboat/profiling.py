@@ -0,0 +1,247 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when it sends an X-Profile header holding a token
+from `manage.py profiling_token`, or X-Profile: 1 from a staff user (admin
+session or JWT). The response then carries a Server-Timing header:
+
+    Server-Timing: db;dur=12.4;desc="7 queries", cache;dur=1.9;desc="5 calls",
+                   broker;dur=3.1;desc="1 published", total;dur=48.0
+
+With X-Profile-Flamegraph: 1 the request's thread is also sampled every
+REQUEST_PROFILING_SAMPLE_INTERVAL seconds and the stacks are written to
+REQUEST_PROFILING_DUMP_DIR in folded format (flamegraph.pl, speedscope);
+the file name comes back in X-Profile-Flamegraph.
+
+Requests without the header only pay for one META lookup: the Redis and
+Celery hooks are installed on the first profiled request, and the
+middleware removes itself when REQUEST_PROFILING is off.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from celery.signals import after_task_publish, before_task_publish
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from users.api.authentication import CachedJWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+FLAMEGRAPH_HEADER = "HTTP_X_PROFILE_FLAMEGRAPH"
+TOKEN_SALT = "sameboat.profiling"
+
+_current = ContextVar("request_profile", default=None)
+_hooks_lock = threading.Lock()
+_hooks_installed = False
+
+
+def make_token(label):
+    """A signed X-Profile value, valid for REQUEST_PROFILING_TOKEN_MAX_AGE."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(label)
+
+
+def check_token(value):
+    """The token's label, or None if it is forged or expired."""
+    try:
+        return signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            value, max_age=settings.REQUEST_PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return None
+
+
+class RequestProfile:
+    """Counters for one request; filled in by the DB wrapper and the Redis / Celery hooks."""
+
+    def __init__(self):
+        self.queries = Counter()
+        self.query_time = Counter()
+        self.cache_calls = 0
+        self.cache_time = 0.0
+        self.publishes = 0
+        self.publish_time = 0.0
+        self.publish_started = None
+        self.total = 0.0
+
+    def execute_wrapper(self, alias):
+        def wrapper(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.query_time[alias] += time.perf_counter() - started
+                self.queries[alias] += 1
+        return wrapper
+
+    def server_timing(self):
+        entries = []
+        for alias in sorted(self.queries):
+            name = "db" if alias == DEFAULT_DB_ALIAS else f"db-{alias}"
+            entries.append(f'{name};dur={self.query_time[alias] * 1000:.1f};desc="{self.queries[alias]} queries"')
+        entries.append(f'cache;dur={self.cache_time * 1000:.1f};desc="{self.cache_calls} calls"')
+        entries.append(f'broker;dur={self.publish_time * 1000:.1f};desc="{self.publishes} published"')
+        entries.append(f"total;dur={self.total * 1000:.1f}")
+        return ", ".join(entries)
+
+
+def _profiled(method):
+    """Wrap a redis-py method so calls made during a profiled request are timed."""
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        # Kombu talks to the Redis broker through redis-py too; that is broker time
+        if profile is None or profile.publish_started is not None:
+            return method(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            profile.cache_time += time.perf_counter() - started
+            profile.cache_calls += 1
+    wrapper.__wrapped__ = method
+    return wrapper
+
+
+def _before_publish(**kwargs):
+    profile = _current.get()
+    if profile is not None:
+        profile.publish_started = time.perf_counter()
+
+
+def _after_publish(**kwargs):
+    profile = _current.get()
+    if profile is not None and profile.publish_started is not None:
+        profile.publish_time += time.perf_counter() - profile.publish_started
+        profile.publishes += 1
+        profile.publish_started = None
+
+
+def install_hooks():
+    """Time Redis commands and Celery publishes from now on (only does work inside a profile)."""
+    global _hooks_installed
+    with _hooks_lock:
+        if _hooks_installed:
+            return
+        import redis.client
+
+        # A pipeline buffers its commands and sends them in execute(): one call
+        redis.client.Redis.execute_command = _profiled(redis.client.Redis.execute_command)
+        redis.client.Pipeline.execute = _profiled(redis.client.Pipeline.execute)
+        before_task_publish.connect(_before_publish, weak=False, dispatch_uid="profiling_before_publish")
+        after_task_publish.connect(_after_publish, weak=False, dispatch_uid="profiling_after_publish")
+        _hooks_installed = True
+
+
+class StackSampler:
+    """Samples one thread's stack on a timer and counts identical stacks (folded format)."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self.collapse(frame)] += 1
+
+    @staticmethod
+    def collapse(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def dump(self, request):
+        os.makedirs(settings.REQUEST_PROFILING_DUMP_DIR, exist_ok=True)
+        slug = request.path.strip("/").replace("/", "_")[:80] or "root"
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{slug}-{uuid.uuid4().hex[:8]}.folded"
+        with open(os.path.join(settings.REQUEST_PROFILING_DUMP_DIR, filename), "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return filename
+
+
+def profiling_allowed(request):
+    """A valid token in X-Profile, or a staff user (session or JWT) sending X-Profile: 1."""
+    value = request.META[PROFILE_HEADER]
+    if check_token(value) is not None:
+        return True
+    user = getattr(request, "user", None)
+    if user is not None and user.is_staff:
+        return True
+
+    try:
+        authenticated = CachedJWTAuthentication().authenticate(request)
+    except Exception:
+        return False
+    return authenticated is not None and authenticated[0].is_staff
+
+
+class ProfilingMiddleware:
+    """Adds Server-Timing (and optionally a flamegraph) to requests that ask for it."""
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if PROFILE_HEADER in request.META and profiling_allowed(request):
+            return self.profile(request)
+        return self.get_response(request)
+
+    def profile(self, request):
+        install_hooks()
+        profile = RequestProfile()
+        sampler = None
+        if request.META.get(FLAMEGRAPH_HEADER):
+            sampler = StackSampler(threading.get_ident(), settings.REQUEST_PROFILING_SAMPLE_INTERVAL)
+
+        token = _current.set(profile)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile.execute_wrapper(connection.alias)))
+                if sampler is not None:
+                    sampler.start()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if sampler is not None:
+                        sampler.stop()
+        finally:
+            profile.total = time.perf_counter() - started
+            _current.reset(token)
+
+        response["Server-Timing"] = profile.server_timing()
+        if sampler is not None:
+            try:
+                response["X-Profile-Flamegraph"] = sampler.dump(request)
+            except OSError as e:
+                logger.warning("Could not write flamegraph: %s", e)
+        logger.info("Profiled %s %s: %s", request.method, request.path, response["Server-Timing"])
+        return response
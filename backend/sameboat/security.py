@@ -18,38 +18,47 @@ def get_security_headers():
         'Referrer-Policy': 'strict-origin-when-cross-origin',
     }
 
-def validate_file_upload(file):
+# Allowed file types
+ALLOWED_UPLOAD_EXTENSIONS = ['.pdf', '.doc', '.docx', '.txt', '.jpg', '.jpeg', '.png', '.gif']
+ALLOWED_UPLOAD_MIME_TYPES = [
+    'application/pdf',
+    'application/msword',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'text/plain',
+    'image/jpeg',
+    'image/png',
+    'image/gif'
+]
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024  # 50MB
+
+
+def validate_upload_metadata(filename, content_type, size):
     """
-    Validate uploaded file for security.
+    Validate a file's name, MIME type and size before accepting its bytes
+    (used directly by resumable uploads, which only know the declared values).
     """
-    # Allowed file types
-    allowed_extensions = ['.pdf', '.doc', '.docx', '.txt', '.jpg', '.jpeg', '.png', '.gif']
-    allowed_mime_types = [
-        'application/pdf',
-        'application/msword',
-        'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-        'text/plain',
-        'image/jpeg',
-        'image/png',
-        'image/gif'
-    ]
-    
     # Check file extension
-    file_ext = os.path.splitext(file.name)[1].lower()
-    if file_ext not in allowed_extensions:
+    file_ext = os.path.splitext(filename)[1].lower()
+    if file_ext not in ALLOWED_UPLOAD_EXTENSIONS:
         return False, f"File type {file_ext} not allowed"
-    
+
     # Check MIME type
-    if hasattr(file, 'content_type') and file.content_type not in allowed_mime_types:
-        return False, f"MIME type {file.content_type} not allowed"
-    
+    if content_type is not None and content_type not in ALLOWED_UPLOAD_MIME_TYPES:
+        return False, f"MIME type {content_type} not allowed"
+
     # Check file size (50MB limit)
-    max_size = 50 * 1024 * 1024  # 50MB
-    if file.size > max_size:
-        return False, f"File size {file.size} exceeds limit of {max_size} bytes"
-    
+    if size > MAX_UPLOAD_SIZE:
+        return False, f"File size {size} exceeds limit of {MAX_UPLOAD_SIZE} bytes"
+
     return True, "File validation passed"
 
+
+def validate_file_upload(file):
+    """
+    Validate uploaded file for security.
+    """
+    return validate_upload_metadata(file.name, getattr(file, 'content_type', None), file.size)
+
 def sanitize_filename(filename):
     """
     Sanitize filename to prevent directory traversal attacks.
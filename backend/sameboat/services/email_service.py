@@ -0,0 +1,161 @@
+import json
+import logging
+import smtplib
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+# Redis list of emails waiting for the email workers (queue_email / send_outbox)
+OUTBOX_KEY = "email:outbox"
+
+
+class EmailTransientError(Exception):
+    """Sending failed with a 4xx reply, a dropped connection or a network error; safe to retry."""
+
+
+def is_transient(error):
+    """Whether a send failure is worth retrying. 5xx replies and refused recipients never are."""
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPException):
+        # SMTPRecipientsRefused, unsupported AUTH / STARTTLS, ...
+        return False
+    return isinstance(error, OSError)
+
+
+class EmailService:
+    """
+    Sends mail over one long-lived connection per worker process.
+
+    Opening an SMTP connection (connect + STARTTLS + AUTH) costs far more than
+    sending a message, so the connection is kept open between tasks, and
+    send_outbox sends whatever has queued up since the last batch in one go.
+    Idle connections are probed with NOOP and transparently reopened if the
+    server has dropped them. Failures worth retrying are raised as
+    EmailTransientError, anything else as the original exception.
+    """
+
+    def __init__(self, idle_timeout=None):
+        self.idle_timeout = (
+            settings.EMAIL_CONNECTION_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        )
+        self.connection = None
+        self.last_used = 0
+        self._lock = threading.Lock()
+
+    def _is_alive(self):
+        smtp = getattr(self.connection, "connection", None)
+        if smtp is None:
+            # non-SMTP backends (console, locmem) have nothing to keep alive
+            return self.connection is not None
+        if time.monotonic() - self.last_used < self.idle_timeout:
+            return True
+        try:
+            return smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _open(self):
+        self.close()
+        self.connection = get_connection(fail_silently=False)
+        self.connection.open()
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception as e:
+                logger.warning("Error closing email connection: %s", e)
+            self.connection = None
+
+    def send_messages(self, messages):
+        """Send a list of EmailMessage objects, reconnecting once if needed."""
+        with self._lock:
+            try:
+                if not self._is_alive():
+                    self._open()
+                try:
+                    sent = self.connection.send_messages(messages)
+                except smtplib.SMTPServerDisconnected:
+                    self._open()
+                    sent = self.connection.send_messages(messages)
+            except Exception as e:
+                # Start the next attempt (or task) from a fresh connection
+                self.close()
+                if is_transient(e):
+                    raise EmailTransientError(str(e)) from e
+                raise
+            self.last_used = time.monotonic()
+            return sent
+
+    def send(self, subject, message, recipient_list, from_email=None):
+        email = EmailMessage(
+            subject=subject,
+            body=message,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            to=recipient_list,
+        )
+        return self.send_messages([email])
+
+    def send_outbox(self, limit):
+        """
+        Send up to `limit` emails from the outbox back to back over the one
+        connection and return how many went out.
+
+        Each goes through its own send_messages() call, so a failure is
+        pinned on one message: on a transient one it and the rest of the
+        batch go back to the head of the outbox before EmailTransientError
+        is raised; a message failing permanently is dropped, the rest are
+        still sent, and the first such failure is raised afterwards.
+        """
+        redis = get_redis_connection("default")
+        payloads = redis.lpop(OUTBOX_KEY, limit) or []
+        sent, failure = 0, None
+        for index, payload in enumerate(payloads):
+            message = _decode(payload)
+            try:
+                sent += self.send_messages([message])
+            except EmailTransientError:
+                redis.lpush(OUTBOX_KEY, *reversed(payloads[index:]))
+                raise
+            except Exception as e:
+                logger.error("Dropped email to %s: %s", ", ".join(message.to), e)
+                failure = failure or e
+        if failure is not None:
+            raise failure
+        return sent
+
+
+def _decode(payload):
+    fields = json.loads(payload)
+    return EmailMessage(
+        subject=fields["subject"],
+        body=fields["message"],
+        from_email=fields["from_email"] or settings.DEFAULT_FROM_EMAIL,
+        to=fields["recipient_list"],
+    )
+
+
+def queue_email(subject, message, recipient_list, from_email=None):
+    """Add an email to the outbox; an email worker sends it with the next batch."""
+    get_redis_connection("default").rpush(OUTBOX_KEY, json.dumps({
+        "subject": subject, "message": message, "recipient_list": recipient_list, "from_email": from_email,
+    }))
+
+
+_email_service = None
+
+
+def get_email_service():
+    """Process-wide EmailService so the SMTP connection outlives a task."""
+    global _email_service
+    if _email_service is None:
+        _email_service = EmailService()
+    return _email_service
@@ -0,0 +1,108 @@
+"""
+Shrinks image attachments on the upload workers before they are stored:
+downsamples anything larger than IMAGE_MAX_DIMENSION, applies and drops
+the EXIF orientation, strips metadata (EXIF, GPS, XMP, comments; the ICC
+profile is kept) and re-encodes with the encoder's optimizations.
+
+The re-encode is what removes the metadata, so it is stored even when it
+comes out larger than the upload. Images that can't be re-encoded (not
+readable as JPEG, PNG or GIF, or over IMAGE_MAX_PIXELS) are rejected
+rather than stored with their metadata.
+
+Upload workers run a thread pool and Pillow releases the GIL while
+decoding and resampling, so images are optimized in place on those
+threads. A semaphore (IMAGE_OPTIMIZE_CONCURRENCY) caps how many are
+decoded at once per worker process, and IMAGE_MAX_PIXELS caps each one,
+which bounds the memory the stage can take.
+"""
+import io
+import logging
+import os
+import threading
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif"}
+
+# Pillow's own decompression bomb check, in line with ours in _optimize
+Image.MAX_IMAGE_PIXELS = settings.IMAGE_MAX_PIXELS
+
+_decode_slots = threading.BoundedSemaphore(settings.IMAGE_OPTIMIZE_CONCURRENCY)
+
+# Image.info entries the encoders would write back out
+METADATA_KEYS = ("exif", "xmp", "XML:com.adobe.xmp", "comment", "photoshop")
+
+
+class ImageRejected(ValueError):
+    """The image can't be stored without its metadata."""
+
+
+def is_image(filename):
+    return os.path.splitext(filename or "")[1].lower() in IMAGE_EXTENSIONS
+
+
+def should_optimize(filename, keep_original=False):
+    return settings.IMAGE_OPTIMIZATION_ENABLED and not keep_original and is_image(filename)
+
+
+def _encode(image, image_format, icc_profile):
+    out = io.BytesIO()
+    if image_format == "JPEG":
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(
+            out, "JPEG",
+            quality=settings.IMAGE_JPEG_QUALITY, optimize=True, progressive=True, icc_profile=icc_profile,
+        )
+    elif image_format == "PNG":
+        image.save(out, "PNG", optimize=True, icc_profile=icc_profile)
+    else:
+        image.save(out, "GIF", optimize=True)
+    return out.getvalue()
+
+
+def _strip_metadata(image):
+    for key in METADATA_KEYS:
+        image.info.pop(key, None)
+
+
+def _optimize(data):
+    max_side = settings.IMAGE_MAX_DIMENSION
+    with Image.open(io.BytesIO(data)) as image:
+        image_format = image.format
+        if image_format not in ("JPEG", "PNG", "GIF"):
+            raise ValueError(f"{image_format} image, expected JPEG, PNG or GIF")
+        if image.width * image.height > settings.IMAGE_MAX_PIXELS:
+            raise ValueError(f"{image.width}x{image.height} exceeds IMAGE_MAX_PIXELS")
+        if getattr(image, "is_animated", False):
+            # Frames are kept as they are; only the comment and XMP go
+            _strip_metadata(image)
+            out = io.BytesIO()
+            image.save(out, "GIF", save_all=True, optimize=True)
+            return out.getvalue()
+        icc_profile = image.info.get("icc_profile")
+        if image_format == "JPEG":
+            # Let libjpeg decode at 1/2, 1/4 or 1/8 scale: far less memory for big photos
+            image.draft(image.mode, (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        _strip_metadata(image)
+        if max(image.size) > max_side:
+            image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        return _encode(image, image_format, icc_profile)
+
+
+def optimize_image(data, filename):
+    """
+    Return the bytes of an image attachment re-encoded without metadata,
+    downsampled if needed. The format (and so the filename) is never
+    changed. Raises ImageRejected when the image can't be re-encoded.
+    """
+    with _decode_slots:
+        try:
+            return _optimize(data)
+        except (OSError, ValueError, SyntaxError, Image.DecompressionBombError) as e:
+            logger.warning("Rejected image %s: %s", filename, e)
+            raise ImageRejected(f"{filename} can't be stored: {e}") from e
@@ -0,0 +1,80 @@
+"""
+Short-lived presigned GET URLs for private documents, cached so a job list
+doesn't sign every attachment on every request.
+
+A URL is signed for PRESIGNED_URL_EXPIRY seconds and cached (per-process
+LRU -> Redis) for PRESIGNED_URL_EXPIRY - PRESIGNED_URL_MIN_VALIDITY, so
+every URL handed out stays valid for at least PRESIGNED_URL_MIN_VALIDITY
+seconds. The local TTL is capped to that margin as well.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from sameboat.services.local_cache import LocalTTLCache
+from sameboat.services.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+PRESIGNED_CACHE_PREFIX = "presigned:"
+
+CACHE_TTL = settings.PRESIGNED_URL_EXPIRY - settings.PRESIGNED_URL_MIN_VALIDITY
+
+_local_urls = LocalTTLCache(
+    maxsize=settings.PRESIGNED_URL_LOCAL_MAXSIZE,
+    ttl=min(settings.PRESIGNED_URL_LOCAL_TTL, settings.PRESIGNED_URL_MIN_VALIDITY),
+)
+
+
+def _cache_key(key):
+    return f"{PRESIGNED_CACHE_PREFIX}{key}"
+
+
+def presigned_urls(keys):
+    """Return {key: presigned GET URL} for the given object keys."""
+    keys = {key for key in keys if key}
+    urls = {}
+
+    missing = []
+    for key in keys:
+        url = _local_urls.get(key)
+        if url is None:
+            missing.append(key)
+        else:
+            urls[key] = url
+
+    if missing:
+        try:
+            cached = cache.get_many([_cache_key(key) for key in missing])
+        except Exception as e:
+            logger.warning("Presigned URL cache unavailable: %s", e)
+            cached = {}
+        to_sign = []
+        for key in missing:
+            url = cached.get(_cache_key(key))
+            if url is None:
+                to_sign.append(key)
+            else:
+                urls[key] = url
+                _local_urls.set(key, url)
+
+        if to_sign:
+            storage = get_storage()
+            signed = {
+                key: storage.presigned_url(key, expires_in=settings.PRESIGNED_URL_EXPIRY)
+                for key in to_sign
+            }
+            try:
+                cache.set_many({_cache_key(key): url for key, url in signed.items()}, CACHE_TTL)
+            except Exception as e:
+                logger.warning("Presigned URL cache unavailable: %s", e)
+            for key, url in signed.items():
+                urls[key] = url
+                _local_urls.set(key, url)
+
+    return urls
+
+
+def presigned_url(key):
+    return presigned_urls([key]).get(key)
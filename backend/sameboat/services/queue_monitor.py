@@ -0,0 +1,82 @@
+import logging
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+from sameboat.services.local_cache import LocalTTLCache
+
+logger = logging.getLogger(__name__)
+
+_stats_cache = LocalTTLCache(maxsize=1, ttl=settings.QUEUE_STATS_CACHE_TTL)
+
+
+def task_queue_names():
+    names = []
+    for queues in settings.TASK_QUEUE_WORKERS:
+        names.extend(queues.split(","))
+    return names
+
+
+def get_queue_stats():
+    """
+    Broker queue depths and Redis memory usage in one pipelined round trip.
+    The Redis transport keeps each Celery queue as a list named after it.
+    """
+    redis = get_redis_connection("default")
+    names = task_queue_names()
+    pipe = redis.pipeline(transaction=False)
+    for name in names:
+        pipe.llen(name)
+    pipe.info("memory")
+    *depths, memory = pipe.execute(raise_on_error=False)
+
+    for depth in depths:
+        if isinstance(depth, Exception):
+            raise depth
+    if isinstance(memory, Exception):
+        # Some managed Redis plans restrict INFO; queue depth still counts
+        logger.warning("Redis memory stats unavailable: %s", memory)
+        memory = {}
+
+    used = memory.get("used_memory", 0)
+    maxmemory = memory.get("maxmemory", 0)
+    return {
+        "queues": dict(zip(names, depths)),
+        "redis_memory": {
+            "used": used,
+            "max": maxmemory,
+            # maxmemory 0 means "no limit"
+            "ratio": used / maxmemory if maxmemory else 0,
+        },
+    }
+
+
+def get_cached_queue_stats():
+    """get_queue_stats(), reused for QUEUE_STATS_CACHE_TTL seconds per process."""
+    stats = _stats_cache.get("stats")
+    if stats is None:
+        stats = get_queue_stats()
+        _stats_cache.set("stats", stats)
+    return stats
+
+
+def upload_backpressure():
+    """
+    Return a reason string if new attachment uploads should be shed, else None.
+    Fails open: if the stats can't be read, uploads are accepted.
+    """
+    try:
+        stats = get_cached_queue_stats()
+    except Exception as e:
+        logger.warning("Queue stats unavailable, not shedding uploads: %s", e)
+        return None
+
+    depth = stats["queues"].get("uploads", 0)
+    if depth >= settings.UPLOAD_QUEUE_MAX_DEPTH:
+        return f"upload queue depth {depth} >= {settings.UPLOAD_QUEUE_MAX_DEPTH}"
+
+    ratio = stats["redis_memory"]["ratio"]
+    if ratio >= settings.UPLOAD_REDIS_MAX_MEMORY_RATIO:
+        return f"redis memory at {ratio:.0%}"
+
+    return None
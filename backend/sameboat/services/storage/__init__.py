@@ -0,0 +1,35 @@
+"""
+Document storage backends, chosen by DOCUMENT_STORAGE_BACKEND:
+"s3" (S3Storage, the default), "local" (LocalStorage) or a dotted path to
+a StorageBackend subclass.
+"""
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from sameboat.services.storage.base import (
+    MultipartUploadGone, StorageBackend, StorageError, StorageTransientError, StoredObject,
+)
+
+BACKENDS = {
+    "s3": "sameboat.services.storage.s3.S3Storage",
+    "local": "sameboat.services.storage.local.LocalStorage",
+}
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """
+    Process-wide storage backend. Built once: creating a boto3 client costs
+    far more than most requests made with it.
+    """
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                backend = settings.DOCUMENT_STORAGE_BACKEND
+                _storage = import_string(BACKENDS.get(backend, backend))()
+    return _storage
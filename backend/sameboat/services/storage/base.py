@@ -0,0 +1,93 @@
+from collections import namedtuple
+
+# One entry from StorageBackend.list_prefix()
+StoredObject = namedtuple("StoredObject", ["key", "size", "last_modified"])
+
+
+class StorageError(Exception):
+    """A storage request failed and retrying will not help."""
+
+
+class StorageTransientError(StorageError):
+    """A storage request failed because of throttling, a 5xx or the network; safe to retry."""
+
+
+class MultipartUploadGone(StorageError):
+    """The multipart upload no longer exists: already completed, or aborted."""
+
+
+class StorageBackend:
+    """
+    Where document objects live. Keys are "/"-separated paths such as
+    user_uploads/<user_id>/blobs/<sha256>. Implementations raise
+    StorageTransientError for failures worth retrying, StorageError otherwise.
+    """
+
+    def url(self, key):
+        """Permanent (unsigned) URL stored on the job row."""
+        raise NotImplementedError
+
+    def save(self, file_obj, key, filename=None, checksum=None):
+        """
+        Store a file-like object at `key` and return its URL. With a sha256
+        `checksum` the call is idempotent: content already at `key` isn't sent again.
+        """
+        raise NotImplementedError
+
+    def save_path(self, local_path, key, filename=None, checksum=None):
+        with open(local_path, "rb") as file_obj:
+            return self.save(file_obj, key, filename or local_path, checksum)
+
+    def has_checksum(self, key, checksum):
+        """True if `key` already holds content with this sha256 checksum."""
+        raise NotImplementedError
+
+    def sha256(self, key):
+        """Return (sha256 hex digest, size in bytes) of a stored object."""
+        raise NotImplementedError
+
+    def read(self, key):
+        """Return the whole object as bytes."""
+        raise NotImplementedError
+
+    def size(self, key):
+        """Size in bytes of the object at `key`, or None if there is none."""
+        raise NotImplementedError
+
+    def copy(self, source_key, key, filename=None, checksum=None):
+        raise NotImplementedError
+
+    def create_multipart(self, key, filename=None):
+        """Start a multipart upload; returns its upload id."""
+        raise NotImplementedError
+
+    def upload_part(self, key, upload_id, part_number, data):
+        """Store one part; returns its ETag."""
+        raise NotImplementedError
+
+    def complete_multipart(self, key, upload_id, parts):
+        """
+        Assemble parts ([{"PartNumber", "ETag"}, ...]) into the object; returns
+        its URL. Raises MultipartUploadGone if the upload no longer exists.
+        """
+        raise NotImplementedError
+
+    def abort_multipart(self, key, upload_id):
+        """Discard a multipart upload; returns False if it no longer exists."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.delete(key)
+        return True
+
+    def presigned_url(self, key, expires_in=3600):
+        """Temporary URL granting read access to `key` for `expires_in` seconds."""
+        raise NotImplementedError
+
+    def list_prefix(self, prefix):
+        """Yield a StoredObject for every object whose key starts with `prefix`."""
+        raise NotImplementedError
@@ -0,0 +1,199 @@
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+
+from sameboat.services.storage.base import MultipartUploadGone, StorageBackend, StorageError, StoredObject
+
+MULTIPART_DIR = ".multipart"
+SIGNING_SALT = "sameboat.local-storage"
+
+
+def _sendfile(source, destination):
+    """
+    Copy one open file into another, in the kernel with os.sendfile where
+    the platform allows it. Returns the number of bytes copied.
+    """
+    if hasattr(os, "sendfile"):
+        try:
+            in_fd, out_fd = source.fileno(), destination.fileno()
+        except (AttributeError, OSError, ValueError):
+            pass
+        else:
+            destination.flush()
+            offset = source.tell()
+            total = 0
+            while True:
+                sent = os.sendfile(out_fd, in_fd, offset + total, 1024 * 1024 * 64)
+                if sent == 0:
+                    break
+                total += sent
+            source.seek(offset + total)
+            return total
+
+    # In-memory uploads: write the buffer without an intermediate copy
+    if hasattr(source, "getbuffer"):
+        view = source.getbuffer()[source.tell():]
+        destination.write(view)
+        source.seek(0, os.SEEK_END)
+        return len(view)
+
+    before = destination.tell()
+    shutil.copyfileobj(source, destination, 1024 * 1024)
+    return destination.tell() - before
+
+
+def _file_sha256(path):
+    """sha256 of a file, hashed straight from an mmap of it."""
+    digest = hashlib.sha256()
+    size = os.path.getsize(path)
+    if size:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            digest.update(mapped)
+    return digest.hexdigest(), size
+
+
+class LocalStorage(StorageBackend):
+    """
+    Documents on the local disk under LOCAL_STORAGE_ROOT, for development,
+    tests and offline benchmarks. Writes go to a temp file that is renamed
+    into place, so readers never see a partial object. Presigned URLs are
+    signed with SECRET_KEY and served by the local_document view.
+    """
+
+    def __init__(self, root=None, base_url=None):
+        self.root = os.path.abspath(root or settings.LOCAL_STORAGE_ROOT)
+        self.base_url = base_url or settings.LOCAL_STORAGE_URL
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise StorageError(f"Key {key!r} is outside the storage root")
+        return path
+
+    def url(self, key):
+        return f"{self.base_url}{quote(key)}"
+
+    def _write(self, key, write):
+        """Run write(tmp_file) and atomically move the result to `key`."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                write(tmp_file)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return self.url(key)
+
+    def has_checksum(self, key, checksum):
+        path = self.path(key)
+        return os.path.exists(path) and _file_sha256(path)[0] == checksum
+
+    def save(self, file_obj, key, filename=None, checksum=None):
+        if checksum and self.has_checksum(key, checksum):
+            return self.url(key)
+        return self._write(key, lambda tmp_file: _sendfile(file_obj, tmp_file))
+
+    def sha256(self, key):
+        try:
+            return _file_sha256(self.path(key))
+        except FileNotFoundError as e:
+            raise StorageError(f"No object at {key}") from e
+
+    def size(self, key):
+        try:
+            return os.path.getsize(self.path(key))
+        except FileNotFoundError:
+            return None
+
+    def read(self, key):
+        try:
+            with open(self.path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError as e:
+            raise StorageError(f"No object at {key}") from e
+
+    def copy(self, source_key, key, filename=None, checksum=None):
+        with open(self.path(source_key), "rb") as source:
+            return self._write(key, lambda tmp_file: _sendfile(source, tmp_file))
+
+    def _parts_dir(self, upload_id):
+        return os.path.join(self.root, MULTIPART_DIR, upload_id)
+
+    def create_multipart(self, key, filename=None):
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self._parts_dir(upload_id))
+        return upload_id
+
+    def upload_part(self, key, upload_id, part_number, data):
+        part_path = os.path.join(self._parts_dir(upload_id), f"{part_number:05d}")
+        with open(part_path, "wb") as part:
+            part.write(data)
+        return hashlib.md5(data).hexdigest()
+
+    def complete_multipart(self, key, upload_id, parts):
+        parts_dir = self._parts_dir(upload_id)
+        if not os.path.isdir(parts_dir):
+            raise MultipartUploadGone(f"No multipart upload {upload_id}")
+
+        def concatenate(tmp_file):
+            for part in sorted(parts, key=lambda part: part["PartNumber"]):
+                with open(os.path.join(parts_dir, f"{part['PartNumber']:05d}"), "rb") as source:
+                    _sendfile(source, tmp_file)
+
+        url = self._write(key, concatenate)
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        return url
+
+    def abort_multipart(self, key, upload_id):
+        parts_dir = self._parts_dir(upload_id)
+        if not os.path.isdir(parts_dir):
+            return False
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        return True
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+        return True
+
+    def presigned_url(self, key, expires_in=3600):
+        token = signing.dumps({"key": key, "exp": int(time.time()) + expires_in}, salt=SIGNING_SALT)
+        return f"{self.url(key)}?token={token}"
+
+    def verify_presigned(self, key, token):
+        """True if `token` came from presigned_url(key) and hasn't expired."""
+        try:
+            payload = signing.loads(token, salt=SIGNING_SALT)
+        except signing.BadSignature:
+            return False
+        return payload.get("key") == key and payload.get("exp", 0) >= time.time()
+
+    def list_prefix(self, prefix):
+        # Walk the deepest directory the prefix names, filter on the rest
+        start = os.path.join(self.root, os.path.dirname(prefix))
+        for dirpath, dirnames, filenames in os.walk(start):
+            dirnames[:] = sorted(d for d in dirnames if d != MULTIPART_DIR)
+            for filename in sorted(filenames):
+                if filename.startswith(".tmp-"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    stat = os.stat(path)
+                    yield StoredObject(key, stat.st_size, datetime.fromtimestamp(stat.st_mtime, timezone.utc))
@@ -0,0 +1,273 @@
+import boto3
+import hashlib
+import mimetypes
+from boto3.exceptions import S3UploadFailedError
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, HTTPClientError
+from django.conf import settings
+
+from sameboat.services.storage.base import (
+    MultipartUploadGone, StorageBackend, StorageError, StorageTransientError, StoredObject,
+)
+from sameboat.services.token_bucket import AdaptiveTokenBucket
+
+# Error codes S3 uses to ask clients to slow down
+THROTTLE_ERROR_CODES = {"SlowDown", "Throttling", "ThrottlingException", "RequestLimitExceeded", "503"}
+TRANSIENT_ERROR_CODES = THROTTLE_ERROR_CODES | {"RequestTimeout", "InternalError", "ServiceUnavailable", "500"}
+NOT_FOUND_ERROR_CODES = {"404", "NoSuchKey", "NotFound"}
+
+
+class S3Storage(StorageBackend):
+    """Documents in the AWS_STORAGE_BUCKET_NAME bucket, through boto3."""
+
+    def __init__(self):
+        # Validate AWS settings
+        if not settings.AWS_ACCESS_KEY_ID:
+            raise ValueError("AWS_ACCESS_KEY_ID is not configured")
+        if not settings.AWS_SECRET_ACCESS_KEY:
+            raise ValueError("AWS_SECRET_ACCESS_KEY is not configured")
+        if not settings.AWS_STORAGE_BUCKET_NAME:
+            raise ValueError("AWS_STORAGE_BUCKET_NAME is not configured")
+        if not settings.AWS_S3_REGION_NAME:
+            raise ValueError("AWS_S3_REGION_NAME is not configured")
+            
+        self.client = boto3.client(
+            "s3",
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            region_name=settings.AWS_S3_REGION_NAME,
+            # Keep botocore's own retries short; tasks retry with backoff instead
+            config=Config(retries={"mode": "standard", "max_attempts": 2}),
+        )
+        self.bucket = settings.AWS_STORAGE_BUCKET_NAME
+        # Request budget shared by every worker, halved on SlowDown responses
+        self.request_budget = AdaptiveTokenBucket(
+            "s3",
+            max_rate=settings.S3_MAX_REQUEST_RATE,
+            min_rate=settings.S3_MIN_REQUEST_RATE,
+            recovery_per_sec=settings.S3_REQUEST_RATE_RECOVERY,
+        )
+
+    def _translate_error(self, action, error):
+        """Map boto errors to StorageTransientError / StorageError, feeding throttles to the budget."""
+        if isinstance(error, S3UploadFailedError) and isinstance(error.__context__, ClientError):
+            error = error.__context__
+        if isinstance(error, (BotoConnectionError, HTTPClientError)):
+            return StorageTransientError(f"S3 {action} failed: {error}")
+        if isinstance(error, ClientError):
+            code = error.response.get("Error", {}).get("Code")
+            status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0
+            if code in THROTTLE_ERROR_CODES or status == 503:
+                self.request_budget.throttled()
+                return StorageTransientError(f"S3 {action} throttled: {error}")
+            if code in TRANSIENT_ERROR_CODES or status >= 500:
+                return StorageTransientError(f"S3 {action} failed: {error}")
+        return StorageError(f"S3 {action} failed: {error}")
+
+    def _call(self, action, func, *args, **kwargs):
+        """Run one S3 request inside the shared request budget."""
+        self.request_budget.acquire()
+        try:
+            return func(*args, **kwargs)
+        except (ClientError, S3UploadFailedError, BotoConnectionError, HTTPClientError) as e:
+            raise self._translate_error(action, e) from e
+
+    def url(self, key):
+        return f"https://{self.bucket}.s3.{settings.AWS_S3_REGION_NAME}.amazonaws.com/{key}"
+
+    def has_checksum(self, key, checksum):
+        """True if `key` already holds an object uploaded with this sha256 checksum."""
+        try:
+            head = self._call("head", self.client.head_object, Bucket=self.bucket, Key=key)
+        except StorageError as e:
+            cause = e.__cause__
+            if isinstance(cause, ClientError) and cause.response.get("Error", {}).get("Code") in NOT_FOUND_ERROR_CODES:
+                return False
+            raise
+        return head.get("Metadata", {}).get("sha256") == checksum
+
+    def size(self, key):
+        """Content length of `key`, or None if there is no such object."""
+        try:
+            head = self._call("head", self.client.head_object, Bucket=self.bucket, Key=key)
+        except StorageError as e:
+            cause = e.__cause__
+            if isinstance(cause, ClientError) and cause.response.get("Error", {}).get("Code") in NOT_FOUND_ERROR_CODES:
+                return None
+            raise
+        return head["ContentLength"]
+
+    def save(self, file_obj, key, filename=None, checksum=None):
+        """
+        Upload file object directly to S3 without saving locally first.
+        With a sha256 `checksum` the upload is idempotent: if the key already
+        holds that content (e.g. a retried task) nothing is transferred.
+        """
+        if checksum and self.has_checksum(key, checksum):
+            return self.url(key)
+
+        # Auto-detect MIME type from filename
+        if filename:
+            content_type, _ = mimetypes.guess_type(filename)
+        else:
+            content_type = "application/octet-stream"
+
+        content_type = content_type or "application/octet-stream"
+
+        extra_args = {
+            "ContentType": content_type,
+            "ContentDisposition": "inline",
+        }
+        if checksum:
+            extra_args["Metadata"] = {"sha256": checksum}
+
+        self._call("upload", self.client.upload_fileobj, file_obj, self.bucket, key, ExtraArgs=extra_args)
+        return self.url(key)
+
+    def sha256(self, key):
+        """Stream an object and return (sha256 hex digest, size in bytes)"""
+        response = self._call("download", self.client.get_object, Bucket=self.bucket, Key=key)
+        digest, size = hashlib.sha256(), 0
+        try:
+            for chunk in response["Body"].iter_chunks(1024 * 1024):
+                digest.update(chunk)
+                size += len(chunk)
+        except (BotoConnectionError, HTTPClientError) as e:
+            raise StorageTransientError(f"S3 download failed: {e}") from e
+        return digest.hexdigest(), size
+
+    def read(self, key):
+        response = self._call("download", self.client.get_object, Bucket=self.bucket, Key=key)
+        try:
+            return response["Body"].read()
+        except (BotoConnectionError, HTTPClientError) as e:
+            raise StorageTransientError(f"S3 download failed: {e}") from e
+
+    def copy(self, source_key, key, filename=None, checksum=None):
+        """Server-side copy (objects up to 5 GB), tagging the copy with its sha256"""
+        content_type, _ = mimetypes.guess_type(filename or key)
+        extra_args = {
+            "ContentType": content_type or "application/octet-stream",
+            "ContentDisposition": "inline",
+            "MetadataDirective": "REPLACE",
+            "Metadata": {"sha256": checksum} if checksum else {},
+        }
+        self._call(
+            "copy",
+            self.client.copy_object,
+            Bucket=self.bucket,
+            Key=key,
+            CopySource={"Bucket": self.bucket, "Key": source_key},
+            **extra_args,
+        )
+        return self.url(key)
+
+    def create_multipart(self, key, filename=None):
+        """Start a multipart upload; returns its UploadId"""
+        content_type, _ = mimetypes.guess_type(filename or key)
+        response = self._call(
+            "multipart create",
+            self.client.create_multipart_upload,
+            Bucket=self.bucket,
+            Key=key,
+            ContentType=content_type or "application/octet-stream",
+            ContentDisposition="inline",
+        )
+        return response["UploadId"]
+
+    def upload_part(self, key, upload_id, part_number, data):
+        """Upload one part (>= 5 MB except the last); returns its ETag"""
+        response = self._call(
+            "multipart part",
+            self.client.upload_part,
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=data,
+        )
+        return response["ETag"]
+
+    def complete_multipart(self, key, upload_id, parts):
+        """Assemble uploaded parts ([{"PartNumber", "ETag"}, ...]) into the object"""
+        try:
+            self._call(
+                "multipart complete",
+                self.client.complete_multipart_upload,
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": sorted(parts, key=lambda part: part["PartNumber"])},
+            )
+        except StorageError as e:
+            cause = e.__cause__
+            if isinstance(cause, ClientError) and cause.response.get("Error", {}).get("Code") == "NoSuchUpload":
+                raise MultipartUploadGone(str(e)) from cause
+            raise
+        return self.url(key)
+
+    def abort_multipart(self, key, upload_id):
+        """Discard a multipart upload and the parts stored for it"""
+        try:
+            self._call(
+                "multipart abort",
+                self.client.abort_multipart_upload,
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+            )
+        except StorageError as e:
+            cause = e.__cause__
+            if isinstance(cause, ClientError) and cause.response.get("Error", {}).get("Code") == "NoSuchUpload":
+                return False
+            raise
+        return True
+
+    def delete(self, key):
+        """Delete file from S3"""
+        self._call("delete", self.client.delete_object, Bucket=self.bucket, Key=key)
+        return True
+
+    def delete_many(self, keys):
+        """Delete many files from S3, up to 1000 keys per request"""
+        for start in range(0, len(keys), 1000):
+            batch = keys[start:start + 1000]
+            response = self._call(
+                "delete",
+                self.client.delete_objects,
+                Bucket=self.bucket,
+                Delete={
+                    "Objects": [{"Key": key} for key in batch],
+                    "Quiet": True,
+                },
+            )
+            errors = response.get("Errors")
+            if errors:
+                error = StorageTransientError if any(
+                    e.get("Code") in TRANSIENT_ERROR_CODES for e in errors
+                ) else StorageError
+                raise error(f"S3 batch delete failed for {len(errors)} keys: {errors[0]}")
+        return True
+
+    def presigned_url(self, key, expires_in=3600):
+        """Generate a presigned URL"""
+        try:
+            return self.client.generate_presigned_url(
+                "get_object",
+                Params={"Bucket": self.bucket, "Key": key},
+                ExpiresIn=expires_in,
+            )
+        except ClientError as e:
+            raise StorageError(f"S3 presigned URL failed: {e}")
+
+    def list_prefix(self, prefix):
+        """List objects under a prefix, 1000 keys per request"""
+        paginator = self.client.get_paginator("list_objects_v2")
+        pages = iter(paginator.paginate(Bucket=self.bucket, Prefix=prefix))
+        while True:
+            try:
+                page = self._call("list", next, pages)
+            except StopIteration:
+                return
+            for item in page.get("Contents", []):
+                yield StoredObject(item["Key"], item["Size"], item["LastModified"])
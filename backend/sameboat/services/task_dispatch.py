@@ -0,0 +1,68 @@
+from celery import current_app
+from django.db import transaction
+
+
+def publish(signatures):
+    """Publish task signatures over a single producer from the broker pool."""
+    if not signatures:
+        return
+    app = current_app
+    if app.conf.task_always_eager:
+        for signature in signatures:
+            signature.apply_async()
+        return
+    with app.producer_or_acquire() as producer:
+        for signature in signatures:
+            signature.apply_async(producer=producer)
+
+
+class TaskDispatchBuffer:
+    """Task signatures collected during one transaction and published on commit."""
+
+    def __init__(self):
+        self.signatures = []
+        self.prepares = {}
+
+    def add(self, signature, prepare=None):
+        if prepare is not None:
+            self.prepares[id(signature)] = prepare
+        self.signatures.append(signature)
+
+    def is_registered(self, connection):
+        # Rolled-back transactions drop their on_commit callbacks (and with
+        # them this buffer), so a fresh buffer is needed next time.
+        return any(entry[1] == self.flush for entry in connection.run_on_commit)
+
+    def flush(self):
+        signatures, self.signatures = self.signatures, []
+        prepares, self.prepares = self.prepares, {}
+        publish([
+            prepares[id(signature)](signature) if id(signature) in prepares else signature
+            for signature in signatures
+        ])
+
+
+def dispatch(signature, using=None, prepare=None):
+    """
+    Queue a Celery signature to be sent once the current transaction commits.
+
+    Every task dispatched while a request's transaction is open is published
+    together in one on_commit hook, so workers never see rows that aren't
+    committed yet and the request pays for one broker connection instead of
+    one per task. Outside a transaction the signature is published right away.
+
+    `prepare(signature)`, if given, runs just before publishing and returns
+    the signature to send: for arguments that must only be claimed once the
+    write is durable (upload generations, users.uploads).
+    """
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        publish([prepare(signature) if prepare is not None else signature])
+        return
+
+    buffer = getattr(connection, "task_dispatch_buffer", None)
+    if buffer is None or not buffer.is_registered(connection):
+        buffer = TaskDispatchBuffer()
+        connection.task_dispatch_buffer = buffer
+        transaction.on_commit(buffer.flush, using=using)
+    buffer.add(signature, prepare)
@@ -0,0 +1,89 @@
+"""
+Plain text from uploaded documents (PDF, DOCX, TXT), for job search.
+
+Runs inside the extract_document_text task on the prefork "documents"
+worker, whose soft time limit bounds how long one document may take.
+"""
+import io
+import re
+import zipfile
+from xml.etree import ElementTree
+
+from django.conf import settings
+from pypdf import PdfReader
+
+PDF_TYPES = {"application/pdf"}
+DOCX_TYPES = {"application/vnd.openxmlformats-officedocument.wordprocessingml.document"}
+TEXT_TYPES = {"text/plain"}
+
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+class ExtractionError(Exception):
+    """The document couldn't be parsed; retrying won't help."""
+
+
+def is_supported(content_type):
+    return content_type in PDF_TYPES | DOCX_TYPES | TEXT_TYPES
+
+
+def _pdf_text(data):
+    reader = PdfReader(io.BytesIO(data))
+    pages = reader.pages[:settings.DOCUMENT_TEXT_MAX_PAGES]
+    return "\n".join(page.extract_text() or "" for page in pages)
+
+
+def _docx_text(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        try:
+            info = archive.getinfo("word/document.xml")
+        except KeyError:
+            raise ExtractionError("Not a Word document: word/document.xml missing")
+        # Refuse zip bombs before inflating
+        if info.file_size > settings.DOCUMENT_TEXT_MAX_XML_SIZE:
+            raise ExtractionError(f"word/document.xml is {info.file_size} bytes uncompressed")
+        root = ElementTree.fromstring(archive.read(info))
+
+    paragraphs = []
+    for paragraph in root.iter(f"{WORD_NAMESPACE}p"):
+        runs = []
+        for node in paragraph.iter():
+            if node.tag == f"{WORD_NAMESPACE}t" and node.text:
+                runs.append(node.text)
+            elif node.tag == f"{WORD_NAMESPACE}tab":
+                runs.append("\t")
+        paragraphs.append("".join(runs))
+    return "\n".join(paragraphs)
+
+
+def _plain_text(data):
+    return data.decode("utf-8", errors="replace")
+
+
+def extract_text(data, content_type):
+    """
+    Return the text of a document, whitespace-collapsed and capped at
+    DOCUMENT_TEXT_MAX_CHARS. Raises ExtractionError for unsupported or
+    corrupt files.
+    """
+    if content_type in PDF_TYPES:
+        extract = _pdf_text
+    elif content_type in DOCX_TYPES:
+        extract = _docx_text
+    elif content_type in TEXT_TYPES:
+        extract = _plain_text
+    else:
+        raise ExtractionError(f"No text extractor for {content_type or 'unknown type'}")
+
+    try:
+        text = extract(data)
+    except ExtractionError:
+        raise
+    except Exception as e:
+        # pypdf / zipfile / XML errors on malformed uploads
+        raise ExtractionError(f"Could not parse document: {e}") from e
+
+    # Postgres text columns reject NUL bytes
+    text = re.sub(r"[ \t\r\f\v]+", " ", text.replace("\x00", ""))
+    text = re.sub(r"\n\s*\n+", "\n", text).strip()
+    return text[:settings.DOCUMENT_TEXT_MAX_CHARS]
@@ -0,0 +1,102 @@
+import logging
+import time
+
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1]: bucket hash {tokens, ts, rate}
+# ARGV: now_ms, max_rate, min_rate, recovery_per_sec, burst, mode
+# mode "acquire" reserves one token and returns how long to wait for it;
+# mode "throttle" halves the rate (multiplicative decrease). The rate creeps
+# back towards max_rate by recovery_per_sec every second (additive increase).
+# Returns {wait_ms, rate_millis}.
+ADAPTIVE_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local max_rate = tonumber(ARGV[2])
+local min_rate = tonumber(ARGV[3])
+local recovery = tonumber(ARGV[4])
+local burst = tonumber(ARGV[5])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'rate')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+local rate = tonumber(state[3]) or max_rate
+local elapsed = math.max(0, now - ts) / 1000
+
+rate = math.min(max_rate, rate + recovery * elapsed)
+tokens = math.min(burst, tokens + elapsed * rate)
+
+local wait = 0
+if ARGV[6] == 'throttle' then
+    rate = math.max(min_rate, rate / 2)
+    tokens = math.min(tokens, 0)
+else
+    tokens = tokens - 1
+    if tokens < 0 then
+        wait = math.ceil(-tokens / rate * 1000)
+    end
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now, 'rate', rate)
+redis.call('PEXPIRE', KEYS[1], 3600000)
+return {wait, math.floor(rate * 1000)}
+"""
+
+
+class AdaptiveTokenBucket:
+    """
+    Request budget shared by every worker through Redis.
+
+    Each call to acquire() takes one token, sleeping if the bucket is empty.
+    When the remote service signals throttling, throttled() halves the
+    shared rate so all workers back off together; the rate then recovers
+    linearly. If Redis is unavailable requests are not limited.
+    """
+
+    _script = None
+
+    def __init__(self, name, max_rate, min_rate=1, recovery_per_sec=1, burst=None):
+        self.key = f"tokenbucket:{name}"
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.recovery_per_sec = recovery_per_sec
+        self.burst = burst or max_rate
+
+    def _run(self, mode):
+        redis = get_redis_connection("default")
+        if AdaptiveTokenBucket._script is None:
+            AdaptiveTokenBucket._script = redis.register_script(ADAPTIVE_BUCKET_SCRIPT)
+        wait_ms, rate_millis = AdaptiveTokenBucket._script(
+            keys=[self.key],
+            args=[
+                int(time.time() * 1000),
+                self.max_rate,
+                self.min_rate,
+                self.recovery_per_sec,
+                self.burst,
+                mode,
+            ],
+            client=redis,
+        )
+        return int(wait_ms) / 1000, int(rate_millis) / 1000
+
+    def acquire(self):
+        """Take a token, blocking until it is available. Returns seconds waited."""
+        try:
+            wait, _ = self._run("acquire")
+        except Exception as e:
+            logger.warning("Token bucket %s unavailable: %s", self.key, e)
+            return 0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def throttled(self):
+        """Record a throttling response; returns the new shared rate."""
+        try:
+            _, rate = self._run("throttle")
+        except Exception as e:
+            logger.warning("Token bucket %s unavailable: %s", self.key, e)
+            return None
+        logger.warning("Throttled by remote service, %s rate now %.2f req/s", self.key, rate)
+        return rate
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import copy
 import os
 from datetime import timedelta
 from dotenv import load_dotenv
@@ -77,6 +78,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'sameboat.profiling.ProfilingMiddleware',
+    'sameboat.db_routing.ReadYourWritesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -99,6 +102,8 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'x-profile',
+    'x-profile-flamegraph',
 ]
 
 # CSRF Trusted Origins for production
@@ -128,20 +133,99 @@ WSGI_APPLICATION = 'sameboat.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-print(os.getenv("DATABASE_URL"))
+# Connection reuse: either persistent connections (kept DATABASE_CONN_MAX_AGE
+# seconds, pinged before reuse when health checks are on) or psycopg 3's
+# connection pool. Under ASGI a connection belongs to the request's context
+# and isn't reused by the next request, so Django advises against persistent
+# connections there: the web service uses the pool, the Celery workers (one
+# thread per task slot) use persistent connections.
+DATABASE_CONN_MAX_AGE = int(os.getenv("DATABASE_CONN_MAX_AGE", "60"))
+DATABASE_CONN_HEALTH_CHECKS = os.getenv("DATABASE_CONN_HEALTH_CHECKS", "True") == "True"
+DATABASE_POOL = os.getenv("DATABASE_POOL", "False") == "True"
+DATABASE_POOL_MIN_SIZE = int(os.getenv("DATABASE_POOL_MIN_SIZE", "2"))
+DATABASE_POOL_MAX_SIZE = int(os.getenv("DATABASE_POOL_MAX_SIZE", "10"))
+DATABASE_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", "10"))  # seconds waiting for a free connection
+DATABASE_POOL_MAX_IDLE = float(os.getenv("DATABASE_POOL_MAX_IDLE", "300"))  # seconds before idle connections close
+
+# Server-side limits (milliseconds, 0 = off), so a runaway query or an
+# abandoned transaction can't hold a connection and its locks forever
+DATABASE_CONNECT_TIMEOUT = int(os.getenv("DATABASE_CONNECT_TIMEOUT", "5"))  # seconds
+DATABASE_STATEMENT_TIMEOUT = int(os.getenv("DATABASE_STATEMENT_TIMEOUT", "30000"))
+DATABASE_IDLE_IN_TRANSACTION_TIMEOUT = int(os.getenv("DATABASE_IDLE_IN_TRANSACTION_TIMEOUT", "60000"))
+DATABASE_LOCK_TIMEOUT = int(os.getenv("DATABASE_LOCK_TIMEOUT", "10000"))
+
+
+def add_server_limits(database):
+    """Add the limits above to a Postgres database, keeping OPTIONS from its URL (sslmode, ...)."""
+    options = database.setdefault("OPTIONS", {})
+    options.setdefault("connect_timeout", DATABASE_CONNECT_TIMEOUT)
+    limits = (
+        f"-c statement_timeout={DATABASE_STATEMENT_TIMEOUT}"
+        f" -c idle_in_transaction_session_timeout={DATABASE_IDLE_IN_TRANSACTION_TIMEOUT}"
+        f" -c lock_timeout={DATABASE_LOCK_TIMEOUT}"
+    )
+    options["options"] = f"{options['options']} {limits}" if options.get("options") else limits
+
 
-# Database
 if ENVIRONMENT == "local":
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            "CONN_MAX_AGE": DATABASE_CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": DATABASE_CONN_HEALTH_CHECKS,
         }
     }
 else:  # production/staging
     DATABASES = {
-        "default": dj_database_url.parse(os.getenv("DATABASE_URL"))
+        "default": dj_database_url.parse(
+            os.getenv("DATABASE_URL"),
+            # Django refuses persistent connections on top of the pool
+            conn_max_age=0 if DATABASE_POOL else DATABASE_CONN_MAX_AGE,
+            conn_health_checks=DATABASE_CONN_HEALTH_CHECKS,
+        )
     }
+    add_server_limits(DATABASES["default"])
+    if DATABASE_POOL:
+        # Django also has the pool check each connection before handing it out
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": DATABASE_POOL_MIN_SIZE,
+            "max_size": DATABASE_POOL_MAX_SIZE,
+            "timeout": DATABASE_POOL_TIMEOUT,
+            "max_idle": DATABASE_POOL_MAX_IDLE,
+        }
+
+# Read replica for JobViewSet's safe-method requests (see sameboat/db_routing.py).
+# Unset = everything reads from the primary. Locally a second SQLite file works:
+# DATABASE_REPLICA_URL=sqlite:///db-replica.sqlite3
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL", "")
+DATABASE_REPLICA_MAX_LAG = float(os.getenv("DATABASE_REPLICA_MAX_LAG", "5"))  # seconds behind before falling back
+DATABASE_REPLICA_CHECK_INTERVAL = float(os.getenv("DATABASE_REPLICA_CHECK_INTERVAL", "10"))  # seconds between lag checks
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv("DATABASE_REPLICA_PIN_SECONDS", "15"))  # primary-only reads after a write
+
+if DATABASE_REPLICA_URL:
+    DATABASES["replica"] = dj_database_url.parse(
+        DATABASE_REPLICA_URL,
+        conn_max_age=DATABASES["default"]["CONN_MAX_AGE"],
+        conn_health_checks=DATABASE_CONN_HEALTH_CHECKS,
+    )
+    if DATABASES["replica"]["ENGINE"] == DATABASES["default"]["ENGINE"] and ENVIRONMENT != "local":
+        add_server_limits(DATABASES["replica"])
+        if DATABASE_POOL:
+            DATABASES["replica"]["OPTIONS"]["pool"] = copy.deepcopy(DATABASES["default"]["OPTIONS"]["pool"])
+    # Tests read the replica through the test database instead of creating a second one
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+
+DATABASE_ROUTERS = ["sameboat.db_routing.ReplicaRouter"]
+
+# Per-request profiling (see sameboat/profiling.py): Server-Timing for requests
+# sending X-Profile with a token from `manage.py profiling_token` (or X-Profile: 1
+# from a staff user). Off by default: enable with REQUEST_PROFILING=True; off,
+# the middleware is dropped entirely.
+REQUEST_PROFILING = os.getenv("REQUEST_PROFILING", "False") == "True"
+REQUEST_PROFILING_TOKEN_MAX_AGE = int(os.getenv("REQUEST_PROFILING_TOKEN_MAX_AGE", "3600"))  # seconds a token stays valid
+REQUEST_PROFILING_DUMP_DIR = os.getenv("REQUEST_PROFILING_DUMP_DIR", os.path.join(BASE_DIR, "profiles"))  # flamegraph files
+REQUEST_PROFILING_SAMPLE_INTERVAL = float(os.getenv("REQUEST_PROFILING_SAMPLE_INTERVAL", "0.002"))  # seconds between samples
 
 
 
@@ -202,12 +286,27 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.api.authentication.CachedJWTAuthentication',
     ),
 
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+
+    # Sliding-window limits for the anonymous auth endpoints (users.api.throttling)
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.getenv("THROTTLE_LOGIN_IP", "20/min"),
+        'login_email': os.getenv("THROTTLE_LOGIN_EMAIL", "5/min"),
+        'register_ip': os.getenv("THROTTLE_REGISTER_IP", "5/hour"),
+        'register_email': os.getenv("THROTTLE_REGISTER_EMAIL", "3/hour"),
+        'password_reset_ip': os.getenv("THROTTLE_PASSWORD_RESET_IP", "10/hour"),
+        'password_reset_email': os.getenv("THROTTLE_PASSWORD_RESET_EMAIL", "3/hour"),
+    },
+
+    # Reverse proxies in front of the app (1 on Render). The client IP used by
+    # the throttles is the entry that many hops from the end of X-Forwarded-For;
+    # 0 ignores the header, which a client can set to anything.
+    'NUM_PROXIES': int(os.getenv("NUM_PROXIES", "0")),
 }
 
 
@@ -231,9 +330,19 @@ JWT_REFRESH_COOKIE_SECURE = ENVIRONMENT == "production"
 JWT_REFRESH_COOKIE_HTTPONLY = True
 JWT_REFRESH_COOKIE_PATH = "/"
 
+# Expired outstanding/blacklisted tokens are deleted in batches of this size
+TOKEN_BLACKLIST_PRUNE_BATCH_SIZE = int(os.getenv("TOKEN_BLACKLIST_PRUNE_BATCH_SIZE", 1000))
+# Redis answers blacklist checks for this long after each warm-up (prune runs hourly)
+TOKEN_BLACKLIST_CACHE_READY_TTL = int(os.getenv("TOKEN_BLACKLIST_CACHE_READY_TTL", 2 * 3600))
+
 
 AUTH_USER_MODEL = 'users.Users'
 
+# Cached user lookup for JWT-authenticated requests (seconds)
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", 60))
+AUTH_USER_CACHE_LOCAL_TTL = int(os.getenv("AUTH_USER_CACHE_LOCAL_TTL", 5))
+AUTH_USER_CACHE_LOCAL_MAXSIZE = int(os.getenv("AUTH_USER_CACHE_LOCAL_MAXSIZE", 1024))
+
 
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
@@ -242,6 +351,8 @@ CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
+# Publishers share pooled broker connections (see sameboat.services.task_dispatch)
+CELERY_BROKER_POOL_LIMIT = int(os.getenv("CELERY_BROKER_POOL_LIMIT", 10))
 
 # Celery Configuration for Render
 CELERY_TASK_ALWAYS_EAGER = False
@@ -257,14 +368,127 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'users.tasks.heartbeat_task',
         'schedule': 60.0,  # Run every 60 seconds
     },
+    'prune-token-blacklist': {
+        'task': 'users.tasks.prune_token_blacklist',
+        'schedule': 3600.0,  # Run hourly
+    },
+    'cleanup-upload-sessions': {
+        'task': 'users.tasks.cleanup_upload_sessions',
+        'schedule': 3600.0,  # Run hourly
+    },
+    'reconcile-storage': {
+        'task': 'users.tasks.reconcile_storage_task',
+        'schedule': 86400.0,  # Run daily
+    },
 }
 
+# Celery Task Routing
+CELERY_TASK_DEFAULT_QUEUE = 'celery'
+CELERY_TASK_ROUTES = {
+    'users.tasks.upload_file_to_s3': {'queue': 'uploads'},
+    'users.tasks.upload_file_obj_to_s3': {'queue': 'uploads'},
+    'users.tasks.adopt_uploaded_object': {'queue': 'uploads'},
+    'users.tasks.extract_document_text': {'queue': 'documents'},
+    'users.tasks.delete_from_s3_task': {'queue': 'deletes'},
+    'users.tasks.delete_many_from_s3_task': {'queue': 'deletes'},
+    'users.tasks.send_email_task': {'queue': 'email'},
+    'users.tasks.heartbeat_task': {'queue': 'maintenance'},
+    'users.tasks.prune_token_blacklist': {'queue': 'maintenance'},
+    'users.tasks.cleanup_upload_sessions': {'queue': 'maintenance'},
+    'users.tasks.reconcile_storage_task': {'queue': 'maintenance'},
+    'users.tasks.delete_account': {'queue': 'maintenance'},
+}
+
+# One worker per queue group (celery_for_render.py on Render, one Procfile
+# entry each elsewhere; keep both in step with this): threads for the
+# I/O-bound S3/SMTP work, prefork for CPU-bound and maintenance tasks.
+TASK_QUEUE_WORKERS = {
+    'uploads': {
+        'pool': os.getenv('CELERY_UPLOADS_POOL', 'threads'),
+        'concurrency': int(os.getenv('CELERY_UPLOADS_CONCURRENCY', 8)),
+    },
+    'deletes': {
+        'pool': os.getenv('CELERY_DELETES_POOL', 'threads'),
+        'concurrency': int(os.getenv('CELERY_DELETES_CONCURRENCY', 4)),
+    },
+    'email': {
+        'pool': os.getenv('CELERY_EMAIL_POOL', 'threads'),
+        'concurrency': int(os.getenv('CELERY_EMAIL_CONCURRENCY', 2)),
+    },
+    'documents': {
+        'pool': os.getenv('CELERY_DOCUMENTS_POOL', 'prefork'),
+        'concurrency': int(os.getenv('CELERY_DOCUMENTS_CONCURRENCY', 2)),
+    },
+    'maintenance,celery': {
+        'pool': os.getenv('CELERY_MAINTENANCE_POOL', 'prefork'),
+        'concurrency': int(os.getenv('CELERY_MAINTENANCE_CONCURRENCY', 2)),
+    },
+}
+
+# Backpressure: shed new attachment uploads once the uploads queue or Redis
+# memory passes these thresholds. Mode "reject" returns 503 + Retry-After,
+# "degrade" saves the job without its attachment.
+QUEUE_STATS_CACHE_TTL = int(os.getenv("QUEUE_STATS_CACHE_TTL", 5))
+UPLOAD_QUEUE_MAX_DEPTH = int(os.getenv("UPLOAD_QUEUE_MAX_DEPTH", 200))
+UPLOAD_REDIS_MAX_MEMORY_RATIO = float(os.getenv("UPLOAD_REDIS_MAX_MEMORY_RATIO", 0.8))
+UPLOAD_BACKPRESSURE_MODE = os.getenv("UPLOAD_BACKPRESSURE_MODE", "reject")
+UPLOAD_BACKPRESSURE_RETRY_AFTER = int(os.getenv("UPLOAD_BACKPRESSURE_RETRY_AFTER", 30))
+
+# Orphaned object reconciliation (users.reconcile): objects newer than the
+# grace period are left alone; the daily beat run can be made report-only
+STORAGE_RECONCILE_GRACE_SECONDS = int(os.getenv("STORAGE_RECONCILE_GRACE_SECONDS", 24 * 3600))
+STORAGE_RECONCILE_BATCH_SIZE = int(os.getenv("STORAGE_RECONCILE_BATCH_SIZE", 1000))
+STORAGE_RECONCILE_DRY_RUN = os.getenv("STORAGE_RECONCILE_DRY_RUN", "False") == "True"
+
+# Account deletion (users.account_deletion): jobs deleted per transaction,
+# and storage keys per delete_many_from_s3_task message
+ACCOUNT_DELETE_CHUNK_SIZE = int(os.getenv("ACCOUNT_DELETE_CHUNK_SIZE", 500))
+ACCOUNT_DELETE_STORAGE_BATCH_SIZE = int(os.getenv("ACCOUNT_DELETE_STORAGE_BATCH_SIZE", 1000))
+# How long an account deletion's progress can be looked up
+ACCOUNT_DELETE_STATUS_TTL = int(os.getenv("ACCOUNT_DELETE_STATUS_TTL", 24 * 3600))
+
+# Image attachment optimization on the upload workers
+# (sameboat.services.image_optimizer); clients can opt out per upload with keep_original
+IMAGE_OPTIMIZATION_ENABLED = os.getenv("IMAGE_OPTIMIZATION_ENABLED", "True") == "True"
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", 2560))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", 85))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", 50_000_000))
+IMAGE_OPTIMIZE_CONCURRENCY = int(os.getenv("IMAGE_OPTIMIZE_CONCURRENCY", 2))
+
+# Resume text extraction (users.tasks.extract_document_text): per-document
+# time limit, and size caps on what is parsed and stored
+DOCUMENT_TEXT_TIMEOUT = int(os.getenv("DOCUMENT_TEXT_TIMEOUT", 30))
+DOCUMENT_TEXT_MAX_FILE_SIZE = int(os.getenv("DOCUMENT_TEXT_MAX_FILE_SIZE", 20 * 1024 * 1024))
+DOCUMENT_TEXT_MAX_PAGES = int(os.getenv("DOCUMENT_TEXT_MAX_PAGES", 50))
+DOCUMENT_TEXT_MAX_XML_SIZE = int(os.getenv("DOCUMENT_TEXT_MAX_XML_SIZE", 50 * 1024 * 1024))
+DOCUMENT_TEXT_MAX_CHARS = int(os.getenv("DOCUMENT_TEXT_MAX_CHARS", 200_000))
+
+# Resume-to-job matching (users.matching): per-user index cache lifetime in
+# Redis and per process, and result limits for /jobs/match/
+JOB_MATCH_CACHE_TTL = int(os.getenv("JOB_MATCH_CACHE_TTL", 24 * 3600))
+JOB_MATCH_LOCAL_TTL = int(os.getenv("JOB_MATCH_LOCAL_TTL", 30))
+JOB_MATCH_LOCAL_MAXSIZE = int(os.getenv("JOB_MATCH_LOCAL_MAXSIZE", 256))
+JOB_MATCH_DEFAULT_LIMIT = int(os.getenv("JOB_MATCH_DEFAULT_LIMIT", 20))
+JOB_MATCH_MAX_LIMIT = int(os.getenv("JOB_MATCH_MAX_LIMIT", 200))
+
+# Upload status SSE stream: keepalive comment interval and max connection length
+UPLOAD_STREAM_KEEPALIVE_SECONDS = int(os.getenv("UPLOAD_STREAM_KEEPALIVE_SECONDS", 15))
+UPLOAD_STREAM_MAX_SECONDS = int(os.getenv("UPLOAD_STREAM_MAX_SECONDS", 300))
+
+# Resumable uploads: "S3" maps chunks onto multipart parts (>= 5 MB each),
+# "LOCAL" spools them on disk for a worker that shares the filesystem.
+UPLOAD_SESSION_BACKEND = os.getenv("UPLOAD_SESSION_BACKEND", "S3")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 5 * 1024 * 1024))
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", 24 * 3600))  # idle seconds before cleanup
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", os.path.join(BASE_DIR, "upload_spool"))
+
 # Celery Timezone
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_ENABLE_UTC = True
 
 # Celery Worker Configuration for Render
-CELERY_WORKER_CONCURRENCY = 1
+# Default for a single `celery worker`; per-queue values live in TASK_QUEUE_WORKERS
+CELERY_WORKER_CONCURRENCY = int(os.getenv("CELERY_WORKER_CONCURRENCY", 4))
 CELERY_WORKER_LOG_FORMAT = '[%(asctime)s: %(levelname)s/%(processName)s] %(message)s'
 CELERY_WORKER_TASK_LOG_FORMAT = '[%(asctime)s: %(levelname)s/%(processName)s][%(task_name)s(%(task_id)s)] %(message)s'
 
@@ -286,13 +510,20 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 
 # Email
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# Override with e.g. django.core.mail.backends.console.EmailBackend, or point
+# EMAIL_HOST/EMAIL_PORT at a local SMTP stand-in (python -m aiosmtpd -n) in dev.
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
 EMAIL_HOST = os.getenv("EMAIL_HOST")
 EMAIL_PORT = int(os.getenv("EMAIL_PORT", 587))
 EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "True") == "True"
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", 30))
+# Workers keep their SMTP connection open; probe it with NOOP after this many idle seconds
+EMAIL_CONNECTION_IDLE_TIMEOUT = int(os.getenv("EMAIL_CONNECTION_IDLE_TIMEOUT", 60))
+# Most emails one send_email_task takes from the outbox and sends together
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", 50))
 
 # AWS S3
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
@@ -305,6 +536,37 @@ AWS_QUERYSTRING_AUTH = False
 AWS_S3_ADDRESSING_STYLE = "virtual"
 AWS_S3_FILE_OVERWRITE = False
 
+# Where documents are stored: "s3" (AWS_STORAGE_BUCKET_NAME) or "local"
+# (LOCAL_STORAGE_ROOT, served at LOCAL_STORAGE_URL; for development,
+# tests and offline benchmarks).
+DOCUMENT_STORAGE_BACKEND = os.getenv("DOCUMENT_STORAGE_BACKEND", "s3")
+LOCAL_STORAGE_ROOT = os.getenv("LOCAL_STORAGE_ROOT", os.path.join(MEDIA_ROOT, "documents"))
+LOCAL_STORAGE_URL = os.getenv("LOCAL_STORAGE_URL", MEDIA_URL + "documents/")
+
+# Documents are served through short-lived presigned GET URLs so the bucket
+# can stay private. Signatures are cached (per-process, then Redis) until
+# only PRESIGNED_URL_MIN_VALIDITY seconds of validity are left.
+PRESIGNED_DOCUMENT_URLS = os.getenv("PRESIGNED_DOCUMENT_URLS", "True") == "True"
+PRESIGNED_URL_EXPIRY = int(os.getenv("PRESIGNED_URL_EXPIRY", 3600))
+PRESIGNED_URL_MIN_VALIDITY = int(os.getenv("PRESIGNED_URL_MIN_VALIDITY", 600))
+PRESIGNED_URL_LOCAL_TTL = int(os.getenv("PRESIGNED_URL_LOCAL_TTL", 60))
+PRESIGNED_URL_LOCAL_MAXSIZE = int(os.getenv("PRESIGNED_URL_LOCAL_MAXSIZE", 4096))
+
+# S3 request budget shared by all workers (requests/second). Halved on
+# SlowDown/503 responses and recovers by S3_REQUEST_RATE_RECOVERY each second.
+S3_MAX_REQUEST_RATE = float(os.getenv("S3_MAX_REQUEST_RATE", 50))
+S3_MIN_REQUEST_RATE = float(os.getenv("S3_MIN_REQUEST_RATE", 1))
+S3_REQUEST_RATE_RECOVERY = float(os.getenv("S3_REQUEST_RATE_RECOVERY", 1))
+
+# Celery retries for transient S3 failures (jittered exponential backoff, seconds)
+S3_TASK_MAX_RETRIES = int(os.getenv("S3_TASK_MAX_RETRIES", 8))
+S3_TASK_RETRY_BACKOFF = int(os.getenv("S3_TASK_RETRY_BACKOFF", 2))
+S3_TASK_RETRY_BACKOFF_MAX = int(os.getenv("S3_TASK_RETRY_BACKOFF_MAX", 600))
+
+# Lock held while a content-addressed blob is stored or deleted (seconds).
+# Outlives the longest expected transfer; an expired lock is simply reacquired.
+BLOB_LOCK_TIMEOUT = int(os.getenv("BLOB_LOCK_TIMEOUT", 900))
+
 
 # File upload limits
 FILE_UPLOAD_MAX_MEMORY_SIZE = 52428800   # 50 MB per file
@@ -0,0 +1,85 @@
+"""
+Account deletion for users with many jobs, run by the delete_account task.
+
+Deleting a Users row through the ORM loads every job to cascade and fires
+post_delete per job and attachment: one broker message per file. Instead:
+
+  1. the user is deactivated by the API view, so nothing new is added;
+  2. upload sessions are discarded (multipart uploads aborted);
+  3. the storage keys of every job URL and every blob the user owns are
+     collected by streaming values_list queries;
+  4. rows are deleted in chunks with raw DELETEs (no instances, no
+     signals), children first since the cascade is emulated here;
+  5. the keys are handed to delete_many_from_s3_task in batches of
+     STORAGE_DELETE_BATCH_SIZE, once the rows are gone.
+
+Blobs are per user, so every object the user owns can go at once.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+from users import matching
+from users.documents import is_blob_key
+from users.models import DocumentBlob, DocumentReference, Jobs, UploadSession, Users
+from users.upload_sessions import discard_session
+from users.uploads import UPLOAD_FIELDS, extract_key
+
+logger = logging.getLogger(__name__)
+
+
+def collect_storage_keys(user_id, chunk_size=None):
+    """Every storage key the user's jobs and blobs point at."""
+    chunk_size = chunk_size or settings.ACCOUNT_DELETE_CHUNK_SIZE
+    keys = set(
+        DocumentBlob.objects.filter(user_id=user_id).values_list("key", flat=True).iterator(chunk_size=chunk_size)
+    )
+    jobs = Jobs.objects.filter(user_id=user_id).values_list(*UPLOAD_FIELDS)
+    for urls in jobs.iterator(chunk_size=chunk_size):
+        for url in urls:
+            key = extract_key(url)
+            # Blob keys are covered above, even for blobs no job references
+            if key and not is_blob_key(key):
+                keys.add(key)
+    return sorted(keys)
+
+
+def discard_upload_sessions(user_id):
+    for session in UploadSession.objects.filter(user_id=user_id).iterator():
+        try:
+            discard_session(session)
+        except Exception as e:
+            # The row goes with the user anyway; the reconciler collects the leftovers
+            logger.warning("Could not discard upload session %s: %s", session.pk, e)
+
+
+def delete_job_rows(user_id, chunk_size=None, progress=None):
+    """
+    Delete the user's jobs and their document references in chunks, each in
+    its own transaction. Calls progress(deleted) after every chunk.
+    Returns the number of jobs deleted.
+    """
+    chunk_size = chunk_size or settings.ACCOUNT_DELETE_CHUNK_SIZE
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            job_ids = list(Jobs.objects.filter(user_id=user_id).values_list("pk", flat=True)[:chunk_size])
+            if not job_ids:
+                break
+            DocumentReference.objects.filter(job_id__in=job_ids)._raw_delete(using="default")
+            UploadSession.objects.filter(job_id__in=job_ids)._raw_delete(using="default")
+            Jobs.objects.filter(pk__in=job_ids)._raw_delete(using="default")
+        deleted += len(job_ids)
+        if progress is not None:
+            progress(deleted)
+    return deleted
+
+
+def delete_user_rows(user_id):
+    """Delete the user's blobs, then the user (its remaining relations are small)."""
+    with transaction.atomic():
+        DocumentReference.objects.filter(blob__user_id=user_id)._raw_delete(using="default")
+        DocumentBlob.objects.filter(user_id=user_id)._raw_delete(using="default")
+        Users.objects.filter(pk=user_id).delete()
+    matching.forget_index(user_id)
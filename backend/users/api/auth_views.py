@@ -1,13 +1,27 @@
+import logging
+
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.serializers import TokenRefreshSerializer
-from rest_framework_simplejwt.tokens import RefreshToken, TokenError
+from rest_framework_simplejwt.tokens import TokenError
+from rest_framework_simplejwt.exceptions import InvalidToken
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from celery.result import AsyncResult
 
-from users.api.serializers import MyTokenObtainPairSerializer, UserPasswordResetLinkSerializer, UserPasswordResetConfirmSerializer
+from users.api.serializers import MyTokenObtainPairSerializer, CookieTokenRefreshSerializer, UserPasswordResetLinkSerializer, UserPasswordResetConfirmSerializer
+from users.api.tokens import CachedBlacklistRefreshToken
+from users.api.throttling import LoginRateThrottle, PasswordResetRateThrottle
 from users.api.utils import set_refresh_cookie, clear_refresh_cookie
+from users.models import Users
+from users.tasks import delete_account
+from sameboat.services.task_dispatch import dispatch
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_DELETION_PREFIX = "account_deletion:"
 
 
 
@@ -15,6 +29,7 @@ from users.api.utils import set_refresh_cookie, clear_refresh_cookie
 class UserLoginView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [LoginRateThrottle]
 
     def post(self, request, *args, **kwargs):
         # (Optional) enforce CSRF if you're using cookie-based flows
@@ -43,8 +58,12 @@ class UserRefreshFromCookieView(APIView):
         if not refresh_cookie:
             return Response({"detail": "No refresh cookie"}, status=status.HTTP_401_UNAUTHORIZED)
 
-        serializer = TokenRefreshSerializer(data={'refresh': refresh_cookie})
-        serializer.is_valid(raise_exception=True)
+        serializer = CookieTokenRefreshSerializer(data={'refresh': refresh_cookie})
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            # expired / blacklisted (already rotated) refresh token
+            raise InvalidToken(e.args[0])
         data = serializer.validated_data
 
         response = Response({"access": data["access"]}, status=status.HTTP_200_OK)
@@ -66,7 +85,7 @@ class UserLogoutView(APIView):
 
         if refresh_cookie:
             try:
-                token = RefreshToken(refresh_cookie)
+                token = CachedBlacklistRefreshToken(refresh_cookie)
                 token.blacklist() 
             except TokenError:
                 # invalid/already-blacklisted: still clear the cookie
@@ -80,6 +99,7 @@ class UserLogoutView(APIView):
 
 class UserPasswordSendResetLinkView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [PasswordResetRateThrottle]
 
     def post(self, request):
         serializer = UserPasswordResetLinkSerializer(data=request.data)
@@ -101,3 +121,72 @@ class UserResetPasswordView(APIView):
         serializer.save()
 
         return Response({"message": "Password reset successful"})
+
+
+class UserAccountDeleteView(APIView):
+    """
+    DELETE /account with {"password"}: deactivate the account right away and
+    delete it with its jobs and files in the background. The response's
+    status_url reports progress without authentication (the account is gone
+    by the time it finishes).
+    """
+
+    def delete(self, request):
+        # The cached request.user has no password hash
+        user = Users.objects.get(pk=request.user.pk)
+        if not user.check_password(request.data.get("password", "")):
+            return Response({"detail": "Password is incorrect"}, status=status.HTTP_400_BAD_REQUEST)
+
+        signature = delete_account.s(str(user.pk))
+        task_id = signature.freeze().id
+        with transaction.atomic():
+            # Locks the user out (the user cache is dropped on commit)
+            user.is_active = False
+            user.save(update_fields=["is_active", "updated_at"])
+            dispatch(signature)
+        try:
+            cache.set(f"{ACCOUNT_DELETION_PREFIX}{task_id}", str(user.pk), settings.ACCOUNT_DELETE_STATUS_TTL)
+        except Exception as e:
+            # Deletion still runs; only its progress can't be looked up
+            logger.warning("Could not record account deletion %s: %s", task_id, e)
+
+        response = Response(
+            {
+                "message": "Account deletion started",
+                "task_id": task_id,
+                "status_url": request.build_absolute_uri(f"/api/v1/account/deletion/{task_id}"),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+        refresh_cookie = request.COOKIES.get(settings.JWT_REFRESH_COOKIE_NAME)
+        if refresh_cookie:
+            try:
+                CachedBlacklistRefreshToken(refresh_cookie).blacklist()
+            except TokenError:
+                pass
+        clear_refresh_cookie(response)
+        return response
+
+
+class AccountDeletionStatusView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, task_id):
+        task_id = str(task_id)
+        try:
+            known = cache.get(f"{ACCOUNT_DELETION_PREFIX}{task_id}") is not None
+        except Exception as e:
+            logger.warning("Account deletion status unavailable: %s", e)
+            known = False
+        if not known:
+            return Response({"detail": "Unknown account deletion"}, status=status.HTTP_404_NOT_FOUND)
+
+        result = AsyncResult(task_id)
+        data = {"task_id": task_id, "state": result.state}
+        if result.state == "PROGRESS":
+            data["progress"] = result.info
+        elif result.state == "SUCCESS":
+            data["result"] = result.result
+        elif result.state == "FAILURE":
+            data["error"] = str(result.result)
+        return Response(data)
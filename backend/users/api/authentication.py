@@ -0,0 +1,88 @@
+import copy
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from sameboat.services.local_cache import LocalTTLCache
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_PREFIX = "auth:user:"
+
+# First level: per-process LRU. Second level: the shared Redis cache.
+_local_users = LocalTTLCache(
+    maxsize=settings.AUTH_USER_CACHE_LOCAL_MAXSIZE,
+    ttl=settings.AUTH_USER_CACHE_LOCAL_TTL,
+)
+
+
+def _cache_key(user_id):
+    return f"{USER_CACHE_PREFIX}{user_id}"
+
+
+def invalidate_cached_user(user_id):
+    """Drop a user from both cache levels (called on save / delete)."""
+    key = _cache_key(user_id)
+    _local_users.delete(key)
+    try:
+        cache.delete(key)
+    except Exception as e:
+        logger.warning("Could not invalidate cached user %s: %s", user_id, e)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user from a short-TTL
+    two-level cache (in-process LRU -> Redis) before falling back to the DB.
+    The password hash is left out of the cached row; the few views that need
+    it (check_password) load it from the DB on access.
+    """
+
+    def get_cached_user(self, user_id):
+        key = _cache_key(user_id)
+
+        user = _local_users.get(key)
+        if user is not None:
+            return copy.copy(user)
+
+        try:
+            user = cache.get(key)
+        except Exception as e:
+            logger.warning("User cache unavailable: %s", e)
+            user = None
+
+        if user is None:
+            user = self.user_model.objects.defer("password").get(**{api_settings.USER_ID_FIELD: user_id})
+            try:
+                cache.set(key, user, settings.AUTH_USER_CACHE_TTL)
+            except Exception as e:
+                logger.warning("User cache unavailable: %s", e)
+
+        _local_users.set(key, user)
+        return copy.copy(user)
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        try:
+            user = self.get_cached_user(user_id)
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
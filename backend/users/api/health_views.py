@@ -6,6 +6,8 @@ import os
 import psutil
 import time
 from celery import current_app
+from users.api.throttling import get_rate_limit_stats
+from sameboat.services.queue_monitor import get_queue_stats
 
 def health_check(request):
     """
@@ -33,7 +35,15 @@ def health_check(request):
     except Exception as e:
         health_status["checks"]["database"] = f"error: {str(e)}"
         health_status["status"] = "unhealthy"
-    
+
+    # Connection pool usage (requests_waiting > 0 means DATABASE_POOL_MAX_SIZE is too small)
+    try:
+        pool = getattr(connection, "pool", None)
+        if pool is not None:
+            health_status["database_pool"] = pool.get_stats()
+    except Exception as e:
+        health_status["database_pool"] = {"error": str(e)}
+
     # Check Redis
     try:
         cache.set('health_check', 'ok', 10)
@@ -57,6 +67,12 @@ def health_check(request):
     except Exception as e:
         health_status["checks"]["celery"] = f"error: {str(e)}"
         # Don't mark as unhealthy for Celery issues in web service
+
+    # Broker queue depths (uploads are shed when these back up)
+    try:
+        health_status["queues"] = get_queue_stats()
+    except Exception as e:
+        health_status["queues"] = {"error": str(e)}
     
     # System metrics
     try:
@@ -117,6 +133,7 @@ def celery_health_check(request):
             "workers": len(stats) if stats else 0,
             "active_tasks": sum(len(tasks) for tasks in active_tasks.values()) if active_tasks else 0,
             "scheduled_tasks": sum(len(tasks) for tasks in scheduled_tasks.values()) if scheduled_tasks else 0,
+            "queues": get_queue_stats(),
         }
         
         if not stats:
@@ -132,3 +149,20 @@ def celery_health_check(request):
             "timestamp": time.time(),
             "error": str(e)
         }, status=503)
+
+def rate_limit_stats(request):
+    """
+    Allowed/blocked counters for the auth rate limiters, for tuning limits
+    """
+    try:
+        return JsonResponse({
+            "status": "ok",
+            "timestamp": time.time(),
+            "counters": get_rate_limit_stats(),
+        }, status=200)
+    except Exception as e:
+        return JsonResponse({
+            "status": "unavailable",
+            "timestamp": time.time(),
+            "error": str(e)
+        }, status=503)
@@ -1,19 +1,32 @@
 from rest_framework import serializers
-from users.models import Users, Jobs
+from users.models import Users, Jobs, UploadSession
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.hashers import check_password
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 import pytz
-from rest_framework_simplejwt.tokens import RefreshToken, TokenError 
+from rest_framework_simplejwt.tokens import TokenError
 
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, smart_str
-from django.core.mail import send_mail
 from django.conf import settings
-from users.tasks import upload_file_to_s3, upload_file_obj_to_s3, delete_from_s3_task
-from users.signals import extract_key
+from django.db import transaction
+from users.tasks import upload_file_obj_to_s3, send_email, commit_uploaded_file
+from users.uploads import extract_key, next_generation, set_upload_status, PENDING, DONE, UPLOAD_FIELDS
+from users.documents import acquire_uploaded_blob
+from users.upload_sessions import start_session
+from sameboat.security import validate_upload_metadata
+from sameboat.services.task_dispatch import dispatch
+from users.api.tokens import CachedBlacklistRefreshToken
+from users.api.exceptions import ServiceUnavailable
+from sameboat.services.queue_monitor import upload_backpressure
+from sameboat.services.storage import get_storage
+from sameboat.services.presigned_urls import presigned_urls
 import base64
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
 
 class UserRegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -40,6 +53,7 @@ class UserRegisterSerializer(serializers.ModelSerializer):
     
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = CachedBlacklistRefreshToken
 
     def validate(self, attrs):
         # get email and password from request
@@ -78,10 +92,14 @@ class UserLogoutSerializer(serializers.Serializer):
     
     def save(self, **kwargs):
         try:
-            token = RefreshToken(self.token)
+            token = CachedBlacklistRefreshToken(self.token)
             token.blacklist()
         except TokenError:
             self.fail("bad_token")
+
+
+class CookieTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = CachedBlacklistRefreshToken
     
 
 
@@ -101,7 +119,8 @@ class UserPasswordResetLinkSerializer(serializers.Serializer):
         
         # print(reset_link)  # Replace with send_email(reset_link)
 
-        send_mail(
+        # Hand off to the email queue so the request doesn't wait on SMTP
+        send_email(
             subject="SameBoat - Password Reset",
             message=(
                 "Hi there,\n\n"
@@ -114,9 +133,7 @@ class UserPasswordResetLinkSerializer(serializers.Serializer):
                 "Stay afloat,\n"
                 "Team SameBoat "
             ),
-            from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[self.validated_data['email']],
-            fail_silently=False,
         )
 
 
@@ -157,6 +174,8 @@ class JobWriteSerializer(serializers.ModelSerializer):
     """
     skills = serializers.ListField(child=serializers.CharField(), required=False)
     notes = serializers.ListField(child=serializers.CharField(), required=False)
+    # Image attachments are downsampled and stripped of metadata unless this is set
+    keep_original = serializers.BooleanField(write_only=True, required=False, default=False)
 
     class Meta:
         model = Jobs
@@ -174,8 +193,72 @@ class JobWriteSerializer(serializers.ModelSerializer):
             "resume",
             "cover_letter",
             "is_active",
+            "keep_original",
         ]
 
+    def validate(self, attrs):
+        """
+        Shed attachment uploads while the workers are behind: reject with
+        503 + Retry-After, or (UPLOAD_BACKPRESSURE_MODE = "degrade") save
+        the job without its attachments.
+        """
+        attrs = super().validate(attrs)
+        self.dropped_attachments = []
+
+        attachments = [field for field in ("resume", "cover_letter") if attrs.get(field)]
+        if not attachments:
+            return attrs
+
+        reason = upload_backpressure()
+        if reason is None:
+            return attrs
+
+        logger.warning("Shedding attachment upload: %s", reason)
+        if settings.UPLOAD_BACKPRESSURE_MODE == "degrade":
+            for field in attachments:
+                attrs.pop(field)
+            self.dropped_attachments = attachments
+            return attrs
+
+        raise ServiceUnavailable(
+            "File uploads are temporarily paused. Please retry shortly.",
+            wait=settings.UPLOAD_BACKPRESSURE_RETRY_AFTER,
+        )
+
+    def dispatch_upload(self, job, field_name, uploaded_file, keep_original=False):
+        """
+        Queue the S3 upload for an attachment (published after commit).
+        Each upload claims a new generation so older in-flight uploads for
+        the same field are skipped and never overwrite this one. The claim
+        is made on commit: a rolled-back write must not supersede the upload
+        that is still current. A file the user has already stored is
+        attached right away, without a transfer; returns True if so (the
+        field on `job` is then set too).
+        """
+        uploaded_file.seek(0)
+        file_bytes = uploaded_file.read()
+        filename = uploaded_file.name.split('/')[-1]
+        job_id = job.job_id
+
+        blob = acquire_uploaded_blob(job.user_id, hashlib.sha256(file_bytes).hexdigest())
+        if blob is not None:
+            file_url = get_storage().url(blob.key)
+            # Holds the job row lock: nothing in flight can attach before this commits
+            commit_uploaded_file(job_id, field_name, blob, filename, file_url)
+            # keep the caller's instance in step, it is saved again after this
+            setattr(job, field_name, file_url)
+            set_upload_status(job_id, field_name, DONE)
+            transaction.on_commit(lambda: next_generation(job_id, field_name))
+            return True
+
+        file_data = base64.b64encode(file_bytes).decode('utf-8')
+        set_upload_status(job_id, field_name, PENDING)
+        dispatch(
+            upload_file_obj_to_s3.s(str(job_id), field_name, file_data, filename, keep_original=keep_original),
+            prepare=lambda signature: signature.clone(kwargs={"generation": next_generation(job_id, field_name)}),
+        )
+        return False
+
     def create(self, validated_data):
         user = self.context["request"].user
         validated_data["user"] = user
@@ -184,21 +267,16 @@ class JobWriteSerializer(serializers.ModelSerializer):
         # Remove resume and cover_letter from validated_data before saving
         resume = validated_data.pop("resume", None)
         cover_letter = validated_data.pop("cover_letter", None)
+        keep_original = validated_data.pop("keep_original", False)
 
         job = super().create(validated_data)
 
         # If resume uploaded → send to background with direct S3 upload
         if resume:
-            resume.seek(0)
-            file_data = base64.b64encode(resume.read()).decode('utf-8')
-            filename = resume.name.split('/')[-1]
-            upload_file_obj_to_s3.delay(job.job_id, "resume_url", file_data, filename)
+            self.dispatch_upload(job, "resume_url", resume, keep_original)
 
         if cover_letter:
-            cover_letter.seek(0)
-            file_data = base64.b64encode(cover_letter.read()).decode('utf-8')
-            filename = cover_letter.name.split('/')[-1]
-            upload_file_obj_to_s3.delay(job.job_id, "cover_letter_url", file_data, filename)
+            self.dispatch_upload(job, "cover_letter_url", cover_letter, keep_original)
 
         return job
 
@@ -206,48 +284,72 @@ class JobWriteSerializer(serializers.ModelSerializer):
         if "is_active" not in validated_data:
             validated_data["is_active"] = True
 
-        # Handle resume replacement
+        # Handle resume / cover_letter replacement. The old object is deleted
+        # by the upload task once the new URL is saved, not here: deleting
+        # up front left a dangling URL whenever the new upload failed.
+        keep_original = validated_data.pop("keep_original", False)
+        # The URL is only written here when the file was attached right away;
+        # otherwise the upload task sets it and this save mustn't overwrite it
+        update_fields = {"updated_at"}
         if "resume" in validated_data:
-            new_resume = validated_data.pop("resume")
-
-            # If an old resume exists → delete from S3
-            if instance.resume_url:
-                old_key = extract_key(instance.resume_url)
-                delete_from_s3_task.delay(old_key)
+            if self.dispatch_upload(instance, "resume_url", validated_data.pop("resume"), keep_original):
+                update_fields.add("resume_url")
 
-            # Do NOT save new resume locally; just upload to S3
-            new_resume.seek(0)
-            file_data = base64.b64encode(new_resume.read()).decode('utf-8')
-            filename = new_resume.name.split('/')[-1]
-            upload_file_obj_to_s3.delay(instance.job_id, "resume_url", file_data, filename)
-
-        # Handle cover_letter replacement
         if "cover_letter" in validated_data:
-            new_cover_letter = validated_data.pop("cover_letter")
-
-            if instance.cover_letter_url:
-                old_key = extract_key(instance.cover_letter_url)
-                delete_from_s3_task.delay(old_key)
+            if self.dispatch_upload(instance, "cover_letter_url", validated_data.pop("cover_letter"), keep_original):
+                update_fields.add("cover_letter_url")
 
-            # Do NOT save new cover letter locally; just upload to S3
-            new_cover_letter.seek(0)
-            file_data = base64.b64encode(new_cover_letter.read()).decode('utf-8')
-            filename = new_cover_letter.name.split('/')[-1]
-            upload_file_obj_to_s3.delay(instance.job_id, "cover_letter_url", file_data, filename)
-
-        # Update non-file fields
+        # Update non-file fields. Only the ones that changed are written, so
+        # a status edit doesn't touch the match index (users.signals)
         for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+            if getattr(instance, attr) != value:
+                setattr(instance, attr, value)
+                update_fields.add(attr)
+        instance.save(update_fields=update_fields)
 
         return instance
 
 
 
+def document_urls(jobs):
+    """
+    {stored URL: presigned URL} for every attachment of `jobs`, signed in
+    one batch. Falls back to the stored URLs if signing isn't possible.
+    """
+    if not settings.PRESIGNED_DOCUMENT_URLS:
+        return {}
+    keys_by_url = {
+        url: extract_key(url)
+        for job in jobs
+        for url in (job.resume_url, job.cover_letter_url)
+        if url
+    }
+    if not keys_by_url:
+        return {}
+    try:
+        signed = presigned_urls(keys_by_url.values())
+    except Exception as e:
+        logger.warning("Could not presign document URLs: %s", e)
+        return {}
+    return {url: signed[key] for url, key in keys_by_url.items() if key in signed}
+
+
+class JobListSerializer(serializers.ListSerializer):
+    """Presigns the attachments of the whole page at once."""
+
+    def to_representation(self, data):
+        jobs = data.all() if hasattr(data, "all") else data
+        self.child.document_urls = document_urls(jobs)
+        return super().to_representation(jobs)
+
+
 class JobReadSerializer(serializers.ModelSerializer):
     """
-    Serializer for reading Jobs
+    Serializer for reading Jobs. resume_url / cover_letter_url are returned
+    as short-lived presigned URLs (PRESIGNED_DOCUMENT_URLS).
     """
+    document_urls = None
+
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", default_timezone=pytz.timezone('Asia/Kolkata'))
 
     updated_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S", default_timezone=pytz.timezone("Asia/Kolkata"))
@@ -275,4 +377,56 @@ class JobReadSerializer(serializers.ModelSerializer):
             "is_active",
         ]
         read_only_fields = fields
+        list_serializer_class = JobListSerializer
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        urls = self.document_urls if self.document_urls is not None else document_urls([instance])
+        for field_name in ("resume_url", "cover_letter_url"):
+            if data[field_name] in urls:
+                data[field_name] = urls[data[field_name]]
+        return data
+
+
 
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """
+    Creates a resumable upload session for one of a job's attachments.
+    """
+    job = serializers.PrimaryKeyRelatedField(queryset=Jobs.objects.all())
+    field_name = serializers.ChoiceField(choices=list(UPLOAD_FIELDS))
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            "session_id",
+            "job",
+            "field_name",
+            "filename",
+            "content_type",
+            "total_size",
+            "keep_original",
+            "chunk_size",
+            "offset",
+            "status",
+            "expires_at",
+        ]
+        read_only_fields = ["session_id", "chunk_size", "offset", "status", "expires_at"]
+
+    def validate_job(self, job):
+        if job.user_id != self.context["request"].user.pk:
+            raise serializers.ValidationError("Job not found")
+        return job
+
+    def validate(self, attrs):
+        is_valid, message = validate_upload_metadata(
+            attrs["filename"], attrs.get("content_type") or None, attrs["total_size"]
+        )
+        if not is_valid:
+            raise serializers.ValidationError(message)
+        if attrs["total_size"] <= 0:
+            raise serializers.ValidationError("File is empty")
+        return attrs
+
+    def create(self, validated_data):
+        return start_session(user=self.context["request"].user, **validated_data)
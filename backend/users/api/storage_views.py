@@ -0,0 +1,25 @@
+import mimetypes
+
+from django.http import FileResponse, Http404, HttpResponseForbidden
+
+from sameboat.services.storage import get_storage
+from sameboat.services.storage.base import StorageError
+from sameboat.services.storage.local import LocalStorage
+
+
+def local_document(request, key):
+    """
+    Serve a document from LocalStorage to holders of a presigned URL
+    (the local stand-in for an S3 presigned GET).
+    """
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        raise Http404
+    if not storage.verify_presigned(key, request.GET.get("token", "")):
+        return HttpResponseForbidden("Invalid or expired link")
+    try:
+        document = open(storage.path(key), "rb")
+    except (FileNotFoundError, StorageError):
+        raise Http404
+    content_type, _ = mimetypes.guess_type(key)
+    return FileResponse(document, content_type=content_type or "application/octet-stream")
@@ -0,0 +1,86 @@
+import json
+import time
+
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from users import uploads
+from users.api.authentication import CachedJWTAuthentication
+from users.models import Jobs
+
+
+def authenticate_stream_request(request):
+    """
+    JWT auth for the SSE endpoint. Browsers' EventSource can't set headers,
+    so the access token may also be passed as ?token=.
+    """
+    auth = CachedJWTAuthentication()
+    raw_token = request.GET.get("token")
+    if raw_token:
+        return auth.get_user(auth.get_validated_token(raw_token.encode()))
+    result = auth.authenticate(request)
+    return result[0] if result else None
+
+
+async def upload_events(job):
+    """
+    Yield the job's upload status as SSE events until no attachment is
+    pending/uploading, or UPLOAD_STREAM_MAX_SECONDS pass. Wakes up on the
+    job's pub/sub channel instead of polling, with keepalive comments.
+    """
+    client = aioredis.from_url(settings.REDIS_URL)
+    pubsub = client.pubsub()
+    await pubsub.subscribe(uploads.events_channel(job.job_id))
+    deadline = time.monotonic() + settings.UPLOAD_STREAM_MAX_SECONDS
+    last_status = None
+
+    try:
+        while True:
+            raw_status = await client.hgetall(uploads.status_key(job.job_id))
+            status = uploads.parse_upload_status(raw_status, job)
+            if status != last_status:
+                yield f"event: status\ndata: {json.dumps(status)}\n\n"
+                last_status = status
+
+            if not any(s and s["state"] in uploads.ACTIVE_STATES for s in status.values()):
+                yield "event: end\ndata: {}\n\n"
+                return
+            if time.monotonic() >= deadline:
+                return
+
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=settings.UPLOAD_STREAM_KEEPALIVE_SECONDS,
+            )
+            if message is None:
+                yield ": keepalive\n\n"
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
+        await client.aclose()
+
+
+async def upload_status_stream(request, job_id):
+    """
+    Server-Sent Events stream of a job's attachment upload status.
+    Served by the ASGI app so an open stream doesn't pin a worker.
+    """
+    try:
+        user = await sync_to_async(authenticate_stream_request)(request)
+    except (AuthenticationFailed, InvalidToken) as e:
+        return JsonResponse({"detail": str(e.detail)}, status=401)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    job = await Jobs.objects.filter(pk=job_id, user=user).afirst()
+    if job is None:
+        return JsonResponse({"detail": "Not found."}, status=404)
+
+    response = StreamingHttpResponse(upload_events(job), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
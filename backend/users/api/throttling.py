@@ -0,0 +1,133 @@
+import hashlib
+import logging
+import math
+import time
+import uuid
+
+from django_redis import get_redis_connection
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_PREFIX = "ratelimit:"
+RATE_LIMIT_STATS_KEY = "ratelimit:stats"
+
+# KEYS: stats hash, then one sorted set per identity (ip, email, ...)
+# ARGV: now_ms, scope, member, then (limit, window_ms) per identity
+# Checks every window first and only records the hit if all of them allow it,
+# so a blocked request never consumes budget. Returns {allowed, retry_after_ms}.
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local retry = 0
+for i = 2, #KEYS do
+    local limit = tonumber(ARGV[i * 2])
+    local window = tonumber(ARGV[i * 2 + 1])
+    redis.call('ZREMRANGEBYSCORE', KEYS[i], 0, now - window)
+    if redis.call('ZCARD', KEYS[i]) >= limit then
+        local oldest = redis.call('ZRANGE', KEYS[i], 0, 0, 'WITHSCORES')
+        retry = math.max(retry, window - (now - tonumber(oldest[2])))
+    end
+end
+if retry > 0 then
+    redis.call('HINCRBY', KEYS[1], ARGV[2] .. ':blocked', 1)
+    return {0, retry}
+end
+for i = 2, #KEYS do
+    redis.call('ZADD', KEYS[i], now, ARGV[3])
+    redis.call('PEXPIRE', KEYS[i], tonumber(ARGV[i * 2 + 1]))
+end
+redis.call('HINCRBY', KEYS[1], ARGV[2] .. ':allowed', 1)
+return {1, 0}
+"""
+
+
+class SlidingWindowRateThrottle(BaseThrottle):
+    """
+    Redis sliding-window limiter for anonymous, expensive endpoints.
+
+    A request is checked against one window per identity (client IP and,
+    when the body has one, the target email) in a single atomic Lua call,
+    so it is rejected with 429 + Retry-After before any hashing, SMTP or DB
+    work happens. Rates come from DEFAULT_THROTTLE_RATES as
+    ``<scope>_ip`` / ``<scope>_email``. Fails open if Redis is unreachable.
+    """
+
+    scope = None
+    _script = None
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_rate(self, kind):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(f"{self.scope}_{kind}")
+        return SimpleRateThrottle.parse_rate(self, rate)
+
+    def get_identities(self, request):
+        identities = [("ip", self.get_ident(request))]
+        email = request.data.get("email") if hasattr(request.data, "get") else None
+        if isinstance(email, str) and email.strip():
+            digest = hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+            identities.append(("email", digest))
+        return identities
+
+    @classmethod
+    def get_script(cls, redis):
+        if SlidingWindowRateThrottle._script is None:
+            SlidingWindowRateThrottle._script = redis.register_script(SLIDING_WINDOW_SCRIPT)
+        return SlidingWindowRateThrottle._script
+
+    def allow_request(self, request, view):
+        keys, args = [RATE_LIMIT_STATS_KEY], []
+        for kind, ident in self.get_identities(request):
+            num_requests, duration = self.get_rate(kind)
+            if num_requests is None:
+                continue
+            keys.append(f"{RATE_LIMIT_PREFIX}{self.scope}:{kind}:{ident}")
+            args.extend([num_requests, duration * 1000])
+
+        if len(keys) == 1:
+            return True
+
+        now_ms = int(time.time() * 1000)
+        try:
+            redis = get_redis_connection("default")
+            allowed, retry_ms = self.get_script(redis)(
+                keys=keys,
+                args=[now_ms, self.scope, f"{now_ms}:{uuid.uuid4().hex}", *args],
+                client=redis,
+            )
+        except Exception as e:
+            logger.warning("Rate limiter unavailable, allowing request: %s", e)
+            return True
+
+        if allowed:
+            return True
+        self.retry_after = int(retry_ms) / 1000
+        return False
+
+    def wait(self):
+        if self.retry_after is None:
+            return None
+        return math.ceil(self.retry_after)
+
+
+class LoginRateThrottle(SlidingWindowRateThrottle):
+    scope = "login"
+
+
+class RegisterRateThrottle(SlidingWindowRateThrottle):
+    scope = "register"
+
+
+class PasswordResetRateThrottle(SlidingWindowRateThrottle):
+    scope = "password_reset"
+
+
+def get_rate_limit_stats():
+    """Allowed/blocked counters per scope, e.g. {"login:blocked": 12}."""
+    redis = get_redis_connection("default")
+    return {
+        field.decode(): int(count)
+        for field, count in redis.hgetall(RATE_LIMIT_STATS_KEY).items()
+    }
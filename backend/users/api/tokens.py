@@ -0,0 +1,97 @@
+import logging
+import time
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from django_redis import get_redis_connection
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+BLACKLIST_PREFIX = "auth:blacklist:"
+# Set once Redis holds every unexpired blacklisted jti; until then we use the DB.
+# It expires unless prune_token_blacklist re-warms the set, and is dropped
+# whenever a blacklist write to Redis fails.
+BLACKLIST_READY_KEY = "auth:blacklist:ready"
+
+
+def _ttl_for(exp):
+    return max(int(exp - time.time()), 1)
+
+
+def mark_blacklisted(jti, exp):
+    """Record a blacklisted jti in Redis until the token would have expired anyway."""
+    redis = get_redis_connection("default")
+    redis.set(f"{BLACKLIST_PREFIX}{jti}", 1, ex=_ttl_for(exp))
+
+
+def warm_blacklist_cache(batch_size=1000):
+    """
+    Copy every unexpired blacklisted jti from the DB into Redis and flag the
+    Redis set as authoritative. Returns the number of jtis written.
+    """
+    redis = get_redis_connection("default")
+    rows = (
+        BlacklistedToken.objects
+        .filter(token__expires_at__gt=timezone.now())
+        .values_list("token__jti", "token__expires_at")
+        .iterator(chunk_size=batch_size)
+    )
+
+    written = 0
+    pipe = redis.pipeline(transaction=False)
+    for jti, expires_at in rows:
+        pipe.set(f"{BLACKLIST_PREFIX}{jti}", 1, ex=_ttl_for(expires_at.timestamp()))
+        written += 1
+        if written % batch_size == 0:
+            pipe.execute()
+    pipe.set(BLACKLIST_READY_KEY, 1, ex=settings.TOKEN_BLACKLIST_CACHE_READY_TTL)
+    pipe.execute()
+    return written
+
+
+class CachedBlacklistRefreshToken(RefreshToken):
+    """
+    RefreshToken whose blacklist check is a single Redis round trip.
+
+    Blacklisting still writes the OutstandingToken/BlacklistedToken rows so the
+    DB stays the durable record; Redis keys expire with the token. If Redis is
+    unreachable or has not been warmed (e.g. after a flush) we fall back to
+    the DB query. A jti that could not be written to Redis takes the ready
+    flag with it, so the DB answers until the next warm-up.
+    """
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+
+        try:
+            redis = get_redis_connection("default")
+            pipe = redis.pipeline(transaction=False)
+            pipe.exists(f"{BLACKLIST_PREFIX}{jti}")
+            pipe.exists(BLACKLIST_READY_KEY)
+            blacklisted, ready = pipe.execute()
+        except Exception as e:
+            logger.warning("Token blacklist cache unavailable: %s", e)
+            return super().check_blacklist()
+
+        if blacklisted:
+            raise TokenError(_("Token is blacklisted"))
+        if not ready:
+            return super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        try:
+            mark_blacklisted(self.payload[api_settings.JTI_CLAIM], self.payload["exp"])
+        except Exception as e:
+            logger.warning("Could not cache blacklisted token, checking the DB until re-warmed: %s", e)
+            try:
+                get_redis_connection("default").delete(BLACKLIST_READY_KEY)
+            except Exception as e:
+                # The flag's TTL bounds how long Redis can be trusted without this jti
+                logger.error("Could not drop the blacklist ready flag: %s", e)
+        return result
@@ -1,12 +1,30 @@
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, SAFE_METHODS
 from rest_framework import viewsets, mixins, status
-from users.models import Users, Jobs
+from rest_framework.decorators import action
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from users.models import Users, Jobs, UploadSession, DocumentBlob, DocumentReference, DocumentText
+from users.api.throttling import RegisterRateThrottle
+from users.uploads import get_upload_status, UPLOAD_FIELDS
+from users.matching import get_index
+from users.upload_sessions import (
+    UploadSessionError,
+    OffsetMismatch,
+    write_chunk,
+    finalize_session,
+    discard_session,
+)
+from users.api.exceptions import ServiceUnavailable
+from sameboat.services.storage import StorageTransientError
+from sameboat.db_routing import is_pinned, replica_scope, use_replica
 from users.api.serializers import(
     JobReadSerializer, 
     JobWriteSerializer, 
     UserRegisterSerializer,
-
+    UploadSessionSerializer,
 )
 
 
@@ -44,6 +62,7 @@ class MessageMixinViewSet(viewsets.ModelViewSet):
 class UserRegisterViewSet(MessageMixinViewSet):
     queryset = Users.objects.all()
     permission_classes = [AllowAny]
+    throttle_classes = [RegisterRateThrottle]
     serializer_class = UserRegisterSerializer
     http_method_names = ["post"] #allow only POST for registration
 
@@ -51,6 +70,17 @@ class UserRegisterViewSet(MessageMixinViewSet):
 
 class JobViewSet(MessageMixinViewSet):
     queryset = Jobs.objects.all()
+    dropped_attachments = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        with replica_scope():
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Reads move to the replica unless this user just wrote something
+        if request.method in SAFE_METHODS and not is_pinned(request.user.pk):
+            use_replica()
 
     def get_serializer_class(self):
         if self.action in ["create", "update", "partial_update"]:
@@ -59,7 +89,192 @@ class JobViewSet(MessageMixinViewSet):
 
 
     def get_queryset(self):
-        return Jobs.objects.filter(user=self.request.user)
+        queryset = Jobs.objects.filter(user=self.request.user)
+        search = self.request.query_params.get("search", "").strip()
+        if search and self.action == "list":
+            queryset = self.search_jobs(queryset, search)
+        return queryset
+
+    def search_jobs(self, queryset, search):
+        """
+        ?search= matches the job's title, company and location, and the
+        extracted text of its resume / cover letter (DocumentText). Only the
+        texts of the user's own blobs are scanned.
+        """
+        own_blobs = DocumentBlob.objects.filter(user=self.request.user).values("sha256")
+        matching_texts = DocumentText.objects.filter(sha256__in=own_blobs, text__icontains=search).values("sha256")
+        attached = DocumentReference.objects.filter(
+            job=OuterRef("pk"),
+            blob__sha256__in=matching_texts,
+        )
+        return queryset.filter(
+            Q(job_title__icontains=search)
+            | Q(company_name__icontains=search)
+            | Q(location__icontains=search)
+            | Exists(attached)
+        )
+
+    @action(detail=False, methods=["get"], url_path="match")
+    def match(self, request):
+        """
+        Rank the user's jobs against a resume:
+        ?document=<job_id> uses that job's resume (or ?field=cover_letter_url),
+        ?limit= caps the results (default JOB_MATCH_DEFAULT_LIMIT).
+        """
+        field_name = request.query_params.get("field", "resume_url")
+        if field_name not in UPLOAD_FIELDS:
+            return Response({"detail": f"field must be one of {list(UPLOAD_FIELDS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            source = self.get_queryset().get(pk=request.query_params.get("document"))
+            limit = int(request.query_params.get("limit", settings.JOB_MATCH_DEFAULT_LIMIT))
+        except (Jobs.DoesNotExist, ValidationError, ValueError):
+            return Response({"detail": "document must be the id of one of your jobs"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, settings.JOB_MATCH_MAX_LIMIT))
+
+        reference = DocumentReference.objects.filter(job=source, field_name=field_name).select_related("blob").first()
+        if reference is None:
+            return Response({"detail": "That job has no such document attached"}, status=status.HTTP_404_NOT_FOUND)
+        document_text = DocumentText.objects.filter(sha256=reference.blob.sha256).first()
+        if document_text is None:
+            return Response({"detail": "The document's text is still being extracted"}, status=status.HTTP_409_CONFLICT)
+        if document_text.status == DocumentText.Status.FAILED:
+            return Response({"detail": f"No text could be read from the document: {document_text.error}"}, status=422)
+
+        index = get_index(request.user.pk)
+        ranked = [
+            (job_id, score) for job_id, score in index.top(document_text.text, limit + 1)
+            if job_id != str(source.job_id)
+        ][:limit]
+        jobs = {
+            str(job.job_id): job
+            for job in self.get_queryset()
+            .only("job_id", "job_title", "company_name", "current_status")
+            .filter(pk__in=[job_id for job_id, _ in ranked])
+        }
+        results = [
+            {
+                "job_id": job_id,
+                "job_title": jobs[job_id].job_title,
+                "company_name": jobs[job_id].company_name,
+                "current_status": jobs[job_id].current_status,
+                "score": round(score, 4),
+            }
+            for job_id, score in ranked if job_id in jobs
+        ]
+        return Response({"document": str(source.job_id), "field": field_name, "scored": len(index), "results": results})
+
+    @action(detail=True, methods=["get"], url_path="uploads")
+    def upload_status(self, request, pk=None):
+        """Per-attachment upload state: pending, uploading, done or failed"""
+        job = self.get_object()
+        return Response({"job_id": str(job.job_id), "uploads": get_upload_status(job)})
+
+    def with_dropped_attachments(self, response):
+        # Under backpressure the job may be saved without its files
+        if self.dropped_attachments:
+            response.data["warning"] = "Saved without attachment; uploads are temporarily paused, please re-upload shortly."
+            response.data["dropped_attachments"] = list(self.dropped_attachments)
+        return response
+
+    def create(self, request, *args, **kwargs):
+        return self.with_dropped_attachments(super().create(request, *args, **kwargs))
+
+    def update(self, request, *args, **kwargs):
+        return self.with_dropped_attachments(super().update(request, *args, **kwargs))
 
+    # Writes run in a transaction so tasks dispatched by the serializer and
+    # signals are published together, and only once the rows are committed.
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
\ No newline at end of file
+        with transaction.atomic():
+            serializer.save(user=self.request.user)
+        self.dropped_attachments = serializer.dropped_attachments
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+        self.dropped_attachments = serializer.dropped_attachments
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+
+
+class UploadSessionViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Resumable uploads:
+      POST   /uploads/                 open a session (job, field_name, filename, content_type, total_size)
+      PUT    /uploads/<id>/            send the chunk starting at the Upload-Offset header
+      HEAD   /uploads/<id>/            current offset (Upload-Offset header) to resume from
+      POST   /uploads/<id>/finalize/   assemble the chunks into the attachment
+      DELETE /uploads/<id>/            abort
+    """
+    serializer_class = UploadSessionSerializer
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def offset_response(self, session, status_code=status.HTTP_200_OK):
+        response = Response(self.get_serializer(session).data, status=status_code)
+        response["Upload-Offset"] = str(session.offset)
+        response["Upload-Length"] = str(session.total_size)
+        response["Cache-Control"] = "no-store"
+        return response
+
+    def session_error_response(self, error):
+        data = {"detail": str(error)}
+        response = Response(data, status=error.status_code)
+        if isinstance(error, OffsetMismatch):
+            data["offset"] = error.offset
+            response["Upload-Offset"] = str(error.offset)
+        return response
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            session = serializer.save()
+        except StorageTransientError:
+            raise ServiceUnavailable("File storage is temporarily unavailable.", wait=5)
+        response = self.offset_response(session, status.HTTP_201_CREATED)
+        response["Location"] = request.build_absolute_uri(f"{session.session_id}/")
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.offset_response(self.get_object())
+
+    def update(self, request, *args, **kwargs):
+        session = self.get_object()
+        try:
+            offset = int(request.headers["Upload-Offset"])
+        except (KeyError, ValueError):
+            return Response({"detail": "Upload-Offset header is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Raw body; read one byte past the chunk size to reject oversized chunks
+        data = request.stream.read(session.chunk_size + 1) if request.stream else b""
+        try:
+            session = write_chunk(session.pk, offset, data)
+        except UploadSessionError as e:
+            return self.session_error_response(e)
+        except StorageTransientError:
+            # Offset unchanged, so the client just resends this chunk
+            raise ServiceUnavailable("File storage is temporarily unavailable.", wait=5)
+        return self.offset_response(session)
+
+    @action(detail=True, methods=["post"])
+    def finalize(self, request, pk=None):
+        session = self.get_object()
+        try:
+            session = finalize_session(session.pk)
+        except UploadSessionError as e:
+            return self.session_error_response(e)
+        except StorageTransientError:
+            raise ServiceUnavailable("File storage is temporarily unavailable.", wait=5)
+        return self.offset_response(session)
+
+    def perform_destroy(self, instance):
+        discard_session(instance)
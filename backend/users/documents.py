@@ -0,0 +1,136 @@
+"""
+Content-addressed, reference-counted attachment storage.
+
+Attachments are stored once per user and content, under a key derived from
+their SHA-256 (user_uploads/<user_id>/blobs/<sha256>). Each job field that
+uses a file has a DocumentReference to its DocumentBlob. Uploading a file
+the user already has skips the transfer; deleting or replacing a job's
+file only deletes the object once no reference is left.
+
+An upload claims a reference with acquire_blob() before transferring, so
+the object can't be deleted underneath it. The claim then becomes the job
+field's reference (attach_document) or is given back (release_blob).
+"""
+import mimetypes
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from sameboat.services.storage import get_storage
+from sameboat.services.task_dispatch import dispatch
+from users.models import DocumentBlob, DocumentReference, DocumentText
+
+
+BLOB_LOCK_PREFIX = "blob:lock:"
+
+
+def blob_lock(key):
+    """
+    Lock held while a blob's object is stored or deleted. A release queues
+    the delete after the row is gone; the same content uploaded again in
+    the meantime gets a new row with the same key, and its transfer is
+    skipped while the old object is still there.
+    """
+    return cache.lock(f"{BLOB_LOCK_PREFIX}{key}", timeout=settings.BLOB_LOCK_TIMEOUT)
+
+
+def blob_key(user_id, sha256):
+    return f"user_uploads/{user_id}/blobs/{sha256}"
+
+
+def is_blob_key(key):
+    """True for content-addressed keys; older uploads are keyed by filename."""
+    parts = key.split("/")
+    return len(parts) == 4 and parts[2] == "blobs"
+
+
+def acquire_blob(user_id, sha256, filename, size):
+    """Claim a reference on the user's blob for this content, creating it if needed."""
+    with transaction.atomic():
+        blob, _ = DocumentBlob.objects.select_for_update().get_or_create(
+            user_id=user_id,
+            sha256=sha256,
+            defaults={
+                "key": blob_key(user_id, sha256),
+                "size": size,
+                "content_type": mimetypes.guess_type(filename)[0] or "",
+            },
+        )
+        blob.ref_count += 1
+        blob.save(update_fields=["ref_count", "updated_at"])
+    return blob
+
+
+def acquire_uploaded_blob(user_id, sha256):
+    """Claim a reference on an already stored blob; None if it isn't stored yet."""
+    with transaction.atomic():
+        blob = (
+            DocumentBlob.objects.select_for_update()
+            .filter(user_id=user_id, sha256=sha256, uploaded=True)
+            .first()
+        )
+        if blob is not None:
+            blob.ref_count += 1
+            blob.save(update_fields=["ref_count", "updated_at"])
+    return blob
+
+
+def mark_uploaded(blob):
+    """Record that the blob's object is stored, and queue its text extraction for search."""
+    # Imported here: users.tasks imports this module
+    from users.tasks import extract_document_text
+
+    DocumentBlob.objects.filter(pk=blob.pk).update(uploaded=True)
+    blob.uploaded = True
+    if not DocumentText.objects.filter(sha256=blob.sha256).exists():
+        dispatch(extract_document_text.s(str(blob.pk)))
+
+
+def release_blob(blob_id):
+    """Drop one reference; the last one out deletes the blob and its object."""
+    # Imported here: users.tasks imports this module
+    from users.tasks import delete_many_from_s3_task
+
+    with transaction.atomic():
+        blob = DocumentBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return
+        blob.ref_count = max(blob.ref_count - 1, 0)
+        if blob.ref_count:
+            blob.save(update_fields=["ref_count", "updated_at"])
+            return
+        blob.delete()
+        # Even if never marked uploaded: a crashed upload may have stored it
+        dispatch(delete_many_from_s3_task.s([blob.key]))
+
+
+def attach_document(job, field_name, blob, filename, file_url):
+    """
+    Point a job field at `blob`, turning the caller's claim into the field's
+    reference. The caller holds the job row lock. The replaced reference is
+    released by the DocumentReference post_delete signal.
+    """
+    DocumentReference.objects.filter(job=job, field_name=field_name).delete()
+    DocumentReference.objects.create(job=job, field_name=field_name, blob=blob, filename=filename)
+    setattr(job, field_name, file_url)
+    job.save(update_fields=[field_name])
+
+
+def delete_unused_objects(keys):
+    """
+    Delete stored objects, keeping blob keys a DocumentBlob row uses again.
+    Returns the number of objects deleted.
+    """
+    blob_keys = sorted({key for key in keys if is_blob_key(key)})
+    unused = [key for key in keys if not is_blob_key(key)]
+    with ExitStack() as locks:
+        # Sorted, so two batches sharing keys can't deadlock
+        for key in blob_keys:
+            locks.enter_context(blob_lock(key))
+        in_use = set(DocumentBlob.objects.filter(key__in=blob_keys).values_list("key", flat=True))
+        unused += [key for key in blob_keys if key not in in_use]
+        if unused:
+            get_storage().delete_many(unused)
+    return len(unused)
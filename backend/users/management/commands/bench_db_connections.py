@@ -0,0 +1,118 @@
+import statistics
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users import account_deletion
+from users.models import Jobs, Users
+
+
+class Command(BaseCommand):
+    """
+    Time GET /api/v1/jobs/ with a connection per request, persistent
+    connections and (on PostgreSQL with psycopg 3) the connection pool.
+    Requests are bracketed with close_old_connections like the real request
+    handler does, so each mode opens and closes connections as it would in
+    production. Point DATABASE_URL at the real database to see TCP+TLS setup.
+    """
+
+    help = 'Benchmark per-request database connection overhead on the jobs list endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per mode')
+        parser.add_argument('--jobs', type=int, default=25, help='Jobs owned by the benchmark user')
+        parser.add_argument('--conn-max-age', type=int, default=60, help='CONN_MAX_AGE for the persistent mode')
+
+    def modes(self, options):
+        modes = [
+            ('new connection per request', 0, None),
+            (f'persistent (CONN_MAX_AGE={options["conn_max_age"]})', options['conn_max_age'], None),
+        ]
+        if connection.vendor == 'postgresql' and hasattr(connection, 'close_pool'):
+            pool = {'min_size': 1, 'max_size': 4, 'timeout': settings.DATABASE_POOL_TIMEOUT}
+            modes.append(('psycopg pool', 0, pool))
+        else:
+            self.stdout.write('  (pool mode needs PostgreSQL and psycopg 3; skipped)')
+        return modes
+
+    def configure(self, conn_max_age, pool):
+        connection.close()
+        if hasattr(connection, 'close_pool'):
+            connection.close_pool()
+        connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+        options = connection.settings_dict.setdefault('OPTIONS', {})
+        if pool:
+            options['pool'] = pool
+        else:
+            options.pop('pool', None)
+
+    def run_mode(self, client, url, requests):
+        opened = []
+
+        def count(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection_created.connect(count)
+        timings = []
+        try:
+            client.get(url)  # warm up caches (user, URL resolver) outside the timings
+            opened.clear()
+            for _ in range(requests):
+                started = time.perf_counter()
+                close_old_connections()
+                response = client.get(url)
+                close_old_connections()
+                timings.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise RuntimeError(f'{url} returned {response.status_code}')
+        finally:
+            connection_created.disconnect(count)
+        return timings, len(opened)
+
+    def report(self, name, timings, opened, baseline=None):
+        timings = sorted(timings)
+        p50 = statistics.median(timings)
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        saved = f'  saved={(baseline - p50) * 1000:6.2f}ms/request' if baseline is not None else ''
+        self.stdout.write(
+            f'  {name:<32} p50={p50 * 1000:7.2f}ms  p99={p99 * 1000:7.2f}ms  connections={opened:<5}{saved}'
+        )
+        return p50
+
+    def handle(self, *args, **options):
+        suffix = uuid.uuid4().hex[:12]
+        user = Users.objects.create_user(
+            email=f'bench-{suffix}@example.com', user_name=f'bench-{suffix}',
+            first_name='Bench', password=uuid.uuid4().hex,
+        )
+        Jobs.objects.bulk_create(
+            Jobs(user=user, job_title=f'Engineer {i}', company_name='Bench Co', experience_required='2 years')
+            for i in range(options['jobs'])
+        )
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        original = {
+            'CONN_MAX_AGE': connection.settings_dict['CONN_MAX_AGE'],
+            'OPTIONS': dict(connection.settings_dict.get('OPTIONS', {})),
+        }
+
+        self.stdout.write(
+            f'📊 GET /api/v1/jobs/ x{options["requests"]} on {connection.vendor}, {options["jobs"]} jobs'
+        )
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                baseline = None
+                for name, conn_max_age, pool in self.modes(options):
+                    self.configure(conn_max_age, pool)
+                    timings, opened = self.run_mode(client, '/api/v1/jobs/', options['requests'])
+                    p50 = self.report(name, timings, opened, baseline)
+                    baseline = p50 if baseline is None else baseline
+        finally:
+            self.configure(original['CONN_MAX_AGE'], original['OPTIONS'].get('pool'))
+            account_deletion.delete_job_rows(user.pk)
+            account_deletion.delete_user_rows(user.pk)
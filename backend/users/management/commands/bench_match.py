@@ -0,0 +1,97 @@
+import math
+import random
+import statistics
+import time
+import uuid
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from users.matching import JobMatchIndex, job_terms, tokenize
+
+SKILLS = [
+    'python', 'django', 'kubernetes', 'docker', 'terraform', 'aws', 'gcp', 'azure', 'react', 'typescript',
+    'node.js', 'go', 'rust', 'java', 'spring', 'c++', 'c#', 'sql', 'postgresql', 'redis', 'kafka', 'spark',
+    'airflow', 'pandas', 'pytorch', 'tensorflow', 'graphql', 'grpc', 'linux', 'ansible', 'jenkins', 'celery',
+]
+TITLES = ['backend engineer', 'platform engineer', 'data engineer', 'frontend developer', 'sre', 'ml engineer']
+NOTE_WORDS = ['recruiter', 'call', 'onsite', 'remote', 'salary', 'team', 'culture', 'followup', 'referral', 'stack']
+
+
+class Command(BaseCommand):
+    """Time vectorized resume-to-job scoring on synthetic jobs, without a database."""
+
+    help = 'Benchmark users.matching on a synthetic job pipeline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=10_000, help='Number of jobs in the index')
+        parser.add_argument('--queries', type=int, default=50, help='Number of resumes scored')
+        parser.add_argument('--limit', type=int, default=20, help='Results per query')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+
+    def make_job(self, rng):
+        return {
+            'job_id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'job_title': rng.choice(TITLES),
+            'skills': rng.sample(SKILLS, rng.randint(3, 10)),
+            'notes': [' '.join(rng.choices(NOTE_WORDS + SKILLS, k=12)) for _ in range(rng.randint(0, 3))],
+        }
+
+    def make_resume(self, rng):
+        return ' '.join(rng.choices(SKILLS + NOTE_WORDS + ['experience', 'years', 'built', 'led'], k=400))
+
+    def naive_scores(self, jobs, resume):
+        """Per-job Python loop: what the index replaces."""
+        vectors = [job_terms(job) for job in jobs]
+        df = Counter(term for vector in vectors for term in vector)
+        n = len(jobs)
+        idf = {term: math.log((1 + n) / (1 + count)) + 1 for term, count in df.items()}
+        query = {t: (1 + math.log(c)) * idf[t] for t, c in Counter(tokenize(resume)).items() if t in idf}
+        query_norm = math.sqrt(sum(v * v for v in query.values()))
+        scores = []
+        for vector in vectors:
+            weighted = {t: (1 + math.log(c)) * idf[t] for t, c in vector.items()}
+            norm = math.sqrt(sum(v * v for v in weighted.values()))
+            dot = sum(w * query.get(t, 0.0) for t, w in weighted.items())
+            scores.append(dot / (norm * query_norm) if norm and query_norm else 0.0)
+        return scores
+
+    def report(self, name, values):
+        values = sorted(values)
+        p99 = values[min(len(values) - 1, int(len(values) * 0.99))]
+        self.stdout.write(
+            f'  {name:<32} p50={statistics.median(values) * 1000:8.2f}ms  p99={p99 * 1000:8.2f}ms'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        jobs = [self.make_job(rng) for _ in range(options['jobs'])]
+        resumes = [self.make_resume(rng) for _ in range(options['queries'])]
+
+        started = time.perf_counter()
+        index = JobMatchIndex.build(jobs)
+        index.matrix()
+        build = time.perf_counter() - started
+        self.stdout.write(f'📊 {len(index)} jobs, {len(index.vocabulary)} terms, built in {build * 1000:.1f}ms')
+
+        timings = []
+        for resume in resumes:
+            started = time.perf_counter()
+            index.top(resume, options['limit'])
+            timings.append(time.perf_counter() - started)
+        self.report('score + top-k (cached matrix)', timings)
+
+        timings = []
+        for resume in resumes:
+            job = self.make_job(rng)
+            job['job_id'] = rng.choice(jobs)['job_id']
+            started = time.perf_counter()
+            index.update(job)
+            index.top(resume, options['limit'])
+            timings.append(time.perf_counter() - started)
+        self.report('update one job, then score', timings)
+
+        started = time.perf_counter()
+        self.naive_scores(jobs, resumes[0])
+        naive = time.perf_counter() - started
+        self.stdout.write(f'  {"per-job Python loop (1 query)":<32} {naive * 1000:8.2f}ms')
@@ -0,0 +1,90 @@
+import base64
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from sameboat.services.storage.local import LocalStorage
+
+
+class Command(BaseCommand):
+    """Measure LocalStorage throughput offline, no network or bucket needed."""
+
+    help = 'Benchmark the local storage backend and the upload pipeline around it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=20, help='Number of files per scenario')
+        parser.add_argument('--size-mb', type=float, default=8, help='Size of each file in MB')
+        parser.add_argument('--part-mb', type=float, default=5, help='Multipart part size in MB')
+        parser.add_argument('--threads', type=int, default=4, help='Threads for the pipeline scenario')
+
+    def timed(self, name, total_bytes, func):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'  {name:<28} {elapsed:7.3f}s  {total_bytes / elapsed / 1024 / 1024:9.1f} MB/s'
+        )
+
+    def handle(self, *args, **options):
+        files = options['files']
+        size = int(options['size_mb'] * 1024 * 1024)
+        part_size = int(options['part_mb'] * 1024 * 1024)
+        total = files * size
+        workdir = tempfile.mkdtemp(prefix='bench-storage-')
+        try:
+            storage = LocalStorage(root=os.path.join(workdir, 'store'), base_url='/bench/')
+            payload = os.urandom(size)
+            source_path = os.path.join(workdir, 'source.bin')
+            with open(source_path, 'wb') as f:
+                f.write(payload)
+            self.stdout.write(f'📊 {files} files of {size / 1024 / 1024:.1f} MB in {workdir}')
+
+            def save_from_disk():
+                for i in range(files):
+                    storage.save_path(source_path, f'disk/{i}')
+
+            def save_from_memory():
+                for i in range(files):
+                    storage.save(io.BytesIO(payload), f'memory/{i}')
+
+            def multipart():
+                for i in range(files):
+                    key = f'multipart/{i}'
+                    upload_id = storage.create_multipart(key)
+                    parts = []
+                    for number, offset in enumerate(range(0, size, part_size), start=1):
+                        etag = storage.upload_part(key, upload_id, number, payload[offset:offset + part_size])
+                        parts.append({'PartNumber': number, 'ETag': etag})
+                    storage.complete_multipart(key, upload_id, parts)
+
+            def checksum():
+                for i in range(files):
+                    storage.sha256(f'disk/{i}')
+
+            # What upload_file_to_s3 does per attachment: decode, hash, store, sign
+            encoded = base64.b64encode(payload)
+
+            def upload_one(i):
+                content = base64.b64decode(encoded)
+                digest = hashlib.sha256(content).hexdigest()
+                key = f'pipeline/{i}/{digest}'
+                storage.save(io.BytesIO(content), key, checksum=digest)
+                return storage.presigned_url(key)
+
+            def pipeline():
+                with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                    list(executor.map(upload_one, range(files)))
+
+            self.timed('save (file, sendfile)', total, save_from_disk)
+            self.timed('save (BytesIO)', total, save_from_memory)
+            self.timed(f'multipart ({options["part_mb"]:g} MB parts)', total, multipart)
+            self.timed('sha256 (mmap)', total, checksum)
+            self.timed(f'pipeline ({options["threads"]} threads)', total, pipeline)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,270 @@
+import http.client
+import json
+import random
+import statistics
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.models import Jobs, Users
+
+LOGIN = 'POST /api/v1/login/'
+LIST = 'GET /api/v1/jobs/'
+CREATE = 'POST /api/v1/jobs/ (attachment)'
+PATCH = 'PATCH /api/v1/jobs/<id>/'
+REFRESH = 'POST /api/v1/refresh'
+
+DEFAULT_MIX = 'list=10,patch=4,refresh=2,create=1,login=1'
+STATUSES = [choice for choice, _ in Jobs.CurrentStatus.choices]
+
+
+def multipart(fields, files):
+    """Encode a multipart/form-data body: (body, content type)."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, content, content_type) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode() + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def percentile(timings, q):
+    """The q-th percentile of sorted timings (seconds), in milliseconds."""
+    return timings[min(len(timings) - 1, int(len(timings) * q))] * 1000
+
+
+class Connection:
+    """One keep-alive HTTP connection, reopened after the server drops it."""
+
+    def __init__(self, base_url, timeout):
+        url = urlsplit(base_url)
+        self.factory = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = url.netloc
+        self.timeout = timeout
+        self.conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = self.factory(self.netloc, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=body, headers=headers or {})
+                response = self.conn.getresponse()
+                return response.status, response.headers, response.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # Idle keep-alive connection closed by the server (gunicorn sync workers do)
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+
+class VirtualUser:
+    """A logged-in client running the scenario mix; records (endpoint, status, seconds)."""
+
+    def __init__(self, connection, email, password, rng, attachment_size):
+        self.connection = connection
+        self.email = email
+        self.password = password
+        self.rng = rng
+        self.attachment_size = attachment_size
+        self.token = None
+        self.refresh_cookie = None
+        self.job_ids = []
+        self.results = []
+
+    def call(self, name, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        started = time.perf_counter()
+        try:
+            status, response_headers, payload = self.connection.request(method, path, body, headers)
+        except OSError:
+            status, response_headers, payload = 0, {}, b''
+        self.results.append((name, status, time.perf_counter() - started))
+        if status == 401 and name not in (LOGIN, REFRESH):
+            # Access token expired mid-run
+            self.login()
+        return status, response_headers, payload
+
+    def store_refresh_cookie(self, response_headers):
+        cookie = SimpleCookie()
+        for header in response_headers.get_all('Set-Cookie') or []:
+            cookie.load(header)
+        morsel = cookie.get(settings.JWT_REFRESH_COOKIE_NAME)
+        if morsel is not None:
+            self.refresh_cookie = morsel.value
+
+    def login(self):
+        self.token = None
+        body = json.dumps({'email': self.email, 'password': self.password})
+        status, response_headers, payload = self.call(
+            LOGIN, 'POST', '/api/v1/login/', body, {'Content-Type': 'application/json'},
+        )
+        if status == 200:
+            self.token = json.loads(payload)['token']
+            self.store_refresh_cookie(response_headers)
+
+    def refresh(self):
+        if not self.refresh_cookie:
+            return self.login()
+        status, response_headers, payload = self.call(
+            REFRESH, 'POST', '/api/v1/refresh',
+            headers={'Cookie': f'{settings.JWT_REFRESH_COOKIE_NAME}={self.refresh_cookie}'},
+        )
+        if status == 200:
+            self.token = json.loads(payload)['access']
+            self.store_refresh_cookie(response_headers)
+        else:
+            # Rotated or expired: the next refresh logs in again
+            self.refresh_cookie = None
+
+    def list(self):
+        status, _, payload = self.call(LIST, 'GET', '/api/v1/jobs/')
+        if status == 200:
+            jobs = json.loads(payload)
+            self.job_ids = [job['job_id'] for job in jobs[:100]]
+
+    def create(self):
+        # Unique bytes per upload, so the blob dedupe doesn't skip the transfer
+        content = b'%PDF-1.4\n' + self.rng.randbytes(self.attachment_size)
+        body, content_type = multipart(
+            {
+                'job_title': 'Load Test Engineer',
+                'company_name': 'Load Test Co',
+                'experience_required': '3 years',
+                'current_status': 'SAVED',
+            },
+            {'resume': ('resume.pdf', content, 'application/pdf')},
+        )
+        # The response has no job_id; the next list picks the job up
+        self.call(CREATE, 'POST', '/api/v1/jobs/', body, {'Content-Type': content_type})
+
+    def patch(self):
+        if not self.job_ids:
+            return self.list()
+        body = json.dumps({'current_status': self.rng.choice(STATUSES)})
+        self.call(
+            PATCH, 'PATCH', f'/api/v1/jobs/{self.rng.choice(self.job_ids)}/', body,
+            {'Content-Type': 'application/json'},
+        )
+
+
+class Command(BaseCommand):
+    """
+    Drive a running server (gunicorn or uvicorn) through /api/v1/ with
+    concurrent virtual users and report throughput and latency percentiles
+    per endpoint. Each virtual user logs in as one of the accounts made by
+    `seed_jobs` and then runs the weighted --mix of scenarios until
+    --duration is up. Start the server with the login throttles raised
+    (THROTTLE_LOGIN_IP / THROTTLE_LOGIN_EMAIL), or logins come back 429.
+    """
+
+    help = 'Load test the API of a running server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server under test')
+        parser.add_argument('--concurrency', type=int, default=10, help='Virtual users')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run')
+        parser.add_argument('--mix', default=DEFAULT_MIX, help='Scenario weights, e.g. list=10,patch=4,create=1')
+        parser.add_argument('--think-time', type=float, default=0, help='Seconds each virtual user waits between requests')
+        parser.add_argument('--attachment-size', type=int, default=64 * 1024, help='Bytes per uploaded resume')
+        parser.add_argument('--prefix', default='loadtest', help='Account prefix used by seed_jobs')
+        parser.add_argument('--password', default='loadtest-password', help='Password used by seed_jobs')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the scenario order')
+
+    def parse_mix(self, mix):
+        weights = {}
+        for item in mix.split(','):
+            name, _, weight = item.partition('=')
+            weights[name.strip()] = int(weight or 1)
+        unknown = set(weights) - {'list', 'patch', 'refresh', 'create', 'login'}
+        if unknown:
+            raise ValueError(f'Unknown scenarios in --mix: {", ".join(sorted(unknown))}')
+        return weights
+
+    def run_user(self, index, accounts, weights, deadline, options):
+        user = VirtualUser(
+            Connection(options['url'], options['timeout']),
+            f'{options["prefix"]}-{index % accounts}@example.com',
+            options['password'],
+            random.Random(options['seed'] + index),
+            options['attachment_size'],
+        )
+        user.login()
+        user.list()
+        scenarios = list(weights)
+        while time.monotonic() < deadline:
+            getattr(user, user.rng.choices(scenarios, list(weights.values()))[0])()
+            if options['think_time']:
+                time.sleep(options['think_time'])
+        return user.results
+
+    def report(self, results, elapsed):
+        by_endpoint = {}
+        for name, status, seconds in results:
+            by_endpoint.setdefault(name, []).append((status, seconds))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(results)} requests in {elapsed:.1f}s, {len(results) / elapsed:.1f} req/s'
+        ))
+        for name in (LOGIN, LIST, CREATE, PATCH, REFRESH):
+            calls = by_endpoint.get(name)
+            if not calls:
+                continue
+            timings = sorted(seconds for _, seconds in calls)
+            statuses = Counter(status for status, _ in calls)
+            failed = sum(count for status, count in statuses.items() if not 200 <= status < 300)
+            self.stdout.write(
+                f'  {name:<30} n={len(calls):<6} {len(calls) / elapsed:7.1f}/s  '
+                f'p50={statistics.median(timings) * 1000:7.1f}ms  p90={percentile(timings, 0.90):7.1f}ms  '
+                f'p99={percentile(timings, 0.99):7.1f}ms  max={timings[-1] * 1000:7.1f}ms  errors={failed}'
+            )
+            if failed:
+                details = ', '.join(f'{status or "conn"}: {count}' for status, count in sorted(statuses.items()))
+                self.stdout.write(f'  {"":<30} {details}')
+        if any(status == 429 for _, status, _ in results):
+            self.stdout.write(self.style.WARNING(
+                'Throttled (429): raise THROTTLE_LOGIN_IP / THROTTLE_LOGIN_EMAIL on the server under test'
+            ))
+
+    def handle(self, *args, **options):
+        try:
+            weights = self.parse_mix(options['mix'])
+        except ValueError as e:
+            self.stdout.write(self.style.ERROR(str(e)))
+            return
+        accounts = Users.objects.filter(email__startswith=f'{options["prefix"]}-').count()
+        if not accounts:
+            self.stdout.write(self.style.ERROR(f'No {options["prefix"]} accounts: run seed_jobs first'))
+            return
+        jobs = Jobs.objects.filter(user__email__startswith=f'{options["prefix"]}-').count()
+
+        self.stdout.write(
+            f'📊 {options["url"]}: {options["concurrency"]} virtual users for {options["duration"]:.0f}s, '
+            f'{accounts} accounts, {jobs} jobs, mix {options["mix"]}'
+        )
+        results = []
+        started = time.monotonic()
+        deadline = started + options['duration']
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            futures = [
+                executor.submit(self.run_user, i, accounts, weights, deadline, options)
+                for i in range(options['concurrency'])
+            ]
+            for future in futures:
+                results.extend(future.result())
+        self.report(results, time.monotonic() - started)
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from sameboat.profiling import make_token
+
+
+class Command(BaseCommand):
+    """Print an X-Profile header value that turns on Server-Timing for any request."""
+
+    help = 'Create a signed token for per-request profiling'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--label', default='cli', help='Who the token is for (shows up in the logs)')
+
+    def handle(self, *args, **options):
+        token = make_token(options['label'])
+        self.stdout.write(f'X-Profile: {token}')
+        self.stdout.write(
+            f'Valid for {settings.REQUEST_PROFILING_TOKEN_MAX_AGE}s. Add "X-Profile-Flamegraph: 1" to also dump '
+            f'a flamegraph to {settings.REQUEST_PROFILING_DUMP_DIR}.'
+        )
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.reconcile import UPLOADS_PREFIX, reconcile_storage
+
+
+class Command(BaseCommand):
+    """Delete stored objects no job, blob or upload session references."""
+
+    help = 'Find (and unless --dry-run, delete) orphaned objects under user_uploads/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+        parser.add_argument(
+            '--grace-hours', type=float, default=settings.STORAGE_RECONCILE_GRACE_SECONDS / 3600,
+            help='Leave objects younger than this alone',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.STORAGE_RECONCILE_BATCH_SIZE,
+            help='Objects checked (and deleted) per pass',
+        )
+        parser.add_argument('--prefix', default=UPLOADS_PREFIX, help='Key prefix to reconcile')
+
+    def handle(self, *args, **options):
+        stats = reconcile_storage(
+            dry_run=options['dry_run'],
+            grace_seconds=int(options['grace_hours'] * 3600),
+            batch_size=options['batch_size'],
+            prefix=options['prefix'],
+        )
+        mb = 1024 * 1024
+        self.stdout.write(
+            f"📊 Scanned {stats['scanned']} objects ({stats['scanned_bytes'] / mb:.1f} MB) "
+            f"in {stats['elapsed_seconds']:.2f}s, {stats['objects_per_second']:.0f} objects/s"
+        )
+        self.stdout.write(
+            f"  referenced outside blobs: {stats['referenced_outside_blobs']}, "
+            f"within grace period: {stats['too_recent']}"
+        )
+        orphans = f"{stats['orphans']} orphaned objects ({stats['orphan_bytes'] / mb:.1f} MB)"
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"Dry run: would delete {orphans}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ Deleted {orphans}"))
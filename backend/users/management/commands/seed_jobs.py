@@ -0,0 +1,253 @@
+import datetime
+import json
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from bisect import bisect
+from itertools import accumulate
+from operator import itemgetter
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+from users import account_deletion
+from users.models import Jobs, Users
+
+TITLES = [
+    'Backend Engineer', 'Senior Backend Engineer', 'Platform Engineer', 'Data Engineer', 'Frontend Developer',
+    'Full Stack Developer', 'Site Reliability Engineer', 'ML Engineer', 'DevOps Engineer', 'Software Engineer',
+    'Staff Engineer', 'Engineering Manager', 'Data Analyst', 'QA Engineer', 'Mobile Developer',
+]
+COMPANIES = [
+    'Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark Industries', 'Wayne Enterprises', 'Cyberdyne',
+    'Soylent', 'Tyrell', 'Wonka', 'Pied Piper', 'Aviato', 'Vandelay Industries', 'Massive Dynamic', 'Oscorp',
+]
+LOCATIONS = ['Remote', 'Bengaluru', 'Hyderabad', 'Pune', 'Mumbai', 'Delhi', 'Chennai', 'London', 'Berlin', 'New York']
+# Most-asked skills first: weights fall off with rank, like real postings
+SKILLS = [
+    'python', 'sql', 'aws', 'docker', 'javascript', 'react', 'django', 'kubernetes', 'typescript', 'postgresql',
+    'java', 'git', 'linux', 'node.js', 'redis', 'go', 'terraform', 'gcp', 'azure', 'celery', 'kafka', 'spark',
+    'airflow', 'graphql', 'c++', 'c#', 'rust', 'pandas', 'pytorch', 'ansible',
+]
+NOTES = [
+    'Recruiter reached out on LinkedIn',
+    'Referral from a former colleague',
+    'Salary range {low}-{high} LPA',
+    'Follow up in {days} days',
+    'Take-home assignment due in {days} days',
+    'Hiring manager call went well',
+    'Asked about remote policy',
+    'Team uses {skill} heavily',
+]
+# Application funnel: most jobs are saved or applied to, few reach an offer
+STATUSES = {
+    Jobs.CurrentStatus.SAVED: 30, Jobs.CurrentStatus.APPLIED: 35, Jobs.CurrentStatus.SHORTLISTED: 8,
+    Jobs.CurrentStatus.INTERVIEW: 7, Jobs.CurrentStatus.OFFER: 2, Jobs.CurrentStatus.REJECTED: 18,
+}
+EMPLOYMENT_TYPES = {
+    Jobs.EmploymentType.FULL_TIME: 75, Jobs.EmploymentType.CONTRACT: 12,
+    Jobs.EmploymentType.INTERNSHIP: 8, Jobs.EmploymentType.PART_TIME: 5,
+}
+NOTE_COUNTS = {0: 40, 1: 35, 2: 15, 3: 10}
+JSON_FIELDS = ('skills', 'notes')
+
+
+class Weighted:
+    """Weighted picks with one rng.random() and a bisect (random.choices is several times slower per call)."""
+
+    def __init__(self, values, weights):
+        self.values = list(values)
+        self.cum_weights = list(accumulate(weights))
+        self.total = self.cum_weights[-1]
+
+    def pick(self, rng):
+        return self.values[bisect(self.cum_weights, rng.random() * self.total)]
+
+
+SKILL_PICKER = Weighted(SKILLS, (1 / rank for rank in range(1, len(SKILLS) + 1)))
+STATUS_PICKER = Weighted(STATUSES, STATUSES.values())
+EMPLOYMENT_PICKER = Weighted(EMPLOYMENT_TYPES, EMPLOYMENT_TYPES.values())
+NOTE_COUNT_PICKER = Weighted(NOTE_COUNTS, NOTE_COUNTS.values())
+INACTIVE_STATUSES = (Jobs.CurrentStatus.REJECTED, Jobs.CurrentStatus.OFFER)
+
+
+@contextmanager
+def explicit_timestamps(model):
+    """Let bulk_create keep the generated created_at / updated_at (auto_now* would overwrite them)."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    """
+    Create load-test accounts (<prefix>-<n>@example.com, all with the same
+    password) and generate jobs for them with realistic spreads: some
+    users track many more jobs than others, statuses follow an application
+    funnel, popular skills show up more often, dates fall in the --days
+    before --end-date. Rows go in through COPY on PostgreSQL and bulk_create
+    elsewhere, in --batch-size chunks. The same --seed and --end-date give
+    the same rows whatever the method or batch size. Existing accounts with
+    the prefix are deleted first.
+    """
+
+    help = 'Seed load-test users and jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Number of accounts')
+        parser.add_argument('--jobs', type=int, default=1000, help='Total jobs, spread unevenly over the accounts')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Rows per COPY / bulk_create call')
+        parser.add_argument('--method', choices=['auto', 'copy', 'bulk'], default='auto',
+                            help='COPY (PostgreSQL only) or bulk_create; auto picks COPY when it can')
+        parser.add_argument('--end-date', type=datetime.date.fromisoformat, default=datetime.date.today(),
+                            help='Latest creation date (YYYY-MM-DD); pin it to reproduce a run exactly')
+        parser.add_argument('--days', type=int, default=365, help='Creation dates span this many days')
+        parser.add_argument('--prefix', default='loadtest', help='Email / user name prefix of the accounts')
+        parser.add_argument('--password', default='loadtest-password', help='Password of every account')
+
+    def delete_existing(self, prefix):
+        user_ids = list(Users.objects.filter(email__startswith=f'{prefix}-').values_list('pk', flat=True))
+        for user_id in user_ids:
+            account_deletion.delete_job_rows(user_id)
+            account_deletion.delete_user_rows(user_id)
+        return len(user_ids)
+
+    def make_users(self, rng, options):
+        # Hashing is the slow part of create_user; every account shares one hash
+        password = make_password(options['password'])
+        prefix = options['prefix']
+        users = [
+            Users(
+                user_id=uuid.UUID(int=rng.getrandbits(128)),
+                email=f'{prefix}-{i}@example.com',
+                user_name=f'{prefix}-{i}',
+                first_name='Load',
+                last_name=f'Test {i}',
+                password=password,
+            )
+            for i in range(options['users'])
+        ]
+        return Users.objects.bulk_create(users, batch_size=options['batch_size'])
+
+    def make_note(self, rng):
+        return rng.choice(NOTES).format(
+            low=rng.randint(6, 30), high=rng.randint(31, 60), days=rng.randint(2, 14), skill=SKILL_PICKER.pick(rng),
+        )
+
+    def make_rows(self, rng, users, options):
+        """
+        Yield one dict of column values (by attname) per job. Plain dicts
+        rather than model instances: building a Jobs costs as much as
+        inserting it. One job's randomness never depends on batching.
+        """
+        # Jobs per user are lognormal: a few power users track several times the median
+        user_picker = Weighted([user.pk for user in users], (rng.lognormvariate(0, 1) for _ in users))
+        end = datetime.datetime.combine(options['end_date'], datetime.time(23, 59, 59), tzinfo=datetime.timezone.utc)
+        span = options['days'] * 86400
+        for n in range(options['jobs']):
+            created_at = end - datetime.timedelta(seconds=rng.randrange(span))
+            status = STATUS_PICKER.pick(rng)
+            company = rng.choice(COMPANIES)
+            skills = dict.fromkeys(SKILL_PICKER.pick(rng) for _ in range(rng.randint(2, 8)))
+            applied = status != Jobs.CurrentStatus.SAVED
+            yield {
+                'job_id': uuid.UUID(int=rng.getrandbits(128)),
+                'user_id': user_picker.pick(rng),
+                'job_title': rng.choice(TITLES),
+                'company_name': company,
+                'location': rng.choice(LOCATIONS),
+                'employment_type': EMPLOYMENT_PICKER.pick(rng),
+                'experience_required': f'{rng.randint(0, 12)} years',
+                'skills': list(skills),
+                'current_status': status,
+                'applied_date': (created_at + datetime.timedelta(days=rng.randint(0, 14))).date() if applied else None,
+                'notes': [self.make_note(rng) for _ in range(NOTE_COUNT_PICKER.pick(rng))],
+                'is_active': status not in INACTIVE_STATUSES,
+                'job_url': f'https://jobs.example.com/{company.lower().replace(" ", "-")}/{n}',
+                'resume': '',
+                'cover_letter': '',
+                'resume_url': '',
+                'cover_letter_url': '',
+                'created_at': created_at,
+                'updated_at': min(end, created_at + datetime.timedelta(seconds=rng.randrange(30 * 86400))),
+            }
+
+    def batches(self, rows, batch_size):
+        while True:
+            batch = [row for _, row in zip(range(batch_size), rows)]
+            if not batch:
+                return
+            yield batch
+
+    def insert_bulk(self, batches):
+        fields = Jobs._meta.concrete_fields
+        values = itemgetter(*(field.attname for field in fields))
+        created = 0
+        with explicit_timestamps(Jobs):
+            for batch in batches:
+                # Django splits each call further to stay under the backend's parameter limit
+                with transaction.atomic():
+                    Jobs.objects.bulk_create([Jobs(*values(row)) for row in batch])
+                created += len(batch)
+        return created
+
+    def insert_copy(self, batches):
+        fields = Jobs._meta.concrete_fields
+        values = itemgetter(*(field.attname for field in fields))
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        sql = f'COPY {connection.ops.quote_name(Jobs._meta.db_table)} ({columns}) FROM STDIN'
+        created = 0
+        for batch in batches:
+            with transaction.atomic(), connection.cursor() as cursor:
+                with cursor.copy(sql) as copy:
+                    for row in batch:
+                        # COPY's text format takes JSON as plain text
+                        for name in JSON_FIELDS:
+                            row[name] = json.dumps(row[name])
+                        copy.write_row(values(row))
+            created += len(batch)
+        return created
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            self.stdout.write(self.style.ERROR('--users must be at least 1'))
+            return
+        method = options['method']
+        can_copy = connection.vendor == 'postgresql' and is_psycopg3
+        if method == 'copy' and not can_copy:
+            self.stdout.write(self.style.ERROR('COPY needs PostgreSQL with psycopg 3'))
+            return
+        if method == 'auto':
+            method = 'copy' if can_copy else 'bulk'
+
+        # Keyed by prefix too, so two seeded sets never share primary keys
+        rng = random.Random(f'{options["prefix"]}:{options["seed"]}')
+        started = time.perf_counter()
+        deleted = self.delete_existing(options['prefix'])
+        if deleted:
+            self.stdout.write(f'🧹 Deleted {deleted} existing {options["prefix"]} accounts')
+
+        users = self.make_users(rng, options)
+        batches = self.batches(self.make_rows(rng, users, options), options['batch_size'])
+        insert = self.insert_copy if method == 'copy' else self.insert_bulk
+        created = insert(batches)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {len(users)} users, {created} jobs in {elapsed:.1f}s ({created / elapsed:,.0f} jobs/s, {method}, '
+            f'seed {options["seed"]}, end date {options["end_date"]})'
+        ))
+        self.stdout.write(f'   Log in as {options["prefix"]}-0@example.com / {options["password"]}')
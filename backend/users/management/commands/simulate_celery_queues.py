@@ -0,0 +1,114 @@
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+def io_task(latency, submitted_at):
+    """Stand-in for an S3 upload/delete or SMTP send: waits on the network."""
+    time.sleep(latency)
+    return time.perf_counter() - submitted_at
+
+
+def cpu_task(iterations, submitted_at):
+    """Stand-in for CPU-bound work (parsing, image re-encoding): holds the GIL."""
+    total = 0
+    for i in range(iterations):
+        total += i * i
+    return time.perf_counter() - submitted_at
+
+
+class Command(BaseCommand):
+    """
+    Simulate the worker layouts on a mixed load, in this process: each
+    worker is a thread or process pool sized from TASK_QUEUE_WORKERS, and
+    the tasks are stand-ins that sleep (network waits) or spin (CPU). No
+    broker, workers or real tasks are involved, so broker round trips,
+    prefetching and serialization are not measured; what it shows is how
+    queue separation and pool types change queueing delay and throughput.
+    """
+
+    help = 'Simulate solo vs per-queue worker layouts on a mixed task load (no broker involved)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uploads', type=int, default=40, help='Number of upload tasks')
+        parser.add_argument('--deletes', type=int, default=40, help='Number of delete tasks')
+        parser.add_argument('--emails', type=int, default=20, help='Number of email tasks')
+        parser.add_argument('--cpu', type=int, default=8, help='Number of CPU-bound tasks')
+        parser.add_argument('--upload-latency', type=float, default=0.25, help='Seconds per upload')
+        parser.add_argument('--delete-latency', type=float, default=0.05, help='Seconds per delete')
+        parser.add_argument('--email-latency', type=float, default=0.1, help='Seconds per email')
+        parser.add_argument('--cpu-iterations', type=int, default=2_000_000, help='Loop size per CPU task')
+        parser.add_argument('--seed', type=int, default=42, help='Shuffle seed for arrival order')
+
+    def build_load(self, options):
+        load = (
+            [('uploads', io_task, options['upload_latency'])] * options['uploads']
+            + [('deletes', io_task, options['delete_latency'])] * options['deletes']
+            + [('email', io_task, options['email_latency'])] * options['emails']
+            + [('maintenance', cpu_task, options['cpu_iterations'])] * options['cpu']
+        )
+        random.Random(options['seed']).shuffle(load)
+        return load
+
+    def run_layout(self, load, executors, route):
+        latencies = {}
+        started = time.perf_counter()
+        futures = []
+        for queue, func, arg in load:
+            future = executors[route(queue)].submit(func, arg, time.perf_counter())
+            futures.append((queue, future))
+        wait([f for _, f in futures])
+        elapsed = time.perf_counter() - started
+
+        for queue, future in futures:
+            latencies.setdefault(queue, []).append(future.result())
+        for executor in set(executors.values()):
+            executor.shutdown()
+        return elapsed, latencies
+
+    def report(self, name, elapsed, latencies, total):
+        self.stdout.write(self.style.SUCCESS(
+            f'{name}: {elapsed:.2f}s total, {total / elapsed:.1f} tasks/s'
+        ))
+        for queue, values in sorted(latencies.items()):
+            values.sort()
+            p99 = values[min(len(values) - 1, int(len(values) * 0.99))]
+            self.stdout.write(
+                f'  {queue:<12} n={len(values):<4} '
+                f'p50={statistics.median(values) * 1000:8.1f}ms  p99={p99 * 1000:8.1f}ms'
+            )
+
+    def check_routes(self):
+        """Warn about queues CELERY_TASK_ROUTES sends tasks to that no worker group consumes."""
+        served = {queue for queues in settings.TASK_QUEUE_WORKERS for queue in queues.split(',')}
+        routed = {route['queue'] for route in settings.CELERY_TASK_ROUTES.values()}
+        for queue in sorted(routed - served):
+            self.stdout.write(self.style.WARNING(f'⚠️ Queue "{queue}" is routed to but has no worker group'))
+
+    def handle(self, *args, **options):
+        self.check_routes()
+        load = self.build_load(options)
+        total = len(load)
+        self.stdout.write(f'📊 Simulated mixed load of {total} tasks')
+
+        # Everything through one solo worker (the old CELERY_WORKER_CONCURRENCY = 1 setup)
+        solo = ThreadPoolExecutor(max_workers=1)
+        elapsed, latencies = self.run_layout(load, {'all': solo}, lambda queue: 'all')
+        self.report('solo (1 worker, 1 queue)', elapsed, latencies, total)
+
+        # Per-queue workers with the pools configured in TASK_QUEUE_WORKERS
+        executors, routes = {}, {}
+        for queues, worker in settings.TASK_QUEUE_WORKERS.items():
+            if worker['pool'] == 'prefork':
+                executor = ProcessPoolExecutor(max_workers=worker['concurrency'])
+            else:
+                executor = ThreadPoolExecutor(max_workers=worker['concurrency'])
+            for queue in queues.split(','):
+                executors[queue] = executor
+                routes[queue] = queue
+        elapsed, latencies = self.run_layout(load, executors, routes.__getitem__)
+        self.report('routed (TASK_QUEUE_WORKERS)', elapsed, latencies, total)
@@ -0,0 +1,276 @@
+"""
+Resume-to-job match scoring over a user's tracked jobs.
+
+Each job is a TF-IDF vector over its skills, title and notes (skills and
+title weighted up). A resume is scored against every job at once with two
+sparse matrix-vector products: cosine(x·idf, q·idf) = X @ (q·idf²) / norms,
+where the row norms come from the squared matrix, so nothing has to be
+re-weighted when document frequencies change.
+
+A user's JobMatchIndex is cached in Redis and in process memory, stamped
+with a version token. Saving or deleting a job queues a task that
+re-tokenizes only that job and patches the cached index (job_changed), so
+a match right after an edit can lag by the task's latency; any version
+mismatch makes the next read rebuild from the database.
+"""
+import logging
+import math
+import re
+import uuid
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from scipy import sparse
+
+from sameboat.services.local_cache import LocalTTLCache
+from users.models import Jobs
+
+logger = logging.getLogger(__name__)
+
+INDEX_PREFIX = "job_match:index:"
+VERSION_PREFIX = "job_match:version:"
+LOCK_PREFIX = "job_match:lock:"
+
+# Fields that feed the vectors; saves touching none of them leave the index alone
+MATCH_FIELDS = ("job_title", "skills", "notes")
+SKILL_WEIGHT = 3
+TITLE_WEIGHT = 2
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*")
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have i in is it its of on or our that the this "
+    "to was we were will with you your".split()
+)
+
+_local_indexes = LocalTTLCache(
+    maxsize=settings.JOB_MATCH_LOCAL_MAXSIZE,
+    ttl=settings.JOB_MATCH_LOCAL_TTL,
+)
+
+
+def tokenize(text):
+    """Lowercase terms, keeping skill spellings like c++, c# and node.js whole."""
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def job_terms(job):
+    """Weighted term counts for one job (a dict of Jobs field values)."""
+    counts = Counter()
+    for skill in job["skills"] or []:
+        for token in tokenize(str(skill)):
+            counts[token] += SKILL_WEIGHT
+    for token in tokenize(job["job_title"]):
+        counts[token] += TITLE_WEIGHT
+    for note in job["notes"] or []:
+        counts.update(tokenize(str(note)))
+    return counts
+
+
+class JobMatchIndex:
+    """
+    TF-IDF vectors for one user's jobs. Rows hold sublinear term
+    frequencies (1 + log tf); the CSR matrix is assembled lazily from the
+    per-row arrays, so replacing a job costs O(its terms) plus one
+    concatenation on the next score.
+    """
+
+    def __init__(self, version=None):
+        self.version = version
+        self.vocabulary = {}   # term -> column
+        self.df = np.zeros(0, dtype=np.float64)
+        self.job_ids = []      # row -> job_id
+        self.rows = {}         # job_id -> row
+        self.row_columns = []
+        self.row_weights = []
+        self._matrix = None
+
+    @classmethod
+    def build(cls, jobs, version=None):
+        index = cls(version)
+        for job in jobs:
+            index.update(job)
+        return index
+
+    def __len__(self):
+        return len(self.job_ids)
+
+    def __getstate__(self):
+        # The matrix is cheap to rebuild; keep the cached payload small
+        state = self.__dict__.copy()
+        state["_matrix"] = None
+        return state
+
+    def _columns(self, terms):
+        new_terms = [term for term in terms if term not in self.vocabulary]
+        if new_terms:
+            for term in new_terms:
+                self.vocabulary[term] = len(self.vocabulary)
+            self.df = np.concatenate([self.df, np.zeros(len(new_terms))])
+        return np.fromiter((self.vocabulary[term] for term in terms), dtype=np.int32, count=len(terms))
+
+    def update(self, job):
+        """Add or replace one job (a dict with job_id and MATCH_FIELDS)."""
+        job_id = str(job["job_id"])
+        counts = job_terms(job)
+        columns = self._columns(list(counts))
+        weights = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+
+        row = self.rows.get(job_id)
+        if row is None:
+            row = self.rows[job_id] = len(self.job_ids)
+            self.job_ids.append(job_id)
+            self.row_columns.append(columns)
+            self.row_weights.append(weights)
+        else:
+            self.df[self.row_columns[row]] -= 1
+            self.row_columns[row] = columns
+            self.row_weights[row] = weights
+        self.df[columns] += 1
+        self._matrix = None
+
+    def remove(self, job_id):
+        """Drop a job, moving the last row into its place."""
+        job_id = str(job_id)
+        row = self.rows.pop(job_id, None)
+        if row is None:
+            return
+        self.df[self.row_columns[row]] -= 1
+        last = len(self.job_ids) - 1
+        if row != last:
+            moved = self.job_ids[last]
+            self.job_ids[row] = moved
+            self.row_columns[row] = self.row_columns[last]
+            self.row_weights[row] = self.row_weights[last]
+            self.rows[moved] = row
+        self.job_ids.pop()
+        self.row_columns.pop()
+        self.row_weights.pop()
+        self._matrix = None
+
+    def matrix(self):
+        """(tf matrix, tf² matrix), both CSR with one row per job."""
+        if self._matrix is None:
+            lengths = np.fromiter((len(c) for c in self.row_columns), dtype=np.int64, count=len(self.row_columns))
+            indptr = np.concatenate([[0], np.cumsum(lengths)])
+            shape = (len(self.job_ids), len(self.vocabulary))
+            if len(self.job_ids):
+                indices = np.concatenate(self.row_columns)
+                data = np.concatenate(self.row_weights)
+            else:
+                indices, data = np.zeros(0, dtype=np.int32), np.zeros(0)
+            tf = sparse.csr_matrix((data, indices, indptr), shape=shape)
+            squared = sparse.csr_matrix((data * data, indices, indptr), shape=shape)
+            self._matrix = (tf, squared)
+        return self._matrix
+
+    def idf(self):
+        n = len(self.job_ids)
+        return np.log((1.0 + n) / (1.0 + self.df)) + 1.0
+
+    def score(self, text):
+        """Cosine similarity of `text` against every job: (job_ids, scores array)."""
+        scores = np.zeros(len(self.job_ids))
+        counts = Counter(term for term in tokenize(text) if term in self.vocabulary)
+        if not counts or not len(self.job_ids):
+            return self.job_ids, scores
+
+        columns = np.fromiter((self.vocabulary[t] for t in counts), dtype=np.int32, count=len(counts))
+        weights = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+        idf = self.idf()
+        query = np.zeros(len(self.vocabulary))
+        query[columns] = weights * idf[columns] ** 2
+        query_norm = math.sqrt(float(np.sum((weights * idf[columns]) ** 2)))
+
+        tf, squared = self.matrix()
+        norms = np.sqrt(squared @ (idf * idf))
+        dots = tf @ query
+        np.divide(dots, norms * query_norm, out=scores, where=norms > 0)
+        return self.job_ids, scores
+
+    def top(self, text, limit):
+        """The `limit` best-matching (job_id, score) pairs, best first, zero scores dropped."""
+        job_ids, scores = self.score(text)
+        if limit < len(scores):
+            candidates = np.argpartition(-scores, limit)[:limit]
+        else:
+            candidates = np.arange(len(scores))
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(job_ids[i], float(scores[i])) for i in ranked if scores[i] > 0]
+
+
+def _user_jobs(user_id):
+    # Always the primary: an index built from a lagging replica would be
+    # cached under the current version and never see the missing writes
+    return Jobs.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id).values("job_id", *MATCH_FIELDS).iterator()
+
+
+def _version(user_id):
+    key = f"{VERSION_PREFIX}{user_id}"
+    cache.add(key, uuid.uuid4().hex, None)
+    return cache.get(key)
+
+
+def get_index(user_id):
+    """The user's current JobMatchIndex, from process memory, Redis or the database."""
+    try:
+        version = _version(user_id)
+        index = _local_indexes.get(user_id)
+        if index is not None and index.version == version:
+            return index
+
+        index = cache.get(f"{INDEX_PREFIX}{user_id}")
+        if index is None or index.version != version:
+            index = JobMatchIndex.build(_user_jobs(user_id), version)
+            with cache.lock(f"{LOCK_PREFIX}{user_id}", timeout=10):
+                # A job changed while we were reading: don't publish a stale index
+                if cache.get(f"{VERSION_PREFIX}{user_id}") == version:
+                    cache.set(f"{INDEX_PREFIX}{user_id}", index, settings.JOB_MATCH_CACHE_TTL)
+    except Exception as e:
+        logger.warning("Job match index cache unavailable for %s: %s", user_id, e)
+        return JobMatchIndex.build(_user_jobs(user_id))
+
+    _local_indexes.set(user_id, index)
+    return index
+
+
+def job_changed(user_id, job_id):
+    """
+    Re-read one job and patch it into the user's cached index (or remove
+    it if deleted), under a new version token. Run by
+    update_job_match_index_task once the write has committed.
+    """
+    try:
+        with cache.lock(f"{LOCK_PREFIX}{user_id}", timeout=10):
+            old_version = cache.get(f"{VERSION_PREFIX}{user_id}")
+            new_version = uuid.uuid4().hex
+            cache.set(f"{VERSION_PREFIX}{user_id}", new_version, None)
+
+            index = cache.get(f"{INDEX_PREFIX}{user_id}")
+            if index is None or index.version != old_version:
+                # Nothing (current) cached; the next read builds from the database
+                cache.delete(f"{INDEX_PREFIX}{user_id}")
+                return
+
+            job = Jobs.objects.filter(pk=job_id, user_id=user_id).values("job_id", *MATCH_FIELDS).first()
+            if job is None:
+                index.remove(job_id)
+            else:
+                index.update(job)
+            index.version = new_version
+            cache.set(f"{INDEX_PREFIX}{user_id}", index, settings.JOB_MATCH_CACHE_TTL)
+    except Exception as e:
+        logger.warning("Could not update job match index for %s: %s", user_id, e)
+
+
+def forget_index(user_id):
+    """Drop a user's cached index (their jobs were deleted without signals)."""
+    _local_indexes.delete(user_id)
+    try:
+        cache.delete_many([f"{INDEX_PREFIX}{user_id}", f"{VERSION_PREFIX}{user_id}"])
+    except Exception as e:
+        logger.warning("Could not drop job match index for %s: %s", user_id, e)
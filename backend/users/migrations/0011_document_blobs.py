@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:11
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentBlob',
+            fields=[
+                ('blob_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('sha256', models.CharField(max_length=64)),
+                ('key', models.CharField(max_length=500, unique=True)),
+                ('size', models.BigIntegerField(default=0)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('uploaded', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_blobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'document_blobs',
+            },
+        ),
+        migrations.CreateModel(
+            name='DocumentReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field_name', models.CharField(max_length=30)),
+                ('filename', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='references', to='users.documentblob')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='documents', to='users.jobs')),
+            ],
+            options={
+                'db_table': 'document_references',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='documentblob',
+            constraint=models.UniqueConstraint(fields=('user', 'sha256'), name='unique_user_blob_sha256'),
+        ),
+        migrations.AddConstraint(
+            model_name='documentreference',
+            constraint=models.UniqueConstraint(fields=('job', 'field_name'), name='unique_job_document_field'),
+        ),
+    ]
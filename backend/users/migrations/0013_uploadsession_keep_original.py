@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_document_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='keep_original',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -2,9 +2,6 @@ from django.db import models
 import uuid
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
-from storages.backends.s3boto3 import S3Boto3Storage
-
-s3_storage = S3Boto3Storage()
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, user_name, password=None, **extra_fields):
@@ -120,4 +117,119 @@ class Jobs(models.Model):
     def __str__(self):
         return f"{self.job_title} at {self.company_name}"
 
-            
\ No newline at end of file
+            
+
+class UploadSession(models.Model):
+    """
+    A resumable (chunked) attachment upload. Chunks are appended in order at
+    `offset`; with the S3 backend each chunk becomes one multipart part,
+    with the local backend it is appended to a spool file.
+    """
+
+    class Backend(models.TextChoices):
+        S3 = "S3", _("S3 multipart")
+        LOCAL = "LOCAL", _("Local spool")
+
+    class Status(models.TextChoices):
+        ACTIVE = "ACTIVE", _("Active")
+        COMPLETED = "COMPLETED", _("Completed")
+
+    session_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey("Users", on_delete=models.CASCADE, related_name="upload_sessions")
+    job = models.ForeignKey("Jobs", on_delete=models.CASCADE, related_name="upload_sessions")
+
+    field_name = models.CharField(max_length=30)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    total_size = models.BigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    offset = models.BigIntegerField(default=0)
+
+    backend = models.CharField(max_length=10, choices=Backend.choices)
+    storage_key = models.CharField(max_length=500)      # S3 key or spool path
+    s3_upload_id = models.CharField(max_length=255, blank=True)
+    parts = models.JSONField(default=list, blank=True)  # [{"PartNumber", "ETag"}]
+    generation = models.BigIntegerField(null=True, blank=True)
+    keep_original = models.BooleanField(default=False)  # skip image optimization
+
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.ACTIVE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = "upload_sessions"
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.total_size})"
+
+
+class DocumentBlob(models.Model):
+    """
+    One stored file, keyed by the SHA-256 of its content (per user), so the
+    same resume attached to many jobs is uploaded and stored once.
+    `ref_count` counts the DocumentReference rows plus in-flight uploads
+    that have claimed the blob; the object is deleted when it drops to 0.
+    """
+    blob_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey("Users", on_delete=models.CASCADE, related_name="document_blobs")
+    sha256 = models.CharField(max_length=64)
+    key = models.CharField(max_length=500, unique=True)
+    size = models.BigIntegerField(default=0)
+    content_type = models.CharField(max_length=100, blank=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    uploaded = models.BooleanField(default=False)   # object exists in storage
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "document_blobs"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "sha256"], name="unique_user_blob_sha256"),
+        ]
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
+
+class DocumentReference(models.Model):
+    """Links a job's resume/cover letter field to the blob holding the file."""
+    job = models.ForeignKey("Jobs", on_delete=models.CASCADE, related_name="documents")
+    field_name = models.CharField(max_length=30)
+    blob = models.ForeignKey("DocumentBlob", on_delete=models.RESTRICT, related_name="references")
+    filename = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "document_references"
+        constraints = [
+            models.UniqueConstraint(fields=["job", "field_name"], name="unique_job_document_field"),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} on {self.job_id}"
+
+
+class DocumentText(models.Model):
+    """
+    Plain text extracted from a document, keyed by the SHA-256 of its
+    content so the same file is parsed once however many users or jobs
+    attach it. Failed extractions are kept too, so they aren't retried.
+    """
+
+    class Status(models.TextChoices):
+        DONE = "DONE", "Done"
+        FAILED = "FAILED", "Failed"
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    text = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.DONE)
+    error = models.CharField(max_length=500, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "document_texts"
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.status})"
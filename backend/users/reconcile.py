@@ -0,0 +1,114 @@
+"""
+Finds and deletes stored objects under user_uploads/ that nothing references.
+
+Referenced keys are:
+  * blob keys with a DocumentBlob row (every job attachment since content
+    addressing; rows exist before their object is written),
+  * older per-filename keys still in Jobs.resume_url / cover_letter_url,
+  * staging keys of resumable upload sessions that still exist.
+
+The legacy and staging keys are collected into a set by streaming the
+tables in chunks; that set only shrinks as old attachments are replaced.
+The bucket listing is then walked one page at a time and each page's blob
+keys are looked up in document_blobs, so memory stays bounded by the page
+size however large the bucket is. Objects younger than the grace period
+are never touched, which covers uploads that are still in flight.
+"""
+import logging
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.utils import timezone
+
+from sameboat.services.storage import get_storage
+from users.documents import is_blob_key
+from users.models import DocumentBlob, Jobs, UploadSession
+from users.uploads import UPLOAD_FIELDS, extract_key
+
+logger = logging.getLogger(__name__)
+
+UPLOADS_PREFIX = "user_uploads/"
+
+
+def unmanaged_referenced_keys(chunk_size=None):
+    """Keys referenced outside document_blobs: legacy job URLs and upload staging objects."""
+    chunk_size = chunk_size or settings.STORAGE_RECONCILE_BATCH_SIZE
+    keys = set()
+    for urls in Jobs.objects.values_list(*UPLOAD_FIELDS).iterator(chunk_size=chunk_size):
+        for url in urls:
+            key = extract_key(url)
+            if key and not is_blob_key(key):
+                keys.add(key)
+    sessions = UploadSession.objects.filter(backend=UploadSession.Backend.S3)
+    keys.update(sessions.values_list("storage_key", flat=True).iterator(chunk_size=chunk_size))
+    return keys
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def reconcile_storage(dry_run=False, grace_seconds=None, batch_size=None, prefix=UPLOADS_PREFIX):
+    """
+    Delete (or with dry_run only count) unreferenced objects older than
+    the grace period. Returns a stats dict.
+    """
+    grace_seconds = settings.STORAGE_RECONCILE_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    batch_size = batch_size or settings.STORAGE_RECONCILE_BATCH_SIZE
+    cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+    storage = get_storage()
+
+    started = time.perf_counter()
+    referenced = unmanaged_referenced_keys(batch_size)
+    stats = {
+        "dry_run": dry_run,
+        "referenced_outside_blobs": len(referenced),
+        "scanned": 0,
+        "scanned_bytes": 0,
+        "too_recent": 0,
+        "orphans": 0,
+        "orphan_bytes": 0,
+        "deleted": 0,
+    }
+
+    for page in _batches(storage.list_prefix(prefix), batch_size):
+        stats["scanned"] += len(page)
+        stats["scanned_bytes"] += sum(obj.size for obj in page)
+
+        candidates = {}
+        for obj in page:
+            if obj.key in referenced:
+                continue
+            if obj.last_modified > cutoff:
+                stats["too_recent"] += 1
+                continue
+            candidates[obj.key] = obj
+        if not candidates:
+            continue
+
+        blob_keys = set(
+            DocumentBlob.objects.filter(key__in=list(candidates)).values_list("key", flat=True)
+        )
+        orphans = [obj for key, obj in candidates.items() if key not in blob_keys]
+        stats["orphans"] += len(orphans)
+        stats["orphan_bytes"] += sum(obj.size for obj in orphans)
+
+        if orphans and not dry_run:
+            keys = [obj.key for obj in orphans]
+            storage.delete_many(keys)
+            stats["deleted"] += len(keys)
+            logger.info("Deleted %d orphaned objects", len(keys))
+            # The same content re-uploaded while we were deleting: make the
+            # next upload of it send the bytes again instead of trusting the key
+            revived = DocumentBlob.objects.filter(key__in=keys)
+            if revived.update(uploaded=False):
+                logger.warning("Blobs re-created during reconciliation were deleted: %s", keys)
+
+    elapsed = time.perf_counter() - started
+    stats["elapsed_seconds"] = round(elapsed, 3)
+    stats["objects_per_second"] = round(stats["scanned"] / elapsed, 1) if elapsed else 0.0
+    return stats
@@ -1,24 +1,59 @@
-from django.db.models.signals import post_delete
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.conf import settings
-from .models import Jobs
-from users.tasks import delete_from_s3_task
-from urllib.parse import urlparse
+from .models import Jobs, Users, DocumentReference
+from users.tasks import delete_from_s3_task, update_job_match_index_task
+from users.api.authentication import invalidate_cached_user
+from users.uploads import extract_key
+from users.documents import is_blob_key, release_blob
+from users.matching import MATCH_FIELDS
+from sameboat.services.task_dispatch import dispatch
 
 
-def extract_key(file_url):
-    """Extract the S3 key from a full S3 file URL (with or without region)."""
-    if not file_url:
-        return None
-    parsed = urlparse(file_url)
-    return parsed.path.lstrip("/")
-
 @receiver(post_delete, sender=Jobs)
 def delete_job_files_from_s3(sender, instance, **kwargs):
     """
-    When a Job is deleted, enqueue file deletion as async Celery tasks.
+    When a Job is deleted, enqueue file deletion as async Celery tasks
+    (published once the delete commits). Content-addressed files are
+    shared between jobs and released through their DocumentReference
+    instead; only files uploaded before that are deleted by key here.
     """
     for url in [instance.resume_url, instance.cover_letter_url]:
         key = extract_key(url)
-        if key:
-            delete_from_s3_task.delay(key)
+        if key and not is_blob_key(key):
+            dispatch(delete_from_s3_task.s(key))
+
+
+@receiver(post_save, sender=Jobs)
+@receiver(post_delete, sender=Jobs)
+def update_job_match_index(sender, instance, update_fields=None, **kwargs):
+    """
+    Queue a task that patches the job into its owner's cached match index
+    (published once the write commits). Saves that only touch other fields
+    (status, upload URLs) are skipped.
+    """
+    if update_fields is not None and not set(update_fields) & set(MATCH_FIELDS):
+        return
+    dispatch(update_job_match_index_task.s(str(instance.user_id), str(instance.job_id)))
+
+
+@receiver(post_delete, sender=DocumentReference)
+def release_document_blob(sender, instance, **kwargs):
+    """
+    A job's file was replaced or the job deleted: drop the blob's
+    reference, deleting the object once no job uses it.
+    """
+    release_blob(instance.blob_id)
+
+
+@receiver(post_save, sender=Users)
+@receiver(post_delete, sender=Users)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """
+    Drop the cached auth user whenever the row changes (password reset,
+    is_active flips, profile edits) so JWT requests see the new state.
+    Runs on commit so a concurrent request can't re-cache the old row.
+    """
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
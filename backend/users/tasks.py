@@ -1,16 +1,108 @@
 import os
-from celery import shared_task
+import hashlib
+import inspect
+import logging
+from io import BytesIO
+from celery import shared_task, Task
+from celery.exceptions import SoftTimeLimitExceeded
 from django.conf import settings
-from users.models import Jobs
-from sameboat.services.s3_service import S3Service
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+from users.models import Users, Jobs, UploadSession, DocumentBlob, DocumentText
+from users.api.tokens import warm_blacklist_cache
+from users import uploads, documents, matching
+from users.uploads import extract_key
+from users.upload_sessions import discard_session
+from users.reconcile import reconcile_storage
+from users import account_deletion
+from sameboat.services.storage import get_storage, StorageTransientError
+from sameboat.services.email_service import EmailTransientError, get_email_service, queue_email
+from sameboat.services.task_dispatch import dispatch
+from sameboat.services.image_optimizer import ImageRejected, optimize_image, should_optimize
+from sameboat.services.text_extraction import ExtractionError, extract_text, is_supported
 
+logger = logging.getLogger(__name__)
 
 
-@shared_task
-def upload_file_to_s3(job_id, field_name, local_path):
+
+# Transient storage failures (SlowDown, 5xx, network) are retried with jittered
+# exponential backoff instead of being reported as permanent errors.
+S3_RETRY_OPTIONS = {
+    "autoretry_for": (StorageTransientError,),
+    "retry_backoff": settings.S3_TASK_RETRY_BACKOFF,
+    "retry_backoff_max": settings.S3_TASK_RETRY_BACKOFF_MAX,
+    "retry_jitter": True,
+    "max_retries": settings.S3_TASK_MAX_RETRIES,
+}
+
+
+def commit_uploaded_file(job_id, field_name, blob, filename, file_url, generation=None):
+    """
+    Attach a stored blob to the job field, unless a newer upload for the same
+    field has been dispatched meanwhile. The caller's claim on `blob` becomes
+    the field's reference, or is released if superseded. A replaced file
+    from before content addressing is deleted by key. Returns True if saved.
+    """
+    with transaction.atomic():
+        # Row lock serialises concurrent uploads for the same job
+        job = Jobs.objects.select_for_update().get(pk=job_id)
+
+        if uploads.is_stale(job_id, field_name, generation):
+            documents.release_blob(blob.pk)
+            return False
+
+        legacy_key = extract_key(getattr(job, field_name))
+        documents.attach_document(job, field_name, blob, filename, file_url)
+
+        if legacy_key and not documents.is_blob_key(legacy_key):
+            dispatch(delete_many_from_s3_task.s([legacy_key]))
+
+    return True
+
+
+def store_document(job, field_name, filename, checksum, size, generation=None, file_obj=None, copy_from=None):
+    """
+    Store a file as the user's blob for `checksum` and attach it to the job
+    field. The transfer (upload of `file_obj` or server-side copy of the
+    `copy_from` key) is skipped when the user already has this content.
+    Returns commit_uploaded_file's result.
+    """
+    blob = documents.acquire_blob(job.user_id, checksum, filename, size)
+    try:
+        storage = get_storage()
+        if not blob.uploaded:
+            # A delete queued by an earlier release must not run between
+            # finding the object already stored and marking the blob uploaded
+            with documents.blob_lock(blob.key):
+                if copy_from:
+                    storage.copy(copy_from, blob.key, filename, checksum=checksum)
+                else:
+                    storage.save(file_obj, blob.key, filename, checksum=checksum)
+                documents.mark_uploaded(blob)
+        return commit_uploaded_file(job.job_id, field_name, blob, filename, storage.url(blob.key), generation)
+    except Exception:
+        # Give the claim back; a retry claims it again
+        documents.release_blob(blob.pk)
+        raise
+
+
+class UploadTask(Task):
+    """Marks the attachment as failed once retries are exhausted."""
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        call = inspect.signature(self.run).bind_partial(*args, **kwargs).arguments
+        if not uploads.is_stale(call["job_id"], call["field_name"], call.get("generation")):
+            uploads.set_upload_status(call["job_id"], call["field_name"], uploads.FAILED, str(exc))
+
+
+@shared_task(base=UploadTask, **S3_RETRY_OPTIONS)
+def upload_file_to_s3(job_id, field_name, local_path, generation=None, keep_original=False):
     """
     Upload a file to S3 in the background, update DB with S3 URL, and delete local file.
-    DEPRECATED: Use upload_file_obj_to_s3 instead for better container compatibility.
+    Only for workers sharing the web disk (resumable uploads with the LOCAL backend);
+    otherwise use upload_file_obj_to_s3 for better container compatibility.
+    Images are optimized first unless `keep_original`.
     """
     # Validate inputs
     if not job_id:
@@ -28,45 +120,64 @@ def upload_file_to_s3(job_id, field_name, local_path):
     if not os.path.exists(local_path):
         return f"❌ Error: File not found at {local_path}"
 
-    try:
-        # Check AWS settings
-        if not settings.AWS_ACCESS_KEY_ID:
-            return "❌ Error: AWS_ACCESS_KEY_ID not configured"
-        if not settings.AWS_SECRET_ACCESS_KEY:
-            return "❌ Error: AWS_SECRET_ACCESS_KEY not configured"
-        if not settings.AWS_STORAGE_BUCKET_NAME:
-            return "❌ Error: AWS_STORAGE_BUCKET_NAME not configured"
-        if not settings.AWS_S3_REGION_NAME:
-            return "❌ Error: AWS_S3_REGION_NAME not configured"
+    file_name = os.path.basename(local_path)
+    if uploads.is_stale(job_id, field_name, generation):
+        os.remove(local_path)
+        return f"⏭️ Skipped superseded upload of {file_name}"
 
-        job = Jobs.objects.get(pk=job_id)
-        file_name = os.path.basename(local_path)
-        s3_key = f"user_uploads/{job.user_id}/{file_name}"
+    uploads.set_upload_status(job_id, field_name, uploads.UPLOADING)
 
-        s3 = S3Service()
-        file_url = s3.upload_file_to_s3(local_path, s3_key)
+    try:
+        job = Jobs.objects.get(pk=job_id)
 
-        # Save URL to job model
-        setattr(job, field_name, file_url)
-        job.save(update_fields=[field_name])
+        if should_optimize(file_name, keep_original):
+            with open(local_path, "rb") as f:
+                file_bytes = optimize_image(f.read(), file_name)
+            saved = store_document(
+                job, field_name, file_name, hashlib.sha256(file_bytes).hexdigest(), len(file_bytes),
+                generation, file_obj=BytesIO(file_bytes),
+            )
+        else:
+            digest = hashlib.sha256()
+            with open(local_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+                f.seek(0)
+                saved = store_document(
+                    job, field_name, file_name, digest.hexdigest(), os.path.getsize(local_path),
+                    generation, file_obj=f,
+                )
 
         # Delete local file
         if os.path.exists(local_path):
             os.remove(local_path)
 
+        if not saved:
+            return f"⏭️ Discarded superseded upload of {file_name}"
+        uploads.set_upload_status(job_id, field_name, uploads.DONE)
         return f"✅ uploaded {file_name} successfully"
 
     except Jobs.DoesNotExist:
         return f"❌ Error: Job with id {job_id} not found"
+    except StorageTransientError:
+        raise
     except Exception as e:
+        uploads.set_upload_status(job_id, field_name, uploads.FAILED, str(e))
         return f"❌ Error: {str(e)}"
 
 
-@shared_task
-def upload_file_obj_to_s3(job_id, field_name, file_data, filename):
+@shared_task(base=UploadTask, **S3_RETRY_OPTIONS)
+def upload_file_obj_to_s3(job_id, field_name, file_data, filename, generation=None, keep_original=False):
     """
     Upload file data directly to S3 without local storage.
     This is the preferred method for containerized deployments.
+
+    `generation` comes from users.uploads.next_generation(); superseded
+    uploads skip the transfer and never overwrite a newer URL. The file is
+    stored content-addressed (users.documents), so content the user already
+    has, or a retried task, isn't sent again. Images are downsampled and
+    stripped of metadata first (sameboat.services.image_optimizer) unless
+    `keep_original`.
     """
     # Validate inputs
     if not job_id:
@@ -82,53 +193,183 @@ def upload_file_obj_to_s3(job_id, field_name, file_data, filename):
     if field_name not in allowed_fields:
         return f"❌ Error: Invalid field_name '{field_name}'. Must be one of {allowed_fields}"
 
-    try:
-        # Check AWS settings
-        if not settings.AWS_ACCESS_KEY_ID:
-            return "❌ Error: AWS_ACCESS_KEY_ID not configured"
-        if not settings.AWS_SECRET_ACCESS_KEY:
-            return "❌ Error: AWS_SECRET_ACCESS_KEY not configured"
-        if not settings.AWS_STORAGE_BUCKET_NAME:
-            return "❌ Error: AWS_STORAGE_BUCKET_NAME not configured"
-        if not settings.AWS_S3_REGION_NAME:
-            return "❌ Error: AWS_S3_REGION_NAME not configured"
+    # A newer replacement is already queued: skip before spending bandwidth
+    if uploads.is_stale(job_id, field_name, generation):
+        return f"⏭️ Skipped superseded upload of {filename}"
 
+    uploads.set_upload_status(job_id, field_name, uploads.UPLOADING)
+
+    try:
         job = Jobs.objects.get(pk=job_id)
-        s3_key = f"user_uploads/{job.user_id}/{filename}"
 
-        s3 = S3Service()
-        
         # Convert base64 data back to bytes
         import base64
         file_bytes = base64.b64decode(file_data)
+        if should_optimize(filename, keep_original):
+            file_bytes = optimize_image(file_bytes, filename)
+        checksum = hashlib.sha256(file_bytes).hexdigest()
         
         # Create a file-like object from bytes
-        from io import BytesIO
         file_obj = BytesIO(file_bytes)
-        
-        file_url = s3.upload_file_obj_to_s3(file_obj, s3_key, filename)
-
-        # Save URL to job model
-        setattr(job, field_name, file_url)
-        job.save(update_fields=[field_name])
 
-        
+        # Save URL to job model (unless superseded while uploading)
+        if not store_document(job, field_name, filename, checksum, len(file_bytes), generation, file_obj=file_obj):
+            return f"⏭️ Discarded superseded upload of {filename}"
 
+        uploads.set_upload_status(job_id, field_name, uploads.DONE)
         return f"✅ uploaded {filename} successfully"
 
     except Jobs.DoesNotExist:
         return f"❌ Error: Job with id {job_id} not found"
+    except StorageTransientError:
+        # stays "uploading" while Celery retries; UploadTask.on_failure handles the last one
+        raise
     except Exception as e:
+        uploads.set_upload_status(job_id, field_name, uploads.FAILED, str(e))
         return f"❌ Error: {str(e)}"
 
 
-@shared_task
+@shared_task(base=UploadTask, **S3_RETRY_OPTIONS)
+def adopt_uploaded_object(job_id, field_name, staging_key, filename, generation=None, keep_original=False):
+    """
+    Attach an object uploaded straight to S3 (a finished resumable upload):
+    hash it, copy it to its content-addressed key unless the user already
+    has that content, and delete the staging object. Images are downloaded,
+    optimized and uploaded instead of copied, unless `keep_original`.
+    """
+    if uploads.is_stale(job_id, field_name, generation):
+        dispatch(delete_many_from_s3_task.s([staging_key]))
+        return f"⏭️ Skipped superseded upload of {filename}"
+
+    try:
+        job = Jobs.objects.get(pk=job_id)
+    except Jobs.DoesNotExist:
+        dispatch(delete_many_from_s3_task.s([staging_key]))
+        return f"❌ Error: Job with id {job_id} not found"
+
+    uploads.set_upload_status(job_id, field_name, uploads.UPLOADING)
+    if should_optimize(filename, keep_original):
+        try:
+            file_bytes = optimize_image(get_storage().read(staging_key), filename)
+        except ImageRejected as e:
+            dispatch(delete_many_from_s3_task.s([staging_key]))
+            uploads.set_upload_status(job_id, field_name, uploads.FAILED, str(e))
+            return f"❌ Error: {e}"
+        saved = store_document(
+            job, field_name, filename, hashlib.sha256(file_bytes).hexdigest(), len(file_bytes),
+            generation, file_obj=BytesIO(file_bytes),
+        )
+    else:
+        checksum, size = get_storage().sha256(staging_key)
+        saved = store_document(job, field_name, filename, checksum, size, generation, copy_from=staging_key)
+    dispatch(delete_many_from_s3_task.s([staging_key]))
+
+    if not saved:
+        return f"⏭️ Discarded superseded upload of {filename}"
+    uploads.set_upload_status(job_id, field_name, uploads.DONE)
+    return f"✅ uploaded {filename} successfully"
+
+
+@shared_task(**S3_RETRY_OPTIONS)
 def delete_from_s3_task(key):
-    s3 = S3Service()
-    s3.delete_file_from_s3(key)
+    get_storage().delete(key)
     return f"✅ Deleted {key} from S3"
 
 
+@shared_task(**S3_RETRY_OPTIONS)
+def delete_many_from_s3_task(keys):
+    """
+    Delete a batch of objects in as few S3 requests as possible. Blob keys
+    uploaded again since the delete was queued are kept.
+    """
+    deleted = documents.delete_unused_objects(keys)
+    return f"✅ Deleted {deleted} objects from S3"
+
+
+@shared_task(
+    autoretry_for=(StorageTransientError,),
+    retry_backoff=True,
+    max_retries=3,
+    soft_time_limit=settings.DOCUMENT_TEXT_TIMEOUT,
+    time_limit=settings.DOCUMENT_TEXT_TIMEOUT + 15,
+)
+def extract_document_text(blob_id):
+    """
+    Extract the plain text of a stored document into DocumentText for job
+    search. Runs on the prefork "documents" worker: parsing is CPU-bound,
+    and the soft time limit stops a pathological file from holding a process.
+    """
+    blob = DocumentBlob.objects.filter(pk=blob_id).first()
+    if blob is None:
+        return f"⏭️ Blob {blob_id} no longer exists"
+    if DocumentText.objects.filter(sha256=blob.sha256).exists():
+        return f"⏭️ Text of {blob.sha256[:12]} already extracted"
+    if not is_supported(blob.content_type):
+        return f"⏭️ No text extractor for {blob.content_type or 'unknown type'}"
+
+    status, text, error = DocumentText.Status.DONE, "", ""
+    if blob.size > settings.DOCUMENT_TEXT_MAX_FILE_SIZE:
+        status, error = DocumentText.Status.FAILED, f"File larger than {settings.DOCUMENT_TEXT_MAX_FILE_SIZE} bytes"
+    else:
+        data = get_storage().read(blob.key)
+        try:
+            text = extract_text(data, blob.content_type)
+        except SoftTimeLimitExceeded:
+            status, error = DocumentText.Status.FAILED, f"Timed out after {settings.DOCUMENT_TEXT_TIMEOUT}s"
+        except ExtractionError as e:
+            status, error = DocumentText.Status.FAILED, str(e)[:500]
+
+    DocumentText.objects.update_or_create(
+        sha256=blob.sha256, defaults={"text": text, "status": status, "error": error},
+    )
+    if status == DocumentText.Status.FAILED:
+        return f"❌ Could not extract text of {blob.sha256[:12]}: {error}"
+    return f"✅ Extracted {len(text)} characters from {blob.sha256[:12]}"
+
+
+@shared_task
+def update_job_match_index_task(user_id, job_id):
+    """
+    Re-tokenize one saved or deleted job and patch it into its owner's
+    cached match index, off the request path (default "celery" queue).
+    """
+    matching.job_changed(user_id, job_id)
+    return f"🔎 Match index updated for job {job_id}"
+
+
+def send_email(subject, message, recipient_list, from_email=None):
+    """
+    Send a transactional email from the email workers once the current
+    transaction commits. The email goes to the outbox and a send_email_task
+    is queued; whichever of those runs first sends every email waiting by
+    then, and the others find less (or nothing) left to send.
+    """
+    def add_to_outbox(signature):
+        queue_email(subject, message, recipient_list, from_email)
+        return signature
+
+    dispatch(send_email_task.s(), prepare=add_to_outbox)
+
+
+@shared_task(
+    autoretry_for=(EmailTransientError,),
+    retry_backoff=True,
+    max_retries=5,
+)
+def send_email_task(subject=None, message=None, recipient_list=None, from_email=None):
+    """
+    Send up to EMAIL_BATCH_SIZE emails from the outbox (see send_email) in
+    one batch over the worker's persistent SMTP connection (routed to the
+    "email" queue). Only transient failures (4xx, dropped connections) are
+    retried; a 5xx or refused recipient fails the task straight away.
+    Arguments are only passed by tasks queued before the outbox existed.
+    """
+    if subject is not None:
+        queue_email(subject, message, recipient_list, from_email)
+    sent = get_email_service().send_outbox(settings.EMAIL_BATCH_SIZE)
+    return f"📧 Sent {sent} email(s)"
+
+
 @shared_task
 def test_celery_task():
     """
@@ -145,3 +386,98 @@ def heartbeat_task():
     """
     import time
     return f"💓 Heartbeat at {time.time()}"
+
+
+@shared_task
+def prune_token_blacklist(batch_size=None):
+    """
+    Periodically delete expired outstanding/blacklisted refresh tokens in
+    batches, then re-sync the Redis blacklist from the remaining rows.
+    """
+    batch_size = batch_size or settings.TOKEN_BLACKLIST_PRUNE_BATCH_SIZE
+    now = timezone.now()
+    deleted = 0
+
+    while True:
+        ids = list(
+            OutstandingToken.objects
+            .filter(expires_at__lte=now)
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        BlacklistedToken.objects.filter(token_id__in=ids).delete()
+        OutstandingToken.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+
+    cached = warm_blacklist_cache(batch_size)
+    return f"🧹 Pruned {deleted} expired tokens, {cached} blacklisted tokens cached"
+
+
+@shared_task
+def cleanup_upload_sessions():
+    """
+    Abort resumable uploads that have sat idle past UPLOAD_SESSION_TTL and
+    drop finalized sessions, releasing their multipart parts / spool files.
+    """
+    expired = UploadSession.objects.filter(expires_at__lte=timezone.now())
+    removed = failed = 0
+    for session in expired.iterator():
+        try:
+            discard_session(session)
+            removed += 1
+        except Exception as e:
+            # Left in place for the next run
+            logger.warning("Could not discard upload session %s: %s", session.pk, e)
+            failed += 1
+    return f"🧹 Removed {removed} expired upload sessions, {failed} failed"
+
+
+@shared_task
+def reconcile_storage_task(dry_run=None):
+    """
+    Delete objects under user_uploads/ that no job, blob or upload session
+    references (users.reconcile), once older than the grace period.
+    """
+    if dry_run is None:
+        dry_run = settings.STORAGE_RECONCILE_DRY_RUN
+    stats = reconcile_storage(dry_run=dry_run)
+    action = "Found" if dry_run else "Deleted"
+    return (
+        f"🧹 {action} {stats['orphans']} orphaned objects ({stats['orphan_bytes']} bytes) "
+        f"of {stats['scanned']} scanned in {stats['elapsed_seconds']}s"
+    )
+
+
+@shared_task(bind=True)
+def delete_account(self, user_id):
+    """
+    Delete a (deactivated) user and everything they own without loading
+    their jobs (users.account_deletion). Progress is published as the
+    PROGRESS task state: {"stage", "jobs_total", "jobs_deleted", "objects"}.
+    """
+    if not Users.objects.filter(pk=user_id).exists():
+        return f"⏭️ User {user_id} already deleted"
+
+    jobs_total = Jobs.objects.filter(user_id=user_id).count()
+    keys = []
+
+    def report(stage, jobs_deleted=0):
+        if self.request.id:
+            self.update_state(state="PROGRESS", meta={
+                "stage": stage, "jobs_total": jobs_total, "jobs_deleted": jobs_deleted, "objects": len(keys),
+            })
+
+    report("uploads")
+    account_deletion.discard_upload_sessions(user_id)
+    keys = account_deletion.collect_storage_keys(user_id)
+    report("jobs")
+    jobs_deleted = account_deletion.delete_job_rows(user_id, progress=lambda n: report("jobs", n))
+    report("account", jobs_deleted)
+    account_deletion.delete_user_rows(user_id)
+
+    # Rows are gone: queue the objects in a few large batches
+    batch_size = settings.ACCOUNT_DELETE_STORAGE_BATCH_SIZE
+    for start in range(0, len(keys), batch_size):
+        dispatch(delete_many_from_s3_task.s(keys[start:start + batch_size]))
+    return f"🧹 Deleted account {user_id}: {jobs_deleted} jobs, {len(keys)} stored objects queued for deletion"
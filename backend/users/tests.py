@@ -1,3 +1,1061 @@
-from django.test import TestCase
+"""
+Query-count and latency regression tests for every route in users/urls.py.
 
-# Create your tests here.
+Each request is made inside assertNumQueries with an exact count, on
+fixtures the size of a real account, and list-style endpoints are checked
+again on a fixture twice as large: an N+1 in a serializer field, a
+presigned URL or the auth user lookup changes the count and fails here.
+Requests must also finish inside a latency budget (scale the budgets with
+TEST_LATENCY_SCALE on slow machines).
+
+The suite runs offline: SQLite, fakeredis behind django_redis in place of
+Redis (cache, throttles, token blacklist, upload status), LocalStorage in a
+temporary directory in place of S3, Celery on an in-memory broker and a
+local SMTP stand-in for the mail server. Tasks dispatched on commit are
+captured and counted, not run, except where a test runs one directly.
+"""
+import hashlib
+import io
+import os
+import shutil
+import smtplib
+import socketserver
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from django_redis import get_redis_connection
+from fakeredis import FakeConnection
+from PIL import ExifTags, Image
+from rest_framework_simplejwt.tokens import AccessToken
+
+from sameboat import db_routing
+from sameboat.profiling import make_token
+from sameboat.services import email_service, image_optimizer, presigned_urls, queue_monitor, storage
+from sameboat.services.email_service import EmailTransientError
+from sameboat.services.storage import get_storage
+from sameboat.services.task_dispatch import TaskDispatchBuffer
+from users import matching, uploads
+from users.api import authentication
+from users.api.tokens import BLACKLIST_READY_KEY, warm_blacklist_cache
+from users.documents import blob_key
+from users.models import DocumentBlob, DocumentReference, DocumentText, Jobs, UploadSession, Users
+from users.tasks import (
+    delete_account, delete_many_from_s3_task, send_email, send_email_task, store_document, upload_file_obj_to_s3,
+)
+
+STORAGE_ROOT = tempfile.mkdtemp(prefix="sameboat-tests-")
+
+OFFLINE_SETTINGS = {
+    "CACHES": {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": "redis://fakeredis:6379/0",
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                "CONNECTION_POOL_KWARGS": {"connection_class": FakeConnection},
+            },
+        }
+    },
+    "CELERY_BROKER_URL": "memory://",
+    "CELERY_RESULT_BACKEND": "cache+memory://",
+    "DOCUMENT_STORAGE_BACKEND": "local",
+    "LOCAL_STORAGE_ROOT": os.path.join(STORAGE_ROOT, "documents"),
+    "UPLOAD_SPOOL_DIR": os.path.join(STORAGE_ROOT, "spool"),
+    "PASSWORD_HASHERS": ["django.contrib.auth.hashers.MD5PasswordHasher"],
+    "ALLOWED_HOSTS": ["testserver"],
+}
+
+LATENCY_SCALE = float(os.getenv("TEST_LATENCY_SCALE", "1"))
+DEFAULT_BUDGET_MS = 250
+
+PASSWORD = "correct-horse-battery"
+SKILLS = ["python", "django", "postgresql", "redis", "celery", "aws", "docker", "react"]
+
+# Per-process caches that would otherwise carry state between tests
+LOCAL_CACHES = (
+    authentication._local_users,
+    matching._local_indexes,
+    presigned_urls._local_urls,
+    queue_monitor._stats_cache,
+    db_routing._replica_health,
+)
+
+
+def tearDownModule():
+    shutil.rmtree(STORAGE_ROOT, ignore_errors=True)
+
+
+def dispatched_signatures(callbacks):
+    """The task signatures that captured on_commit callbacks would publish."""
+    return [
+        signature
+        for callback in callbacks if isinstance(getattr(callback, "__self__", None), TaskDispatchBuffer)
+        for signature in callback.__self__.signatures
+    ]
+
+
+def dispatched_tasks(callbacks):
+    """Names of the tasks that captured on_commit callbacks would publish (users.tasks prefix dropped)."""
+    return [signature.task.rpartition(".")[2] for signature in dispatched_signatures(callbacks)]
+
+
+@override_settings(**OFFLINE_SETTINGS)
+class EndpointTestCase(TestCase):
+    JOBS = 50
+
+    def setUp(self):
+        get_redis_connection("default").flushall()
+        for local_cache in LOCAL_CACHES:
+            local_cache.clear()
+        storage._storage = None
+        # As the beat task leaves it in production: blacklist checks answered by Redis
+        warm_blacklist_cache()
+
+        self.user = self.create_user("alice")
+        self.jobs = self.create_jobs(self.user, self.JOBS)
+        self.create_jobs(self.create_user("bob"), 10)
+        self.client = self.client_class(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+        # Endpoint counts below are for a cached user; AuthUserLookupTests covers the cold lookup
+        authentication.CachedJWTAuthentication().get_cached_user(self.user.pk)
+
+    def create_user(self, name):
+        return Users.objects.create_user(
+            email=f"{name}@example.com", user_name=name, first_name=name.title(), password=PASSWORD,
+        )
+
+    def create_jobs(self, user, count):
+        """`count` jobs, every other one with a stored resume (blob, reference and URL)."""
+        jobs = Jobs.objects.bulk_create(
+            Jobs(
+                user=user,
+                job_title=f"Backend Engineer {i}",
+                company_name=f"Company {i % 7}",
+                location="Remote",
+                experience_required="3 years",
+                skills=SKILLS[i % 4:i % 4 + 4],
+                notes=[f"Recruiter call {i}", "Asked about python and django"],
+            )
+            for i in range(count)
+        )
+        storage_backend = get_storage()
+        for job in jobs[::2]:
+            content = f"resume for {job.job_id}".encode()
+            sha256 = hashlib.sha256(content).hexdigest()
+            key = blob_key(user.pk, sha256)
+            storage_backend.save(io.BytesIO(content), key)
+            blob = DocumentBlob.objects.create(
+                user=user, sha256=sha256, key=key, size=len(content),
+                content_type="text/plain", ref_count=1, uploaded=True,
+            )
+            DocumentReference.objects.create(job=job, field_name="resume_url", blob=blob, filename="resume.txt")
+            job.resume_url = f"http://testserver{storage_backend.url(key)}"
+        Jobs.objects.bulk_update(jobs[::2], ["resume_url"])
+        return jobs
+
+    def timed_request(self, method, path, queries, budget_ms=DEFAULT_BUDGET_MS, **kwargs):
+        with self.assertNumQueries(queries):
+            started = time.perf_counter()
+            response = getattr(self.client, method)(path, **kwargs)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        self.assertLess(
+            elapsed_ms, budget_ms * LATENCY_SCALE,
+            f"{method.upper()} {path} took {elapsed_ms:.0f}ms (budget {budget_ms}ms)",
+        )
+        return response
+
+
+class JobEndpointTests(EndpointTestCase):
+
+    def test_list(self):
+        response = self.timed_request("get", "/api/v1/jobs/", queries=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), self.JOBS)
+        self.assertIn("?token=", response.json()[0]["resume_url"])
+
+    def test_list_query_count_does_not_grow_with_jobs(self):
+        self.create_jobs(self.user, self.JOBS)
+        response = self.timed_request("get", "/api/v1/jobs/", queries=1)
+        self.assertEqual(len(response.json()), 2 * self.JOBS)
+
+    def test_list_search(self):
+        DocumentText.objects.create(sha256=self.jobs[0].documents.get().blob.sha256, text="Led a kubernetes migration")
+        response = self.timed_request("get", "/api/v1/jobs/?search=kubernetes", queries=1)
+        self.assertEqual([job["job_id"] for job in response.json()], [str(self.jobs[0].job_id)])
+
+    def test_list_search_ignores_other_users_texts(self):
+        bob_blob = DocumentBlob.objects.exclude(user=self.user).first()
+        DocumentText.objects.create(sha256=bob_blob.sha256, text="Led a kubernetes migration")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/v1/jobs/?search=kubernetes")
+        self.assertEqual(response.json(), [])
+        # The text scan is limited to the user's blobs: user_id is matched for the jobs and for the blobs
+        self.assertEqual(queries[0]["sql"].count('"user_id" = '), 2)
+
+    def test_retrieve(self):
+        response = self.timed_request("get", f"/api/v1/jobs/{self.jobs[0].job_id}/", queries=1)
+        self.assertEqual(response.status_code, 200)
+
+    def test_retrieve_other_users_job(self):
+        other = Jobs.objects.exclude(user=self.user).first()
+        response = self.timed_request("get", f"/api/v1/jobs/{other.job_id}/", queries=1)
+        self.assertEqual(response.status_code, 404)
+
+    def test_create(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.timed_request("post", "/api/v1/jobs/", queries=3, data={
+                "job_title": "Platform Engineer", "company_name": "Acme", "experience_required": "5 years",
+                "skills": ["python", "kubernetes"],
+            }, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(dispatched_tasks(callbacks), ["update_job_match_index_task"])
+
+    def test_create_with_resume(self):
+        resume = SimpleUploadedFile("resume.pdf", b"%PDF-1.4 resume", content_type="application/pdf")
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.timed_request("post", "/api/v1/jobs/", queries=6, data={
+                "job_title": "Platform Engineer", "company_name": "Acme", "experience_required": "5 years",
+                "resume": resume,
+            })
+        self.assertEqual(response.status_code, 201)
+        # Published together in one on_commit
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(
+            sorted(dispatched_tasks(callbacks)), ["update_job_match_index_task", "upload_file_obj_to_s3"],
+        )
+
+    def create_with_resume_under_backpressure(self):
+        # The uploads queue is over its threshold
+        get_redis_connection("default").rpush("uploads", *["queued task"] * settings.UPLOAD_QUEUE_MAX_DEPTH)
+        resume = SimpleUploadedFile("resume.pdf", b"%PDF-1.4 resume", content_type="application/pdf")
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post("/api/v1/jobs/", {
+                "job_title": "Platform Engineer", "company_name": "Acme", "experience_required": "5 years",
+                "resume": resume,
+            })
+        return response, dispatched_tasks(callbacks)
+
+    def test_create_with_resume_sheds_under_backpressure(self):
+        response, tasks = self.create_with_resume_under_backpressure()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], str(settings.UPLOAD_BACKPRESSURE_RETRY_AFTER))
+        self.assertFalse(Jobs.objects.filter(job_title="Platform Engineer").exists())
+        self.assertEqual(tasks, [])
+
+    @override_settings(UPLOAD_BACKPRESSURE_MODE="degrade")
+    def test_create_with_resume_degrades_under_backpressure(self):
+        response, tasks = self.create_with_resume_under_backpressure()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["dropped_attachments"], ["resume"])
+        self.assertEqual(Jobs.objects.get(job_title="Platform Engineer").resume_url, "")
+        self.assertEqual(tasks, ["update_job_match_index_task"])
+
+    def test_update(self):
+        job = self.jobs[1]
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.timed_request("put", f"/api/v1/jobs/{job.job_id}/", queries=4, data={
+                "job_title": "Staff Engineer", "company_name": "Acme", "experience_required": "8 years",
+            }, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(dispatched_tasks(callbacks), ["update_job_match_index_task"])
+
+    def test_partial_update(self):
+        job = self.jobs[1]
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.timed_request(
+                "patch", f"/api/v1/jobs/{job.job_id}/", queries=4,
+                data={"current_status": "APPLIED"}, content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        # Status isn't a match field: the index is left alone
+        self.assertEqual(dispatched_tasks(callbacks), [])
+
+    def test_partial_update_unchanged_match_fields(self):
+        job = self.jobs[1]
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.timed_request(
+                "patch", f"/api/v1/jobs/{job.job_id}/", queries=4,
+                data={"job_title": job.job_title, "skills": job.skills}, content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(dispatched_tasks(callbacks), [])
+
+    def test_destroy_with_attachment(self):
+        job = self.jobs[0]
+        with self.captureOnCommitCallbacks() as callbacks:
+            # Fixed per job: the cascade over upload sessions, references and the now unused blob
+            response = self.timed_request("delete", f"/api/v1/jobs/{job.job_id}/", queries=12)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Jobs.objects.filter(pk=job.pk).exists())
+        self.assertEqual(
+            sorted(dispatched_tasks(callbacks)), ["delete_many_from_s3_task", "update_job_match_index_task"],
+        )
+
+    def test_shared_blob_is_deleted_with_its_last_reference(self):
+        blob = self.jobs[0].documents.get().blob
+        DocumentReference.objects.create(job=self.jobs[1], field_name="resume_url", blob=blob, filename="resume.txt")
+        DocumentBlob.objects.filter(pk=blob.pk).update(ref_count=2)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.delete(f"/api/v1/jobs/{self.jobs[0].job_id}/")
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+        self.assertNotIn("delete_many_from_s3_task", dispatched_tasks(callbacks))
+        # As if that request had committed: the next one starts a new dispatch buffer
+        del connection.run_on_commit[:]
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.delete(f"/api/v1/jobs/{self.jobs[1].job_id}/")
+        self.assertFalse(DocumentBlob.objects.filter(pk=blob.pk).exists())
+        [delete] = [
+            signature for signature in dispatched_signatures(callbacks)
+            if signature.task == delete_many_from_s3_task.name
+        ]
+        self.assertEqual(delete.args, ([blob.key],))
+
+    def test_reuploaded_blob_survives_the_queued_delete(self):
+        job = self.jobs[0]
+        blob = job.documents.get().blob
+        content = get_storage().read(blob.key)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.delete(f"/api/v1/jobs/{job.job_id}/")
+        [delete] = [
+            signature for signature in dispatched_signatures(callbacks)
+            if signature.task == delete_many_from_s3_task.name
+        ]
+        del connection.run_on_commit[:]
+
+        # The same content is uploaded again before the delete runs: the object is still there, so the
+        # transfer is skipped and the new row points at it
+        store_document(self.jobs[1], "resume_url", "resume.txt", blob.sha256, len(content), file_obj=io.BytesIO(content))
+        reuploaded = DocumentBlob.objects.get(key=blob.key)
+        self.assertTrue(reuploaded.uploaded)
+
+        self.assertIn("Deleted 0 objects", delete_many_from_s3_task(*delete.args))
+        self.assertEqual(get_storage().read(blob.key), content)
+
+        # Once unused again, the delete goes through
+        with self.captureOnCommitCallbacks():
+            self.client.delete(f"/api/v1/jobs/{self.jobs[1].job_id}/")
+        self.assertFalse(DocumentBlob.objects.filter(key=blob.key).exists())
+        self.assertIn("Deleted 1 objects", delete_many_from_s3_task(*delete.args))
+        self.assertFalse(os.path.exists(get_storage().path(blob.key)))
+
+    def test_match(self):
+        source = self.jobs[0]
+        DocumentText.objects.create(
+            sha256=source.documents.get().blob.sha256,
+            text="Python and Django developer, Postgres and Redis, some Celery",
+        )
+        url = f"/api/v1/jobs/match/?document={source.job_id}&limit=5"
+        response = self.timed_request("get", url, queries=5)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["scored"], self.JOBS)
+        self.assertEqual(len(response.json()["results"]), 5)
+        # The index is cached now: only the source document and the result rows
+        self.timed_request("get", url, queries=4)
+
+    def test_match_pending_text(self):
+        response = self.timed_request("get", f"/api/v1/jobs/match/?document={self.jobs[0].job_id}", queries=3)
+        self.assertEqual(response.status_code, 409)
+
+    def test_upload_status(self):
+        response = self.timed_request("get", f"/api/v1/jobs/{self.jobs[0].job_id}/uploads/", queries=1)
+        self.assertEqual(response.status_code, 200)
+
+    def test_upload_status_stream_requires_auth(self):
+        self.client.defaults.pop("HTTP_AUTHORIZATION")
+        response = self.timed_request("get", f"/api/v1/jobs/{self.jobs[0].job_id}/uploads/stream", queries=0)
+        self.assertEqual(response.status_code, 401)
+
+    def test_upload_status_stream_other_users_job(self):
+        other = Jobs.objects.exclude(user=self.user).first()
+        response = self.timed_request("get", f"/api/v1/jobs/{other.job_id}/uploads/stream", queries=1)
+        self.assertEqual(response.status_code, 404)
+
+
+class UploadGenerationTests(EndpointTestCase):
+    JOBS = 2
+
+    def replace_resume(self, job, content, commit=True):
+        """PATCH a new resume; returns the upload task signatures published on commit."""
+        published = []
+        data = encode_multipart(BOUNDARY, {"resume": SimpleUploadedFile("resume.pdf", content)})
+        with mock.patch("sameboat.services.task_dispatch.publish", side_effect=published.extend):
+            with self.captureOnCommitCallbacks(execute=commit):
+                response = self.client.patch(f"/api/v1/jobs/{job.job_id}/", data, content_type=MULTIPART_CONTENT)
+        self.assertEqual(response.status_code, 200, response.content)
+        if commit:
+            # Run as if committed: the next request starts with a fresh dispatch buffer
+            del connection.run_on_commit[:]
+        return [signature for signature in published if signature.task == upload_file_obj_to_s3.name]
+
+    def test_generation_is_claimed_on_commit(self):
+        job = self.jobs[1]
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            self.replace_resume(job, b"%PDF-1.4 never committed", commit=False)
+            raise DatabaseError("rolled back after the upload was queued")
+        # Nothing claimed: an upload already in flight would still be current
+        self.assertIsNone(uploads.current_generation(job.job_id, "resume_url"))
+
+        [signature] = self.replace_resume(job, b"%PDF-1.4 committed")
+        self.assertEqual(signature.kwargs["generation"], 1)
+        self.assertEqual(uploads.current_generation(job.job_id, "resume_url"), 1)
+
+    def test_queued_upload_leaves_the_url_to_the_task(self):
+        job = self.jobs[1]
+        with CaptureQueriesContext(connection) as queries:
+            self.replace_resume(job, b"%PDF-1.4 not stored yet")
+        job_updates = [query["sql"] for query in queries if query["sql"].startswith('UPDATE "jobs"')]
+        self.assertTrue(job_updates)
+        # The request's save doesn't write the URL the task is about to set
+        self.assertFalse(any('"resume_url"' in sql for sql in job_updates))
+
+    def test_replacements_coalesce_to_the_latest(self):
+        job = self.jobs[1]
+        [first] = self.replace_resume(job, b"%PDF-1.4 first draft")
+        [second] = self.replace_resume(job, b"%PDF-1.4 second draft")
+        self.assertEqual((first.kwargs["generation"], second.kwargs["generation"]), (1, 2))
+
+        # The superseded upload is dropped before any transfer
+        self.assertIn("Skipped superseded", upload_file_obj_to_s3(*first.args, **first.kwargs))
+        self.assertFalse(DocumentBlob.objects.filter(sha256=hashlib.sha256(b"%PDF-1.4 first draft").hexdigest()).exists())
+
+        self.assertIn("uploaded", upload_file_obj_to_s3(*second.args, **second.kwargs))
+        reference = DocumentReference.objects.get(job=job, field_name="resume_url")
+        self.assertEqual(reference.blob.sha256, hashlib.sha256(b"%PDF-1.4 second draft").hexdigest())
+
+    def test_stale_generation_never_overwrites_a_newer_upload(self):
+        job = self.jobs[1]
+        [first] = self.replace_resume(job, b"%PDF-1.4 first draft")
+        # Passed the early staleness check, then superseded while transferring
+        with mock.patch("users.tasks.uploads.is_stale", side_effect=[False, True]):
+            self.assertIn("Discarded superseded", upload_file_obj_to_s3(*first.args, **first.kwargs))
+        self.assertFalse(DocumentReference.objects.filter(job=job, field_name="resume_url").exists())
+
+
+class UploadSessionEndpointTests(EndpointTestCase):
+    CONTENT = b"%PDF-1.4 " + b"x" * 2048
+
+    def start_session(self):
+        response = self.client.post("/api/v1/uploads/", {
+            "job": str(self.jobs[1].job_id), "field_name": "resume_url", "filename": "resume.pdf",
+            "content_type": "application/pdf", "total_size": len(self.CONTENT),
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()["session_id"]
+
+    def test_create(self):
+        response = self.timed_request("post", "/api/v1/uploads/", queries=2, data={
+            "job": str(self.jobs[1].job_id), "field_name": "resume_url", "filename": "resume.pdf",
+            "content_type": "application/pdf", "total_size": len(self.CONTENT),
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+
+    def test_retrieve(self):
+        session_id = self.start_session()
+        response = self.timed_request("get", f"/api/v1/uploads/{session_id}/", queries=1)
+        self.assertEqual(response["Upload-Offset"], "0")
+
+    def test_head(self):
+        session_id = self.start_session()
+        response = self.timed_request("head", f"/api/v1/uploads/{session_id}/", queries=1)
+        self.assertEqual(response["Upload-Offset"], "0")
+
+    def test_chunk_and_finalize(self):
+        session_id = self.start_session()
+        response = self.timed_request(
+            "put", f"/api/v1/uploads/{session_id}/", queries=3, data=self.CONTENT,
+            content_type="application/offset+octet-stream", HTTP_UPLOAD_OFFSET="0",
+        )
+        self.assertEqual(response["Upload-Offset"], str(len(self.CONTENT)))
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.timed_request("post", f"/api/v1/uploads/{session_id}/finalize/", queries=5)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["status"], UploadSession.Status.COMPLETED)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_finalize_retried_after_the_upload_was_completed(self):
+        session_id = self.start_session()
+        self.client.put(
+            f"/api/v1/uploads/{session_id}/", data=self.CONTENT,
+            content_type="application/offset+octet-stream", HTTP_UPLOAD_OFFSET="0",
+        )
+        # The first finalize completed the multipart upload, then failed before closing the session
+        with mock.patch("users.upload_sessions.transaction.atomic", side_effect=DatabaseError("connection lost")):
+            with self.assertRaises(DatabaseError):
+                self.client.post(f"/api/v1/uploads/{session_id}/finalize/")
+        self.assertEqual(UploadSession.objects.get(pk=session_id).status, UploadSession.Status.ACTIVE)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(f"/api/v1/uploads/{session_id}/finalize/")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["status"], UploadSession.Status.COMPLETED)
+        self.assertEqual(dispatched_tasks(callbacks), ["adopt_uploaded_object"])
+
+    def test_finalize_after_the_upload_was_aborted(self):
+        session_id = self.start_session()
+        self.client.put(
+            f"/api/v1/uploads/{session_id}/", data=self.CONTENT,
+            content_type="application/offset+octet-stream", HTTP_UPLOAD_OFFSET="0",
+        )
+        session = UploadSession.objects.get(pk=session_id)
+        get_storage().abort_multipart(session.storage_key, session.s3_upload_id)
+        response = self.client.post(f"/api/v1/uploads/{session_id}/finalize/")
+        self.assertEqual(response.status_code, 410)
+
+    def test_concurrent_chunk_for_the_same_offset(self):
+        session_id = self.start_session()
+
+        def other_put_lands_first():
+            # Runs between the chunk write and the compare-and-set on offset
+            UploadSession.objects.filter(pk=session_id).update(offset=len(self.CONTENT))
+            return timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+
+        with mock.patch("users.upload_sessions._expiry", side_effect=other_put_lands_first):
+            response = self.client.put(
+                f"/api/v1/uploads/{session_id}/", data=self.CONTENT,
+                content_type="application/offset+octet-stream", HTTP_UPLOAD_OFFSET="0",
+            )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Upload-Offset"], str(len(self.CONTENT)))
+
+    def test_destroy(self):
+        session_id = self.start_session()
+        response = self.timed_request("delete", f"/api/v1/uploads/{session_id}/", queries=2)
+        self.assertEqual(response.status_code, 204)
+
+
+class AuthEndpointTests(EndpointTestCase):
+    JOBS = 10
+
+    def login(self):
+        response = self.client.post(
+            "/api/v1/login/", {"email": "alice@example.com", "password": PASSWORD}, content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_register(self):
+        self.client.defaults.pop("HTTP_AUTHORIZATION")
+        response = self.timed_request("post", "/api/v1/register-user/", queries=3, data={
+            "user_name": "carol", "first_name": "Carol", "email": "carol@example.com", "password": PASSWORD,
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+
+    def test_login(self):
+        response = self.timed_request(
+            "post", "/api/v1/login/", queries=3,
+            data={"email": "alice@example.com", "password": PASSWORD}, content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("token", response.json())
+
+    def test_refresh(self):
+        self.login()
+        # simplejwt's rotation: three user reads, then blacklisting the old
+        # token and recording the new one, each in a savepoint
+        response = self.timed_request("post", "/api/v1/refresh", queries=12)
+        self.assertEqual(response.status_code, 200)
+
+    def test_refresh_replay_is_refused_when_the_blacklist_cache_write_fails(self):
+        self.login()
+        old_refresh = self.client.cookies[settings.JWT_REFRESH_COOKIE_NAME].value
+        with mock.patch("users.api.tokens.mark_blacklisted", side_effect=ConnectionError("redis down")):
+            response = self.client.post("/api/v1/refresh")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(get_redis_connection("default").exists(BLACKLIST_READY_KEY))
+
+        self.client.cookies[settings.JWT_REFRESH_COOKIE_NAME] = old_refresh
+        response = self.client.post("/api/v1/refresh")
+        self.assertEqual(response.status_code, 401)
+
+    def test_blacklist_cache_ready_flag_expires(self):
+        ttl = get_redis_connection("default").ttl(BLACKLIST_READY_KEY)
+        self.assertGreater(ttl, 0)
+        self.assertLessEqual(ttl, settings.TOKEN_BLACKLIST_CACHE_READY_TTL)
+
+    def test_logout(self):
+        self.login()
+        response = self.timed_request("post", "/api/v1/logout", queries=6)
+        self.assertEqual(response.status_code, 205)
+
+    def test_send_reset_password_link(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.timed_request(
+                "post", "/api/v1/send-reset-password-link", queries=2,
+                data={"email": "alice@example.com"}, content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_reset_password(self):
+        uid = urlsafe_base64_encode(force_bytes(self.user.pk))
+        token = PasswordResetTokenGenerator().make_token(self.user)
+        response = self.timed_request(
+            "post", f"/api/v1/reset-password/{uid}/{token}", queries=2,
+            data={"new_password": "a-new-password", "confirm_password": "a-new-password"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_account_delete_and_status(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.timed_request(
+                "delete", "/api/v1/account", queries=4,
+                data={"password": PASSWORD}, content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(callbacks), 2)
+
+        response = self.timed_request("get", f"/api/v1/account/deletion/{response.json()['task_id']}", queries=0)
+        self.assertEqual(response.json()["state"], "PENDING")
+
+    def test_account_delete_wrong_password(self):
+        # The password hash isn't cached with the user: it is read for the check
+        response = self.timed_request(
+            "delete", "/api/v1/account", queries=1, data={"password": "nope"}, content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: replies come from the server's `replies` by verb."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 localhost SMTP stand-in")
+        while line := self.rfile.readline():
+            verb = line.split(b":")[0].split(b" ")[0].strip().upper().decode()
+            if verb == "RCPT" and any(address.encode() in line for address in server.refused_recipients):
+                self.reply("550 5.1.1 No such user")
+            elif verb in server.replies:
+                self.reply(server.replies[verb])
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                message = b"".join(iter(lambda: self.rfile.readline(), b".\r\n"))
+                server.messages.append(message)
+                self.reply("250 OK")
+                if server.drop_after_each_message:
+                    return
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                # EHLO, MAIL, RCPT, RSET, NOOP
+                self.reply("250 OK")
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPStandInHandler)
+        self.connections = 0
+        self.messages = []
+        self.replies = {}
+        self.refused_recipients = set()
+        self.drop_after_each_message = False
+        threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+
+class EmailTaskTests(EndpointTestCase):
+    JOBS = 0
+
+    def setUp(self):
+        super().setUp()
+        self.smtp = SMTPStandIn()
+        self.addCleanup(self.smtp.server_close)
+        self.addCleanup(self.smtp.shutdown)
+        settings_override = override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1", EMAIL_PORT=self.smtp.server_address[1], EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER=None, EMAIL_HOST_PASSWORD=None, DEFAULT_FROM_EMAIL="noreply@example.com",
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        email_service._email_service = None
+        self.addCleanup(lambda: email_service.get_email_service().close())
+
+    def send(self, to="alice@example.com"):
+        email_service.queue_email("Password reset", "Click the link", [to])
+        return send_email_task()
+
+    def outbox(self):
+        return get_redis_connection("default").llen(email_service.OUTBOX_KEY)
+
+    def test_send_email_queues_on_commit(self):
+        published = []
+        with mock.patch("sameboat.services.task_dispatch.publish", side_effect=published.extend):
+            with self.captureOnCommitCallbacks(execute=True):
+                send_email("Password reset", "Click the link", ["alice@example.com"])
+                self.assertEqual(self.outbox(), 0)
+        self.assertEqual([signature.task for signature in published], [send_email_task.name])
+        self.assertEqual(self.outbox(), 1)
+
+    def test_queued_messages_go_out_in_one_batch(self):
+        for name in ("alice", "bob", "carol"):
+            email_service.queue_email("Password reset", "Click the link", [f"{name}@example.com"])
+        self.assertIn("Sent 3 email(s)", send_email_task())
+        self.assertEqual(len(self.smtp.messages), 3)
+        self.assertEqual(self.smtp.connections, 1)
+        # The other two tasks queued with them find nothing left
+        self.assertIn("Sent 0 email(s)", send_email_task())
+
+    @override_settings(EMAIL_BATCH_SIZE=2)
+    def test_batches_are_capped(self):
+        for name in ("alice", "bob", "carol"):
+            email_service.queue_email("Password reset", "Click the link", [f"{name}@example.com"])
+        send_email_task()
+        self.assertEqual((len(self.smtp.messages), self.outbox()), (2, 1))
+
+    def test_messages_share_one_connection(self):
+        self.send()
+        self.send("bob@example.com")
+        self.assertEqual(len(self.smtp.messages), 2)
+        self.assertEqual(self.smtp.connections, 1)
+
+    def test_dropped_connection_is_reopened(self):
+        self.smtp.drop_after_each_message = True
+        self.send()
+        self.send("bob@example.com")
+        self.assertEqual(len(self.smtp.messages), 2)
+        self.assertEqual(self.smtp.connections, 2)
+
+    def test_temporary_failure_is_retried(self):
+        self.smtp.replies["DATA"] = "451 4.3.0 Mailbox busy, try again later"
+        # Called directly, Celery's autoretry re-raises what it would retry on
+        with self.assertRaises(EmailTransientError):
+            self.send()
+        # Back in the outbox for the retry
+        self.assertEqual(self.outbox(), 1)
+        del self.smtp.replies["DATA"]
+        send_email_task()
+        self.assertEqual((len(self.smtp.messages), self.outbox()), (1, 0))
+
+    def test_refused_recipient_is_not_retried(self):
+        self.smtp.replies["RCPT"] = "550 5.1.1 No such user"
+        with self.assertRaises(smtplib.SMTPRecipientsRefused):
+            self.send()
+
+    def test_refused_recipient_does_not_hold_up_the_batch(self):
+        self.smtp.refused_recipients.add("nobody@example.com")
+        for to in ("alice@example.com", "nobody@example.com", "bob@example.com"):
+            email_service.queue_email("Password reset", "Click the link", [to])
+        with self.assertRaises(smtplib.SMTPRecipientsRefused):
+            send_email_task()
+        self.assertEqual(len(self.smtp.messages), 2)
+        self.assertEqual(self.outbox(), 0)
+
+    def test_permanent_failure_is_not_retried(self):
+        self.smtp.replies["DATA"] = "554 5.7.1 Message rejected"
+        with self.assertRaises(smtplib.SMTPDataError):
+            self.send()
+
+
+class ThrottleTests(EndpointTestCase):
+    JOBS = 0
+    LOGIN_IP_LIMIT = 20
+
+    def failed_login(self, email, **extra):
+        return self.client.post(
+            "/api/v1/login/", {"email": email, "password": "wrong"}, content_type="application/json", **extra,
+        )
+
+    def test_email_window_answers_429_with_retry_after(self):
+        for _ in range(5):
+            self.assertEqual(self.failed_login("alice@example.com").status_code, 400)
+        response = self.failed_login("alice@example.com")
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response["Retry-After"]), 0)
+
+    def test_spoofed_forwarded_for_does_not_reset_the_ip_window(self):
+        for i in range(self.LOGIN_IP_LIMIT):
+            response = self.failed_login(f"user{i}@example.com", HTTP_X_FORWARDED_FOR=f"198.51.100.{i}")
+            self.assertNotEqual(response.status_code, 429)
+        response = self.failed_login("someone@example.com", HTTP_X_FORWARDED_FOR="198.51.100.250")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+    def test_behind_one_proxy_only_the_last_hop_counts(self):
+        rest_framework = {**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}
+        with override_settings(REST_FRAMEWORK=rest_framework):
+            for i in range(self.LOGIN_IP_LIMIT):
+                # The proxy appends the address it saw; whatever the client sent comes first
+                response = self.failed_login(
+                    f"user{i}@example.com", HTTP_X_FORWARDED_FOR=f"198.51.100.{i}, 203.0.113.7",
+                )
+                self.assertNotEqual(response.status_code, 429)
+            response = self.failed_login("someone@example.com", HTTP_X_FORWARDED_FOR="198.51.100.250, 203.0.113.7")
+            self.assertEqual(response.status_code, 429)
+
+            response = self.failed_login("someone@example.com", HTTP_X_FORWARDED_FOR="203.0.113.8")
+            self.assertEqual(response.status_code, 400)
+
+
+class AccountDeletionTests(EndpointTestCase):
+    JOBS = 20
+
+    @override_settings(ACCOUNT_DELETE_CHUNK_SIZE=7, ACCOUNT_DELETE_STORAGE_BATCH_SIZE=4)
+    def test_delete_account_removes_rows_and_queues_objects(self):
+        user_id = self.user.pk
+        legacy_key = f"user_uploads/{user_id}/cover_letter_url/letter.pdf"
+        Jobs.objects.filter(pk=self.jobs[1].pk).update(
+            cover_letter_url=f"http://testserver{get_storage().url(legacy_key)}",
+        )
+        expected_keys = sorted([legacy_key, *DocumentBlob.objects.filter(user_id=user_id).values_list("key", flat=True)])
+        bob = Users.objects.get(email="bob@example.com")
+        bob_counts = (Jobs.objects.filter(user=bob).count(), DocumentBlob.objects.filter(user=bob).count())
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            delete_account(str(user_id))
+
+        self.assertFalse(Users.objects.filter(pk=user_id).exists())
+        self.assertFalse(Jobs.objects.filter(user_id=user_id).exists())
+        self.assertFalse(DocumentBlob.objects.filter(user_id=user_id).exists())
+        self.assertFalse(DocumentReference.objects.filter(blob__user_id=user_id).exists())
+        self.assertEqual(
+            (Jobs.objects.filter(user=bob).count(), DocumentBlob.objects.filter(user=bob).count()), bob_counts,
+        )
+
+        batches = [
+            signature.args[0] for signature in dispatched_signatures(callbacks)
+            if signature.task == delete_many_from_s3_task.name
+        ]
+        self.assertTrue(all(len(batch) <= 4 for batch in batches))
+        self.assertEqual(sorted(key for batch in batches for key in batch), expected_keys)
+
+    def test_delete_account_twice_is_a_no_op(self):
+        delete_account(str(self.user.pk))
+        self.assertIn("already deleted", delete_account(str(self.user.pk)))
+
+
+@mock.patch("sameboat.db_routing.replica_configured", return_value=True)
+class ReadYourWritesTests(EndpointTestCase):
+    JOBS = 4
+
+    def list_jobs(self):
+        """GET the jobs list; True if the view sent its reads to the replica."""
+        with mock.patch("users.api.viewsets.use_replica") as use_replica:
+            response = self.client.get("/api/v1/jobs/")
+        self.assertEqual(response.status_code, 200)
+        return use_replica.called
+
+    def test_reads_go_to_the_replica_until_the_user_writes(self, replica_configured):
+        self.assertTrue(self.list_jobs())
+        self.assertFalse(db_routing.is_pinned(self.user.pk))
+
+        response = self.client.patch(
+            f"/api/v1/jobs/{self.jobs[1].job_id}/", {"current_status": "APPLIED"}, content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(db_routing.is_pinned(self.user.pk))
+        self.assertFalse(self.list_jobs())
+
+    def test_pin_expires(self, replica_configured):
+        self.client.patch(
+            f"/api/v1/jobs/{self.jobs[1].job_id}/", {"current_status": "APPLIED"}, content_type="application/json",
+        )
+        ttl = cache.ttl(f"{db_routing.PIN_PREFIX}{self.user.pk}")
+        self.assertTrue(0 < ttl <= settings.DATABASE_REPLICA_PIN_SECONDS)
+
+    def test_failed_write_and_reads_do_not_pin(self, replica_configured):
+        response = self.client.patch(
+            f"/api/v1/jobs/{self.jobs[1].job_id}/", {"current_status": "NOT_A_STATUS"}, content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.list_jobs()
+        self.assertFalse(db_routing.is_pinned(self.user.pk))
+        self.assertTrue(self.list_jobs())
+
+
+class AuthUserLookupTests(EndpointTestCase):
+    JOBS = 10
+
+    def test_user_is_read_from_the_database_once(self):
+        for local_cache in LOCAL_CACHES:
+            local_cache.clear()
+        get_redis_connection("default").flushall()
+        self.timed_request("get", "/api/v1/jobs/", queries=2)
+        self.timed_request("get", "/api/v1/jobs/", queries=1)
+
+    def test_password_hash_is_not_cached(self):
+        key = f"{authentication.USER_CACHE_PREFIX}{self.user.pk}"
+        for user in (cache.get(key), authentication._local_users.get(key)):
+            self.assertNotIn("password", user.__dict__)
+        # Still there for the views that check it, loaded on access
+        user = authentication.CachedJWTAuthentication().get_cached_user(self.user.pk)
+        self.assertTrue(user.check_password(PASSWORD))
+
+    def test_user_comes_from_redis_in_a_new_process(self):
+        authentication._local_users.clear()
+        self.timed_request("get", "/api/v1/jobs/", queries=1)
+
+
+class StorageEndpointTests(EndpointTestCase):
+    JOBS = 2
+
+    def test_presigned_download(self):
+        key = self.jobs[0].documents.get().blob.key
+        url = get_storage().presigned_url(key)
+        response = self.timed_request("get", url, queries=0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), f"resume for {self.jobs[0].job_id}".encode())
+
+    def test_bad_token(self):
+        key = self.jobs[0].documents.get().blob.key
+        response = self.timed_request("get", f"{get_storage().url(key)}?token=forged", queries=0)
+        self.assertEqual(response.status_code, 403)
+
+
+class ImageOptimizerTests(TestCase):
+    def gps_jpeg(self, quality):
+        exif = Image.Exif()
+        gps = exif.get_ifd(ExifTags.IFD.GPSInfo)
+        gps[ExifTags.GPS.GPSLatitudeRef] = "N"
+        gps[ExifTags.GPS.GPSLatitude] = (52.0, 31.0, 12.0)
+        out = io.BytesIO()
+        # Noise, so the encoded size follows the quality rather than the metadata
+        Image.frombytes("RGB", (64, 64), os.urandom(64 * 64 * 3)).save(out, "JPEG", quality=quality, exif=exif, comment=b"taken at home")
+        return out.getvalue()
+
+    def test_metadata_is_stripped_even_when_the_encode_is_larger(self):
+        # Compressed harder than IMAGE_JPEG_QUALITY: re-encoding can't make it smaller
+        data = self.gps_jpeg(quality=20)
+        optimized = image_optimizer.optimize_image(data, "photo.jpg")
+        self.assertGreaterEqual(len(optimized), len(data))
+        with Image.open(io.BytesIO(optimized)) as image:
+            self.assertFalse(image.getexif().get_ifd(ExifTags.IFD.GPSInfo))
+            self.assertNotIn("comment", image.info)
+
+    @override_settings(IMAGE_MAX_PIXELS=32 * 32)
+    def test_images_over_the_pixel_cap_are_rejected(self):
+        with self.assertRaises(image_optimizer.ImageRejected):
+            image_optimizer.optimize_image(self.gps_jpeg(quality=85), "photo.jpg")
+
+    def test_unreadable_images_are_rejected(self):
+        with self.assertRaises(image_optimizer.ImageRejected):
+            image_optimizer.optimize_image(b"not a JPEG", "photo.jpg")
+
+
+class ReconcileStorageTests(EndpointTestCase):
+    JOBS = 4
+
+    def store(self, key, age_hours):
+        storage_backend = get_storage()
+        storage_backend.save(io.BytesIO(b"stored"), key)
+        modified = time.time() - age_hours * 3600
+        os.utime(storage_backend.path(key), (modified, modified))
+        return key
+
+    def test_deletes_only_old_unreferenced_objects(self):
+        prefix = f"user_uploads/{self.user.pk}/"
+        old_orphan = self.store(f"{prefix}blobs/{'0' * 64}", age_hours=48)
+        new_orphan = self.store(f"{prefix}blobs/{'1' * 64}", age_hours=1)
+        legacy = self.store(f"{prefix}resume_url/old-resume.pdf", age_hours=48)
+        Jobs.objects.filter(pk=self.jobs[1].pk).update(resume_url=f"http://testserver{get_storage().url(legacy)}")
+        blob_keys = list(DocumentBlob.objects.filter(user=self.user).values_list("key", flat=True))
+        for key in blob_keys:
+            modified = time.time() - 48 * 3600
+            os.utime(get_storage().path(key), (modified, modified))
+
+        call_command("reconcile_storage", "--prefix", prefix, "--grace-hours", "24", stdout=io.StringIO())
+
+        remaining = {obj.key for obj in get_storage().list_prefix(prefix)}
+        self.assertNotIn(old_orphan, remaining)
+        self.assertIn(new_orphan, remaining)
+        self.assertIn(legacy, remaining)
+        self.assertTrue(set(blob_keys) <= remaining)
+
+    def test_dry_run_deletes_nothing(self):
+        prefix = f"user_uploads/{self.user.pk}/"
+        orphan = self.store(f"{prefix}blobs/{'0' * 64}", age_hours=48)
+        call_command("reconcile_storage", "--prefix", prefix, "--grace-hours", "24", "--dry-run", stdout=io.StringIO())
+        self.assertIn(orphan, {obj.key for obj in get_storage().list_prefix(prefix)})
+
+
+class HealthEndpointTests(EndpointTestCase):
+    JOBS = 2
+    # Each inspect call waits 1s for worker replies that never come on the in-memory broker
+    INSPECT_BUDGET_MS = 1500
+
+    def test_api_root(self):
+        response = self.timed_request("get", "/api/v1/", queries=0)
+        self.assertEqual(response.status_code, 200)
+
+    def test_health(self):
+        response = self.timed_request("get", "/health/", queries=1, budget_ms=self.INSPECT_BUDGET_MS)
+        self.assertEqual(response.json()["checks"]["database"], "ok")
+
+    def test_ready_and_alive(self):
+        self.timed_request("get", "/health/ready", queries=0)
+        self.timed_request("get", "/health/alive", queries=0)
+
+    def test_celery(self):
+        # stats, active and scheduled: three inspect calls
+        response = self.timed_request("get", "/health/celery", queries=0, budget_ms=3 * self.INSPECT_BUDGET_MS)
+        self.assertEqual(response.status_code, 200)
+
+    def test_rate_limit_stats(self):
+        response = self.timed_request("get", "/health/ratelimit", queries=0)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(REQUEST_PROFILING=True)
+class ProfilingTests(EndpointTestCase):
+    JOBS = 10
+
+    def test_disabled_ignores_the_header(self):
+        with override_settings(REQUEST_PROFILING=False):
+            response = self.timed_request("get", "/api/v1/jobs/", queries=1, HTTP_X_PROFILE=make_token("tests"))
+        self.assertNotIn("Server-Timing", response)
+
+    def test_not_profiled_without_header(self):
+        response = self.timed_request("get", "/api/v1/jobs/", queries=1)
+        self.assertNotIn("Server-Timing", response)
+
+    def test_signed_token(self):
+        response = self.timed_request("get", "/api/v1/jobs/", queries=1, HTTP_X_PROFILE=make_token("tests"))
+        timing = response["Server-Timing"]
+        self.assertIn('desc="1 queries"', timing)
+        self.assertIn("cache;dur=", timing)
+        self.assertIn("total;dur=", timing)
+
+    def test_forged_token(self):
+        response = self.timed_request("get", "/api/v1/jobs/", queries=1, HTTP_X_PROFILE=make_token("tests") + "x")
+        self.assertNotIn("Server-Timing", response)
+
+    def test_staff_user(self):
+        response = self.timed_request("get", "/api/v1/jobs/", queries=1, HTTP_X_PROFILE="1")
+        self.assertNotIn("Server-Timing", response)
+
+        Users.objects.filter(pk=self.user.pk).update(is_staff=True)
+        authentication.invalidate_cached_user(self.user.pk)
+        authentication.CachedJWTAuthentication().get_cached_user(self.user.pk)
+        response = self.timed_request("get", "/api/v1/jobs/", queries=1, HTTP_X_PROFILE="1")
+        self.assertIn("Server-Timing", response)
+
+    def test_flamegraph(self):
+        dump_dir = os.path.join(STORAGE_ROOT, "profiles")
+        with override_settings(REQUEST_PROFILING_DUMP_DIR=dump_dir):
+            response = self.client.get(
+                "/api/v1/jobs/", HTTP_X_PROFILE=make_token("tests"), HTTP_X_PROFILE_FLAMEGRAPH="1",
+            )
+        self.assertTrue(os.path.exists(os.path.join(dump_dir, response["X-Profile-Flamegraph"])))
@@ -0,0 +1,213 @@
+"""
+Resumable attachment uploads.
+
+A client creates a session for a job field, then sends the file in fixed
+size chunks, each tagged with the byte offset it starts at. Only the chunk
+at the session's current offset is accepted, so after a dropped connection
+the client asks for the offset and resends from there. Finalizing turns the
+chunks into the attachment:
+
+- S3 backend: each chunk is one multipart part of a staging object in
+  document storage (sameboat.services.storage); finalize completes it and the adopt_uploaded_object task moves it to its
+  content-addressed key (users.documents).
+- Local backend: chunks are written to a spool file; finalize hands the
+  file to the upload_file_to_s3 task (the worker must share the disk).
+
+Expired sessions are aborted by the cleanup_upload_sessions beat task.
+"""
+import os
+import shutil
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from sameboat.security import sanitize_filename
+from sameboat.services.storage import MultipartUploadGone, get_storage
+from sameboat.services.task_dispatch import dispatch
+from users import uploads
+from users.models import UploadSession
+
+
+class UploadSessionError(Exception):
+    status_code = 400
+
+
+class InvalidChunk(UploadSessionError):
+    pass
+
+
+class OffsetMismatch(UploadSessionError):
+    """The chunk doesn't start where the session left off."""
+
+    status_code = 409
+
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+class SessionClosed(UploadSessionError):
+    status_code = 410
+
+
+def _expiry():
+    return timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+
+
+def start_session(user, job, field_name, filename, content_type, total_size, keep_original=False):
+    """Open a session and its multipart upload / spool file."""
+    filename = sanitize_filename(filename)
+    session = UploadSession(
+        user=user,
+        job=job,
+        field_name=field_name,
+        filename=filename,
+        content_type=content_type or "",
+        total_size=total_size,
+        keep_original=keep_original,
+        chunk_size=settings.UPLOAD_CHUNK_SIZE,
+        backend=settings.UPLOAD_SESSION_BACKEND,
+        expires_at=_expiry(),
+    )
+
+    if session.backend == UploadSession.Backend.S3:
+        session.storage_key = f"user_uploads/{user.user_id}/staging/{session.session_id}"
+        session.s3_upload_id = get_storage().create_multipart(session.storage_key, filename)
+    else:
+        spool_dir = os.path.join(settings.UPLOAD_SPOOL_DIR, str(session.session_id))
+        os.makedirs(spool_dir, exist_ok=True)
+        session.storage_key = os.path.join(spool_dir, filename)
+        open(session.storage_key, "wb").close()
+
+    # Claimed up front: a plain upload of the same field made while this
+    # session is open supersedes it, just like two plain uploads.
+    session.generation = uploads.next_generation(job.job_id, field_name)
+    session.save()
+    uploads.set_upload_status(job.job_id, field_name, uploads.UPLOADING)
+    return session
+
+
+def _check_open(session):
+    if session.status != UploadSession.Status.ACTIVE:
+        raise SessionClosed("Upload session is already finalized")
+    if session.expires_at <= timezone.now():
+        raise SessionClosed("Upload session has expired")
+
+
+def write_chunk(session_id, offset, data):
+    """
+    Store the chunk starting at `offset`. Every chunk but the last must be
+    exactly chunk_size bytes (S3 parts other than the last must be >= 5 MB).
+
+    The part upload (and any storage rate-limit wait) happens without a
+    transaction or row lock; the chunk is then recorded with a compare-and-set
+    on `offset`, so of two concurrent PUTs for one offset only one advances
+    the session and the other gets the new offset back. Resending a part
+    number just replaces that part.
+    """
+    session = UploadSession.objects.get(pk=session_id)
+    _check_open(session)
+
+    if offset != session.offset:
+        raise OffsetMismatch(f"Expected offset {session.offset}, got {offset}", session.offset)
+
+    end = offset + len(data)
+    if not data or end > session.total_size:
+        raise InvalidChunk("Chunk is empty or runs past the declared file size")
+    if end < session.total_size and len(data) != session.chunk_size:
+        raise InvalidChunk(f"Chunks must be {session.chunk_size} bytes except the last")
+
+    if session.backend == UploadSession.Backend.S3:
+        part_number = offset // session.chunk_size + 1
+        etag = get_storage().upload_part(session.storage_key, session.s3_upload_id, part_number, data)
+        session.parts = session.parts + [{"PartNumber": part_number, "ETag": etag}]
+    else:
+        with open(session.storage_key, "r+b") as spool:
+            spool.seek(offset)
+            spool.write(data)
+
+    session.expires_at = _expiry()
+    recorded = UploadSession.objects.filter(
+        pk=session_id, offset=offset, status=UploadSession.Status.ACTIVE,
+    ).update(offset=end, parts=session.parts, expires_at=session.expires_at, updated_at=timezone.now())
+    if not recorded:
+        # Another PUT for this offset (or a finalize) got there first
+        session.refresh_from_db()
+        _check_open(session)
+        raise OffsetMismatch(f"Expected offset {session.offset}, got {offset}", session.offset)
+    session.offset = end
+    return session
+
+
+def finalize_session(session_id):
+    """
+    Assemble the uploaded chunks into the job's attachment. Finalizing an
+    already finalized session is a no-op, so clients can safely retry.
+
+    The multipart upload is completed outside any transaction; the session
+    is then closed with a compare-and-set on its status, and only the call
+    that closes it queues the attachment task. If an earlier call completed
+    the upload but didn't get to close the session, the staging object is
+    checked instead and the session closed as usual.
+    """
+    # Imported here: users.tasks imports this module
+    from users.tasks import adopt_uploaded_object, upload_file_to_s3
+
+    session = UploadSession.objects.get(pk=session_id)
+    if session.status == UploadSession.Status.COMPLETED:
+        return session
+    _check_open(session)
+    if session.offset != session.total_size:
+        raise OffsetMismatch(
+            f"Upload incomplete: {session.offset} of {session.total_size} bytes received",
+            session.offset,
+        )
+
+    job_id, field_name = str(session.job_id), session.field_name
+    if session.backend == UploadSession.Backend.S3:
+        _complete_multipart(session)
+        task = adopt_uploaded_object.s(
+            job_id, field_name, session.storage_key, session.filename, session.generation,
+            session.keep_original,
+        )
+    else:
+        task = upload_file_to_s3.s(
+            job_id, field_name, session.storage_key, session.generation, session.keep_original
+        )
+
+    with transaction.atomic():
+        closed = UploadSession.objects.filter(
+            pk=session_id, status=UploadSession.Status.ACTIVE, offset=session.total_size,
+        ).update(status=UploadSession.Status.COMPLETED, updated_at=timezone.now())
+        if closed:
+            dispatch(task)
+    if not closed:
+        # A concurrent finalize closed it and queued the task
+        session.refresh_from_db()
+        return session
+
+    session.status = UploadSession.Status.COMPLETED
+    uploads.set_upload_status(job_id, field_name, uploads.PENDING)
+    return session
+
+
+def _complete_multipart(session):
+    storage = get_storage()
+    try:
+        storage.complete_multipart(session.storage_key, session.s3_upload_id, session.parts)
+    except MultipartUploadGone as e:
+        # Completed by a call that failed before closing the session, or aborted
+        if storage.size(session.storage_key) != session.total_size:
+            raise SessionClosed("Upload no longer exists, start a new session") from e
+
+
+def discard_session(session):
+    """Abort the multipart upload / remove the spool directory, then the row."""
+    if session.backend == UploadSession.Backend.S3:
+        if session.status == UploadSession.Status.ACTIVE:
+            get_storage().abort_multipart(session.storage_key, session.s3_upload_id)
+    else:
+        shutil.rmtree(os.path.dirname(session.storage_key), ignore_errors=True)
+    session.delete()
@@ -0,0 +1,141 @@
+"""
+Coordination state for attachment uploads, kept in Redis.
+
+Every replacement of a job's resume/cover letter bumps a per-(job, field)
+generation counter once its write commits, as its upload task is
+published (a rolled-back write claims nothing). Tasks carry the
+generation they were created for, so a task that has been superseded can
+skip its upload early and never overwrite a newer URL. A superseded upload
+gives back its blob reference (users.documents), which deletes the object
+if nothing else uses it.
+
+Each attachment also has a status (pending -> uploading -> done / failed)
+stored per job in a hash; every change is published on a per-job channel
+so the SSE stream can push it to the browser.
+
+All helpers degrade to "no coalescing" (generation None) if Redis is down.
+"""
+import json
+import logging
+import time
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+GENERATION_PREFIX = "upload:gen:"
+STATUS_PREFIX = "upload:status:"
+EVENTS_PREFIX = "upload:events:"
+
+UPLOAD_FIELDS = ("resume_url", "cover_letter_url")
+
+PENDING = "pending"
+UPLOADING = "uploading"
+DONE = "done"
+FAILED = "failed"
+ACTIVE_STATES = (PENDING, UPLOADING)
+
+# Long enough to outlive any queued/retrying upload task
+STATE_TTL = 7 * 24 * 3600
+
+
+def extract_key(file_url):
+    """
+    Extract the storage key from a stored file URL: a full S3 URL (with or
+    without region) or a LOCAL_STORAGE_URL path.
+    """
+    if not file_url:
+        return None
+    path = unquote(urlparse(file_url).path)
+    local_prefix = urlparse(settings.LOCAL_STORAGE_URL).path
+    if path.startswith(local_prefix):
+        return path[len(local_prefix):]
+    return path.lstrip("/")
+
+
+def _suffix(job_id, field_name):
+    return f"{job_id}:{field_name}"
+
+
+def next_generation(job_id, field_name):
+    """Claim a new generation for an upload about to be dispatched."""
+    key = f"{GENERATION_PREFIX}{_suffix(job_id, field_name)}"
+    try:
+        redis = get_redis_connection("default")
+        pipe = redis.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, STATE_TTL)
+        generation, _ = pipe.execute()
+        return generation
+    except Exception as e:
+        logger.warning("Upload generation unavailable for %s: %s", key, e)
+        return None
+
+
+def current_generation(job_id, field_name):
+    try:
+        redis = get_redis_connection("default")
+        value = redis.get(f"{GENERATION_PREFIX}{_suffix(job_id, field_name)}")
+    except Exception as e:
+        logger.warning("Upload generation unavailable: %s", e)
+        return None
+    return int(value) if value is not None else None
+
+
+def is_stale(job_id, field_name, generation):
+    """True if a newer upload for the same job field has been dispatched."""
+    if generation is None:
+        return False
+    current = current_generation(job_id, field_name)
+    return current is not None and current > generation
+
+
+def status_key(job_id):
+    return f"{STATUS_PREFIX}{job_id}"
+
+
+def events_channel(job_id):
+    return f"{EVENTS_PREFIX}{job_id}"
+
+
+def set_upload_status(job_id, field_name, state, error=None):
+    """Record an attachment's upload state and notify SSE listeners."""
+    value = json.dumps({"state": state, "error": error, "updated_at": time.time()})
+    try:
+        redis = get_redis_connection("default")
+        pipe = redis.pipeline()
+        pipe.hset(status_key(job_id), field_name, value)
+        pipe.expire(status_key(job_id), STATE_TTL)
+        pipe.publish(events_channel(job_id), field_name)
+        pipe.execute()
+    except Exception as e:
+        logger.warning("Could not record upload status for %s: %s", job_id, e)
+
+
+def parse_upload_status(raw_status, job=None):
+    """
+    Decode a status hash ({field: json}) into {field: {...}}. Fields with no
+    recorded state fall back to the job row: a stored URL means done.
+    """
+    status = {}
+    for field_name in UPLOAD_FIELDS:
+        raw = raw_status.get(field_name) or raw_status.get(field_name.encode())
+        if raw is not None:
+            status[field_name] = json.loads(raw)
+        elif job is not None and getattr(job, field_name):
+            status[field_name] = {"state": DONE, "error": None, "updated_at": None}
+        else:
+            status[field_name] = None
+    return status
+
+
+def get_upload_status(job):
+    try:
+        redis = get_redis_connection("default")
+        raw_status = redis.hgetall(status_key(job.job_id))
+    except Exception as e:
+        logger.warning("Upload status unavailable for %s: %s", job.job_id, e)
+        raw_status = {}
+    return parse_upload_status(raw_status, job)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework import routers
 from rest_framework.routers import DefaultRouter
@@ -6,6 +7,7 @@ from rest_framework_simplejwt.views import TokenRefreshView
 from users.api.viewsets import(
     UserRegisterViewSet,
     JobViewSet,
+    UploadSessionViewSet,
 )
 
 from users.api.auth_views import(
@@ -14,13 +16,19 @@ from users.api.auth_views import(
     UserRefreshFromCookieView,
     UserPasswordSendResetLinkView,
     UserResetPasswordView,
+    UserAccountDeleteView,
+    AccountDeletionStatusView,
 )
 
-from users.api.health_views import health_check, readiness_check, liveness_check, celery_health_check
+from users.api.stream_views import upload_status_stream
+from users.api.storage_views import local_document
+
+from users.api.health_views import health_check, readiness_check, liveness_check, celery_health_check, rate_limit_stats
 
 router = DefaultRouter()
 router.register("register-user", UserRegisterViewSet, "user")
 router.register("jobs", JobViewSet, "jobs")
+router.register("uploads", UploadSessionViewSet, "uploads")
 
 urlpatterns = [
     path('api/v1/', include(router.urls)),
@@ -29,10 +37,17 @@ urlpatterns = [
     path("api/v1/logout", UserLogoutView.as_view(), name="user_logout"),
     path("api/v1/send-reset-password-link", UserPasswordSendResetLinkView.as_view(), name="user_password_rest_link"),
     path("api/v1/reset-password/<str:uid>/<str:token>", UserResetPasswordView.as_view(), name="reset_password"),
+    path("api/v1/account", UserAccountDeleteView.as_view(), name="account_delete"),
+    path("api/v1/account/deletion/<uuid:task_id>", AccountDeletionStatusView.as_view(), name="account_deletion_status"),
+    path("api/v1/jobs/<uuid:job_id>/uploads/stream", upload_status_stream, name="upload_status_stream"),
     
+    # Presigned downloads when DOCUMENT_STORAGE_BACKEND = "local"
+    path(f"{settings.LOCAL_STORAGE_URL.lstrip('/')}<path:key>", local_document, name="local_document"),
+
     # Health check endpoints
     path("health/", health_check, name="health_check"),
     path("health/ready", readiness_check, name="readiness_check"),
     path("health/alive", liveness_check, name="liveness_check"),
     path("health/celery", celery_health_check, name="celery_health_check"),
+    path("health/ratelimit", rate_limit_stats, name="rate_limit_stats"),
 ]